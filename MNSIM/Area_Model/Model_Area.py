@@ -14,99 +14,27 @@ from MNSIM.Hardware_Model.Buffer import buffer
 from MNSIM.Hardware_Model.Adder import adder
 #linqiushi modified
 from MNSIM.Hardware_Model.Multiplier import multiplier
+from MNSIM.Evaluation_Model.Model_evaluation import Model_evaluation
 #linqiushi above
 class Model_area():
-    def __init__(self, NetStruct, SimConfig_path, multiple=None, TCG_mapping=None):
-        self.NetStruct = NetStruct
-        self.SimConfig_path = SimConfig_path
-        # modelL_config = cp.ConfigParser()
-        # modelL_config.read(self.SimConfig_path, encoding='UTF-8')
-        # NoC_Compute = int(modelL_config.get('Algorithm Configuration', 'NoC_enable'))
-        if multiple is None:
-            multiple = [1] * len(self.NetStruct)
-        if TCG_mapping is None:
-            TCG_mapping = TCG(NetStruct,SimConfig_path,multiple)
-        self.graph = TCG_mapping
-        self.total_layer_num = self.graph.layer_num
-        self.arch_area = self.total_layer_num * [0]
-        self.arch_xbar_area = self.total_layer_num * [0]
-        self.arch_ADC_area = self.total_layer_num * [0]
-        self.arch_DAC_area = self.total_layer_num * [0]
-        self.arch_digital_area = self.total_layer_num * [0]
-        self.arch_adder_area = self.total_layer_num * [0]
-        self.arch_shiftreg_area = self.total_layer_num * [0]
-        self.arch_iReg_area = self.total_layer_num * [0]
-        self.arch_oReg_area = self.total_layer_num * [0]
-        self.arch_input_demux_area = self.total_layer_num * [0]
-        self.arch_output_mux_area = self.total_layer_num * [0]
-        self.arch_jointmodule_area = self.total_layer_num * [0]
-        self.arch_buf_area = self.total_layer_num * [0]
-        self.arch_pooling_area = self.total_layer_num * [0]
-        self.arch_total_area = 0
-        self.arch_total_xbar_area = 0
-        self.arch_total_ADC_area = 0
-        self.arch_total_DAC_area = 0
-        self.arch_total_digital_area = 0
-        self.arch_total_adder_area = 0
-        self.arch_total_shiftreg_area = 0
-        self.arch_total_iReg_area = 0
-        self.arch_total_oReg_area = 0
-        self.arch_total_input_demux_area = 0
-        self.arch_total_jointmodule_area = 0
-        self.arch_total_buf_area = 0
-        self.arch_total_output_mux_area = 0
-        self.arch_total_pooling_area = 0
-        # print(data.columns)
-        # if NoC_Compute == 1:
-        #     path = os.getcwd() + '/Final_Results/'
-        #     data = pd.read_csv(path + 'area.csv')
-        #     self.arch_Noc_area = float(data.columns[0].split(' ')[-2])
-        # else:
-        #     self.arch_Noc_area = 0
-        self.calculate_model_area()
+    # view of the area results of a Model_evaluation (computed if evaluation is not given)
+    def __init__(self, NetStruct, SimConfig_path, multiple=None, TCG_mapping=None, evaluation=None):
+        if evaluation is None:
+            evaluation = Model_evaluation(NetStruct, SimConfig_path, multiple, TCG_mapping)
+        self.evaluation = evaluation
 
-    def calculate_model_area(self): #Todo: Noc area
+    def __getattr__(self, name):
+        # results (arch_*_area), graph, global modules of the evaluation
+        if name == 'evaluation':
+            raise AttributeError(name)
+        return getattr(self.evaluation, name)
 
-        self.graph.tile.calculate_tile_area(SimConfig_path=self.SimConfig_path,
-                                            default_inbuf_size = self.graph.max_inbuf_size,
-                                            default_outbuf_size = self.graph.max_outbuf_size)
-        self.global_buf = buffer(SimConfig_path=self.SimConfig_path,buf_level=1,default_buf_size=self.graph.global_buf_size)
-        self.global_buf.calculate_buf_area()
-        self.global_add = adder(SimConfig_path=self.SimConfig_path,bitwidth=self.graph.global_adder_bitwidth)
-        #linqiushi modified 
-        self.global_mul=multiplier(SimConfig_path=self.SimConfig_path,bitwidth=self.graph.global_multiplier_bitwidth)
-        #linqiushi above
-        self.global_add.calculate_adder_area()
-        for i in range(self.total_layer_num):
-            tile_num = self.graph.layer_tileinfo[i]['tilenum']
-            self.arch_area[i] = self.graph.tile.tile_area * tile_num
-            self.arch_xbar_area[i] = self.graph.tile.tile_xbar_area * tile_num
-            self.arch_ADC_area[i] = self.graph.tile.tile_ADC_area * tile_num
-            self.arch_DAC_area[i] = self.graph.tile.tile_DAC_area * tile_num
-            self.arch_digital_area[i] = self.graph.tile.tile_digital_area * tile_num
-            self.arch_adder_area[i] = self.graph.tile.tile_adder_area * tile_num
-            self.arch_shiftreg_area[i] = self.graph.tile.tile_shiftreg_area * tile_num
-            self.arch_iReg_area[i] = self.graph.tile.tile_iReg_area * tile_num
-            self.arch_oReg_area[i] = self.graph.tile.tile_oReg_area * tile_num
-            self.arch_input_demux_area[i] = self.graph.tile.tile_input_demux_area * tile_num
-            self.arch_output_mux_area[i] = self.graph.tile.tile_output_mux_area * tile_num
-            self.arch_jointmodule_area[i] = self.graph.tile.tile_jointmodule_area * tile_num
-            self.arch_buf_area[i] = self.graph.tile.tile_buffer_area * tile_num
-            self.arch_pooling_area[i] = self.graph.tile.tile_pooling_area * tile_num
-        self.arch_total_area = sum(self.arch_area)
-        self.arch_total_xbar_area = sum(self.arch_xbar_area)
-        self.arch_total_ADC_area = sum(self.arch_ADC_area)
-        self.arch_total_DAC_area = sum(self.arch_DAC_area)
-        self.arch_total_digital_area = sum(self.arch_digital_area)+self.global_add.adder_area*self.graph.global_adder_num
-        self.arch_total_adder_area = sum(self.arch_adder_area)+self.global_add.adder_area*self.graph.global_adder_num
-        self.arch_total_shiftreg_area = sum(self.arch_shiftreg_area)
-        self.arch_total_iReg_area = sum(self.arch_iReg_area)
-        self.arch_total_oReg_area = sum(self.arch_oReg_area)
-        self.arch_total_input_demux_area = sum(self.arch_input_demux_area)
-        self.arch_total_output_mux_area = sum(self.arch_output_mux_area)
-        self.arch_total_jointmodule_area = sum(self.arch_jointmodule_area)
-        self.arch_total_buf_area = sum(self.arch_buf_area)+self.global_buf.buf_area
-        self.arch_total_pooling_area = sum(self.arch_pooling_area)
+    def __dir__(self):
+        # the attributes of the evaluation are attributes of the view
+        return sorted(set(object.__dir__(self)) | set(dir(self.evaluation)))
+
+    def calculate_model_area(self): #Todo: Noc area
+        self.evaluation.calculate_model_area()
 
     def model_area_output(self, module_information = 1, layer_information = 1):
         print("Hardware area:", self.arch_total_area, "um^2")
@@ -0,0 +1,438 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import collections
+import itertools
+import json
+import multiprocessing
+import queue
+import time
+import numpy as np
+import pandas as pd
+from MNSIM.Interface.interface import *
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig, SimConfig_variant, find_option
+from MNSIM.Mapping_Model.Tile_connection_graph import TCG
+from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Evaluation_Model.Model_evaluation import Model_evaluation
+from MNSIM.DSE_Model.Surrogate_model import network_features, surrogate_model
+# Design space exploration over SimConfig parameters for a fixed network: the design points are in-memory SimConfig
+# variants (SimConfig_variant), evaluated (mapping, latency, area, power, energy) in a process pool.
+# Each worker keeps its caches warm: the parsed variants, the network structures (keyed by the hardware parameters
+# of TrainTestInterface) and the characterization cache of the hardware models.
+# The results are streamed into a table, the Pareto front of (latency, area, energy) is updated with each result.
+# Branch and bound (prune): area and power only need the mapping and the tile characterization, the points exceeding
+# an area/power constraint are dropped before any latency run. The other points get the latency estimate (mode 3,
+# exact energy, latency within an error bound), they are the results with latency_mode 3. Otherwise the exact latency
+# alone is then computed from the lowest estimate up, and skipped for the points that are dominated by the current
+# front for any latency within their bound.
+# Surrogate ranking (surrogate, top_k): a surrogate_model trained on previous results predicts the latency and energy
+# of every point, only the top_k points by predicted Pareto rank are simulated.
+
+# objectives of the Pareto front, all minimized
+objectives = ['latency', 'area', 'energy']
+
+# per-process caches of evaluate_design_point (LRU of worker_cache_capacity entries)
+# a structure carries the network weights (~200MB for resnet18), so fewer of them are kept
+worker_cache_capacity = 64
+worker_structure_capacity = 4
+_worker_config = collections.OrderedDict()
+_worker_structure = collections.OrderedDict()
+
+
+def worker_cache_lookup(cache, key, compute, capacity=None):
+    # value of key in a per-process cache, computed and stored if it is missing
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    value = compute()
+    cache[key] = value
+    if len(cache) > (worker_cache_capacity if capacity is None else capacity):
+        cache.popitem(last=False)
+    return value
+
+
+def grid_sampler(space):
+    # every combination of the parameter values, space: {parameter: [values]}
+    parameters = list(space.keys())
+    for values in itertools.product(*[space[parameter] for parameter in parameters]):
+        yield collections.OrderedDict(zip(parameters, values))
+
+
+def random_sampler(space, sample_num, seed=0):
+    # sample_num points, each value drawn uniformly from the values of its parameter
+    random_state = np.random.RandomState(seed)
+    for _ in range(sample_num):
+        yield collections.OrderedDict((parameter, values[random_state.randint(len(values))])
+                                      for parameter, values in space.items())
+
+
+def latin_hypercube_sampler(space, sample_num, seed=0):
+    # sample_num points, the range of each parameter is split in sample_num strata, each stratum is sampled once
+    random_state = np.random.RandomState(seed)
+    index = collections.OrderedDict()
+    for parameter, values in space.items():
+        strata = (random_state.permutation(sample_num) + random_state.uniform(size=sample_num)) / sample_num
+        index[parameter] = np.minimum((strata * len(values)).astype(int), len(values) - 1)
+    for i in range(sample_num):
+        yield collections.OrderedDict((parameter, space[parameter][index[parameter][i]]) for parameter in space)
+
+
+def point_key(point):
+    # hashable key of a design point
+    return json.dumps([[str(parameter), value] for parameter, value in point.items()], default=str)
+
+
+def dominates(a, b):
+    # a dominates b: not worse in every objective, better in one
+    return all(a[m] <= b[m] for m in objectives) and any(a[m] < b[m] for m in objectives)
+
+
+def pareto_rank(objective):
+    # non-dominated sorting, objective: (n, m) array (minimized), return: front index of each point (0: Pareto front)
+    # two objectives (surrogate ranking): sort-based, O(n) memory (pareto_rank_2d)
+    objective = np.asarray(objective, dtype=float)
+    if objective.ndim == 2 and objective.shape[1] == 2:
+        return pareto_rank_2d(objective)
+    rank = np.full(len(objective), -1)
+    front = 0
+    while (rank < 0).any():
+        remaining = np.flatnonzero(rank < 0)
+        value = objective[remaining]
+        dominated = ((value[:, np.newaxis, :] <= value[np.newaxis, :, :]).all(axis=2) &
+                     (value[:, np.newaxis, :] < value[np.newaxis, :, :]).any(axis=2)).any(axis=0)
+        rank[remaining[~dominated]] = front
+        front += 1
+    return rank
+
+
+def pareto_rank_2d(objective):
+    # pareto_rank of (n, 2) objectives: the points are sorted by the first objective (then the second), a point is
+    # dominated by an earlier point of its front if the running minimum of the second objective before it is lower,
+    # or equal and reached at a lower first objective (identical points do not dominate each other)
+    order = np.lexsort((objective[:, 1], objective[:, 0]))
+    rank = np.full(len(objective), -1)
+    front = 0
+    while len(order):
+        x = objective[order, 0]
+        y = objective[order, 1]
+        running_min = np.minimum.accumulate(y)
+        previous_min = np.concatenate([[np.inf], running_min[:-1]])
+        # x of the first point reaching the running minimum before each point
+        first = np.maximum.accumulate(np.where(y < previous_min, np.arange(len(order)), 0))
+        previous_x = np.concatenate([[np.inf], x[first[:-1]]])
+        dominated = (previous_min < y) | ((previous_min == y) & (previous_x < x))
+        rank[order[~dominated]] = front
+        order = order[dominated]
+        front += 1
+    return rank
+
+
+def empty_result(point):
+    result = collections.OrderedDict(point)
+    for name in ['latency', 'latency_bound', 'area', 'power', 'energy', 'tile_num', 'error', 'pruned']:
+        result[name] = None
+    return result
+
+
+# options of SimConfig read by TrainTestInterface (hardware_config, tile_size, pe_group_num)
+structure_options = [('Crossbar level', 'Xbar_Size'), ('Process element level', 'PIM_Type'),
+                     ('Process element level', 'Xbar_Polarity'), ('Process element level', 'DAC_Num'),
+                     ('Device level', 'Device_Level'), ('Interface level', 'ADC_Choice'),
+                     ('Interface level', 'DAC_Choice'), ('Interface level', 'ADC_Precision'),
+                     ('Interface level', 'DAC_Precision'), ('Process element level', 'Group_Num'),
+                     ('Tile level', 'PE_Num')]
+
+
+def get_structure(network_module, dataset_module, weights_file, config):
+    # the structure only depends on the network and the options of the interface (structure_options),
+    # the interface (network construction, weights) is only built for a new structure
+    config = load_SimConfig(config)
+    key = json.dumps([network_module, dataset_module, weights_file] +
+                     [config.get(section, option) for section, option in structure_options])
+
+    def compute():
+        interface = TrainTestInterface(network_module=network_module, dataset_module=dataset_module,
+                                       SimConfig_path=config, weights_file=weights_file)
+        return interface.get_structure()
+    return worker_cache_lookup(_worker_structure, key, compute, worker_structure_capacity)
+
+
+def design_point_error(config):
+    # why the hardware description of a design point cannot be simulated, None if it is valid
+    xbar_size = config.getlist('Crossbar level', 'Xbar_Size')
+    subarray_size = config.getint('Crossbar level', 'Subarray_Size')
+    if min(xbar_size) <= 0 or subarray_size <= 0:
+        return "Xbar_Size %s and Subarray_Size %d must be > 0" % (xbar_size, subarray_size)
+    if xbar_size[0] % subarray_size != 0:
+        return "Xbar_Size %s is not divisible by Subarray_Size %d" % (xbar_size, subarray_size)
+    if config.getint('Interface level', 'ADC_Choice') not in [-1, 1, 2, 3, 4, 5, 6, 7, 8, 9]:
+        return "ADC_Choice %d is not in -1, 1-9" % config.getint('Interface level', 'ADC_Choice')
+    if config.getint('Interface level', 'DAC_Choice') not in [-1, 1, 2, 3, 4, 5, 6, 7]:
+        return "DAC_Choice %d is not in -1, 1-7" % config.getint('Interface level', 'DAC_Choice')
+    if config.getint('Process element level', 'Xbar_Polarity') not in [1, 2]:
+        return "Xbar_Polarity must be 1 or 2"
+    if config.getint('Process element level', 'Group_Num') <= 0:
+        return "Group_Num must be > 0"
+    if min(config.getlist('Tile level', 'PE_Num')) <= 0:
+        return "PE_Num %s must be > 0" % config.getlist('Tile level', 'PE_Num')
+    if min(config.getlist('Architecture level', 'Tile_Num')) < 0:
+        return "Tile_Num %s must be >= 0" % config.getlist('Architecture level', 'Tile_Num')
+    return None
+
+
+def evaluate_design_point(task):
+    '''
+    :param task: (network_module, dataset_module, weights_file, SimConfig_path, point, latency_mode, constraints,
+                  latency_only)
+                 latency_mode: mode of calculate_model_latency (3: estimate, with an error bound)
+                 constraints: {'area': um^2, 'power': W}, checked before the latency is computed
+                 latency_only: only the latency is computed (the point is valid, its area, power and energy are known)
+    :return: result of the design point: parameters, latency (ns), latency error bound (ns), area (um^2),
+             power (W), energy (nJ), used tiles, evaluation time (s), error (the point is infeasible: invalid
+             hardware description, design_point_error, or not enough tiles), pruned ('constraint': the latency is
+             not computed)
+    '''
+    network_module, dataset_module, weights_file, SimConfig_path, point, latency_mode, constraints, latency_only = task
+    start_time = time.time()
+    result = empty_result(point)
+    config = worker_cache_lookup(_worker_config, point_key(point), lambda: SimConfig_variant(SimConfig_path, point))
+    if latency_only:
+        latency = Model_latency(get_structure(network_module, dataset_module, weights_file, config), config,
+                                summary_only=True)
+        latency.calculate_model_latency(mode=latency_mode)
+        result['latency'] = max(latency.layer_finish_time)
+        result['latency_bound'] = latency.latency_error_bound if latency_mode == 3 else 0.0
+        result['time'] = time.time() - start_time
+        return result
+    result['error'] = design_point_error(config)
+    if result['error'] is None:
+        structure = get_structure(network_module, dataset_module, weights_file, config)
+        result.update(network_features(structure))
+        graph = TCG(structure, config, check_tile_num=False)
+        result['tile_num'] = graph.used_tile_num
+        if graph.used_tile_num > graph.tile_total_num:
+            result['error'] = "Tile number is not enough: %d tiles used, %d tiles" % (graph.used_tile_num,
+                                                                                     graph.tile_total_num)
+    if result['error'] is None:
+        # area and power first, they only need the tile characterization
+        evaluation = Model_evaluation(structure, config, TCG_mapping=graph)
+        result['area'] = evaluation.arch_total_area
+        result['power'] = evaluation.arch_total_power
+        if any(result[name] > constraints[name] for name in ['area', 'power'] if name in constraints):
+            result['pruned'] = 'constraint'
+        else:
+            latency = Model_latency(structure, config, TCG_mapping=graph, summary_only=True)
+            latency.calculate_model_latency(mode=latency_mode)
+            evaluation.calculate_model_energy(latency)
+            result['latency'] = max(latency.layer_finish_time)
+            result['latency_bound'] = latency.latency_error_bound if latency_mode == 3 else 0.0
+            result['energy'] = evaluation.arch_total_energy
+    result['time'] = time.time() - start_time
+    return result
+
+
+class design_space_exploration(object):
+    def __init__(self, network_module, SimConfig_path, space, sampler='grid', sample_num=None, seed=0,
+                 dataset_module='MNSIM.Interface.cifar10', weights_file=None, worker_num=None, latency_mode=1,
+                 constraints=None, prune=False, surrogate=None, top_k=None):
+        '''
+        :param space: {parameter: [values]}, parameter: option name (Xbar_Size) or (section, option),
+                      value: as in SimConfig.ini or a tuple, e.g. {'Xbar_Size': [(128, 128), (256, 256)]}
+        :param sampler: 'grid': every combination, 'random' or 'lhs' (Latin hypercube): sample_num points
+        :param worker_num: number of worker processes, default: all the CPUs, 0: in this process
+        :param latency_mode: mode of calculate_model_latency (3: estimate)
+        :param constraints: {'area': um^2, 'power': W, 'latency': ns, 'energy': nJ}, the points exceeding a
+                            constraint are not in the Pareto front, the latency is not computed if the area or
+                            power exceeds its constraint
+        :param prune: branch and bound, the latency (mode latency_mode) is only computed for the points that are
+                      not dominated given their latency estimate (mode 3) and its error bound, with latency_mode 3
+                      the estimates are the results
+        :param surrogate: surrogate_model (Surrogate_model) of the swept parameters, with top_k: only the top_k
+                          points by predicted Pareto rank (latency, energy) are simulated
+        '''
+        self.network_module = network_module
+        self.dataset_module = dataset_module
+        self.weights_file = weights_file
+        self.SimConfig_path = SimConfig_path
+        config = load_SimConfig(SimConfig_path)
+        self.space = collections.OrderedDict((find_option(config, parameter), list(values))
+                                             for parameter, values in space.items())
+        self.parameter_name = collections.OrderedDict(zip(self.space.keys(), space.keys()))
+        self.sampler = sampler
+        self.sample_num = sample_num
+        self.seed = seed
+        self.worker_num = multiprocessing.cpu_count() if worker_num is None else worker_num
+        self.latency_mode = latency_mode
+        self.constraints = dict(constraints) if constraints else {}
+        self.prune = prune
+        self.surrogate = surrogate
+        self.top_k = top_k
+        self.results = []
+            # one result per evaluated point (evaluate_design_point), in completion order
+        self.pareto_front = []
+            # indices (in self.results) of the feasible points not dominated by another point
+        self.skipped = collections.OrderedDict([('constraint', 0), ('dominated', 0), ('surrogate', 0)])
+            # number of points whose latency (mode latency_mode) is not computed, by pruning reason
+
+    def points(self):
+        if self.sampler == 'grid':
+            sampled = grid_sampler(self.space)
+        elif self.sampler == 'random':
+            sampled = random_sampler(self.space, self.sample_num, self.seed)
+        elif self.sampler == 'lhs':
+            sampled = latin_hypercube_sampler(self.space, self.sample_num, self.seed)
+        else:
+            raise ValueError("unknown sampler %s" % self.sampler)
+        # random samples may repeat a point
+        seen = set()
+        for point in sampled:
+            key = point_key(point)
+            if key not in seen:
+                seen.add(key)
+                yield point
+
+    def task(self, point, latency_mode, latency_only=False):
+        return (self.network_module, self.dataset_module, self.weights_file, self.SimConfig_path, point,
+                latency_mode, self.constraints, latency_only)
+
+    def surrogate_rank(self, points):
+        # (top_k points by predicted Pareto rank, results of the other points with the predicted latency and energy)
+        config = load_SimConfig(self.SimConfig_path)
+        feature = network_features(get_structure(self.network_module, self.dataset_module, self.weights_file, config))
+        named_points = [dict(((self.parameter_name[option], value) for option, value in point.items()), **feature)
+                        for point in points]
+        prediction = self.surrogate.predict(named_points)
+        rank = pareto_rank(np.stack([prediction['latency'], prediction['energy']], axis=1))
+        # ties: lowest energy-delay product first
+        order = np.lexsort((prediction['latency'] * prediction['energy'], rank))
+        skipped = []
+        for i in order[self.top_k:]:
+            result = empty_result(points[i])
+            result.update(feature)
+            result['latency'] = float(prediction['latency'][i])
+            result['energy'] = float(prediction['energy'][i])
+            result['pruned'] = 'surrogate'
+            skipped.append(result)
+        return [points[i] for i in order[:self.top_k]], skipped
+
+    def violated(self, result, lower_bound=False):
+        # result exceeds a constraint, lower_bound: for the latency lower bound (estimate - error bound)
+        latency = result['latency'] - result['latency_bound'] if lower_bound else result['latency']
+        value = {'area': result['area'], 'power': result['power'], 'latency': latency, 'energy': result['energy']}
+        return any(value[name] > limit for name, limit in self.constraints.items())
+
+    def dominated(self, result):
+        # result is dominated by a point of the front for any latency within its error bound
+        lower_bound = dict(result, latency=result['latency'] - result['latency_bound'])
+        return any(dominates(self.results[i], lower_bound) for i in self.pareto_front)
+
+    def add_result(self, result):
+        # parameters named as in the space, Pareto front update
+        named_result = collections.OrderedDict((self.parameter_name.get(name, name), value)
+                                               for name, value in result.items())
+        if named_result['error'] is None and named_result['pruned'] is None and self.violated(named_result):
+            named_result['pruned'] = 'constraint'
+        self.results.append(named_result)
+        if named_result['error'] is None and named_result['pruned'] is None and \
+                not any(dominates(self.results[i], named_result) for i in self.pareto_front):
+            self.pareto_front = [i for i in self.pareto_front if not dominates(named_result, self.results[i])]
+            self.pareto_front.append(len(self.results) - 1)
+        return named_result
+
+    def evaluate(self, pool, tasks):
+        # results of the tasks as they complete, a task is only taken from tasks (a generator) when a worker is free
+        if pool is None:
+            for task in tasks:
+                yield evaluate_design_point(task)
+            return
+        done = queue.Queue()
+        pending = 0
+        tasks = iter(tasks)
+        while True:
+            for task in itertools.islice(tasks, self.worker_num - pending):
+                pool.apply_async(evaluate_design_point, (task,), callback=done.put, error_callback=done.put)
+                pending += 1
+            if pending == 0:
+                return
+            result = done.get()
+            pending -= 1
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+
+    def run(self):
+        # generator: yields each result as soon as it is evaluated or pruned
+        points = list(self.points())
+        if self.surrogate is not None and self.top_k is not None:
+            points, skipped = self.surrogate_rank(points)
+            for result in skipped:
+                self.skipped['surrogate'] += 1
+                yield self.add_result(result)
+        pool = multiprocessing.Pool(processes=self.worker_num) if self.worker_num > 0 else None
+        try:
+            if not self.prune:
+                for result in self.evaluate(pool, (self.task(point, self.latency_mode) for point in points)):
+                    if result['pruned'] is not None:
+                        self.skipped[result['pruned']] += 1
+                    yield self.add_result(result)
+                return
+            # bound: area, power, energy (exact) and latency estimate of every point
+            bound = []
+            for result in self.evaluate(pool, (self.task(point, 3) for point in points)):
+                if result['error'] is None and result['pruned'] is None and self.violated(result, True):
+                    result['pruned'] = 'constraint'
+                if result['error'] is not None or result['pruned'] is not None or self.latency_mode == 3:
+                    if result['pruned'] is not None:
+                        self.skipped[result['pruned']] += 1
+                    yield self.add_result(result)
+                else:
+                    bound.append(result)
+            # branch: the lowest latencies first, the front is tight early and prunes more points
+            bound.sort(key=lambda result: result['latency'])
+            skipped = []
+            computed = {}
+                # bound result of each point whose latency is computed, by point_key
+
+            def candidate():
+                for result in bound:
+                    if self.dominated(result):
+                        result['pruned'] = 'dominated'
+                        self.skipped['dominated'] += 1
+                        skipped.append(result)
+                    else:
+                        point = collections.OrderedDict((option, result[option]) for option in self.space)
+                        computed[point_key(point)] = result
+                        yield self.task(point, self.latency_mode, latency_only=True)
+            for latency_result in self.evaluate(pool, candidate()):
+                while skipped:
+                    yield self.add_result(skipped.pop(0))
+                result = computed.pop(point_key(collections.OrderedDict((option, latency_result[option])
+                                                                        for option in self.space)))
+                result['latency'] = latency_result['latency']
+                result['latency_bound'] = latency_result['latency_bound']
+                result['time'] += latency_result['time']
+                yield self.add_result(result)
+            while skipped:
+                yield self.add_result(skipped.pop(0))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def run_all(self):
+        for _ in self.run():
+            pass
+        return self.table()
+
+    def fit_surrogate(self, **kwargs):
+        # surrogate_model of the swept parameters trained on the results, kwargs: parameters of surrogate_model
+        surrogate = surrogate_model(**kwargs)
+        surrogate.fit(self.results, list(self.parameter_name.values()))
+        return surrogate
+
+    def table(self, pareto_only=False):
+        # results as a pandas DataFrame, with a 'pareto' column
+        table = pd.DataFrame(self.results)
+        table['pareto'] = [i in self.pareto_front for i in range(len(self.results))]
+        if pareto_only:
+            table = table[table['pareto']]
+        return table
@@ -0,0 +1,274 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import collections
+import json
+import math
+import numpy as np
+# Surrogate of the design space exploration: gradient-boosted regression trees (NumPy) trained on the results of
+# design_space_exploration predict the latency and energy of a design point from its SimConfig parameters and the
+# features of the network layers (network_features), in a few microseconds per point.
+# The targets are fitted in log space. The error is calibrated on held-out results (split conformal): the exact value
+# is within [prediction / (1 + bound), prediction * (1 + bound)] for a fraction coverage of the design points.
+
+surrogate_version = 1
+# predicted results
+targets = ['latency', 'energy']
+network_feature_names = ['net_layer_num', 'net_conv_num', 'net_fc_num', 'net_pooling_num', 'net_element_num',
+                         'net_weight', 'net_mac', 'net_output']
+
+
+def network_features(NetStruct):
+    # features of the layer parameters of a network, they do not depend on the hardware description
+    feature = collections.OrderedDict((name, 0) for name in network_feature_names)
+    for layer in NetStruct:
+        layer_dict = layer[0][0]
+        feature['net_layer_num'] += 1
+        if layer_dict['type'] == 'conv':
+            weight = int(layer_dict['Inputchannel']) * int(layer_dict['Outputchannel']) * int(layer_dict['Kernelsize']) ** 2
+            output = int(np.prod(list(map(int, layer_dict['Outputsize']))))
+            feature['net_conv_num'] += 1
+            feature['net_weight'] += weight
+            feature['net_mac'] += weight * output
+            feature['net_output'] += output
+        elif layer_dict['type'] == 'fc':
+            weight = int(layer_dict['Infeature']) * int(layer_dict['Outfeature'])
+            feature['net_fc_num'] += 1
+            feature['net_weight'] += weight
+            feature['net_mac'] += weight
+            feature['net_output'] += 1
+        elif layer_dict['type'] == 'pooling':
+            feature['net_pooling_num'] += 1
+        else:
+            feature['net_element_num'] += 1
+    return feature
+
+
+def parameter_value(value):
+    # numbers of a parameter value: 4 -> [4.0], (256, 256) or '256,256' -> [256.0, 256.0]
+    if isinstance(value, (list, tuple)):
+        return [float(v) for v in value]
+    return [float(v) for v in str(value).split(',')]
+
+
+def parameter_label(parameter):
+    # option name of a parameter given by its name or by (section, option)
+    return parameter[1] if isinstance(parameter, tuple) else str(parameter)
+
+
+def design_features(result, parameters):
+    # features of a design point (result of design_space_exploration or point with the network features)
+    feature = collections.OrderedDict()
+    for parameter in parameters:
+        value = parameter_value(result[parameter])
+        if len(value) == 1:
+            feature[parameter_label(parameter)] = value[0]
+        else:
+            for i, v in enumerate(value):
+                feature[parameter_label(parameter) + '_%d' % i] = v
+    for name in network_feature_names:
+        feature[name] = float(result[name])
+    return feature
+
+
+class regression_tree(object):
+    # least-squares regression tree, the nodes are stored in arrays (feature = -1: leaf)
+    def __init__(self, max_depth=3, min_samples_leaf=3):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+
+    def fit(self, x, y):
+        self.feature, self.threshold, self.left, self.right, self.value = [], [], [], [], []
+        self.grow(x, y, np.arange(len(y)), 0)
+        self.feature = np.array(self.feature, dtype=int)
+        self.threshold = np.array(self.threshold, dtype=float)
+        self.left = np.array(self.left, dtype=int)
+        self.right = np.array(self.right, dtype=int)
+        self.value = np.array(self.value, dtype=float)
+        return self
+
+    def best_split(self, x, y, index):
+        # (feature, threshold) of the largest squared error reduction, None if no split is allowed
+        n = len(index)
+        left_num = np.arange(1, n)
+        valid_num = (left_num >= self.min_samples_leaf) & (n - left_num >= self.min_samples_leaf)
+        best_gain = np.sum(y[index]) ** 2 / n * (1 + 1e-12)
+        best = None
+        for f in range(x.shape[1]):
+            order = index[np.argsort(x[index, f], kind='stable')]
+            sorted_x = x[order, f]
+            left_sum = np.cumsum(y[order])[:-1]
+            right_sum = np.sum(y[order]) - left_sum
+            gain = left_sum ** 2 / left_num + right_sum ** 2 / (n - left_num)
+            gain[~(valid_num & (sorted_x[1:] > sorted_x[:-1]))] = -np.inf
+            if len(gain) == 0:
+                continue
+            i = int(np.argmax(gain))
+            if gain[i] > best_gain:
+                best_gain = gain[i]
+                best = (f, (sorted_x[i] + sorted_x[i + 1]) / 2)
+        return best
+
+    def grow(self, x, y, index, depth):
+        node = len(self.value)
+        self.feature.append(-1)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(float(np.mean(y[index])))
+        if depth >= self.max_depth or len(index) < 2 * self.min_samples_leaf:
+            return node
+        split = self.best_split(x, y, index)
+        if split is None:
+            return node
+        feature, threshold = split
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = self.grow(x, y, index[x[index, feature] <= threshold], depth + 1)
+        self.right[node] = self.grow(x, y, index[x[index, feature] > threshold], depth + 1)
+        return node
+
+    def predict(self, x):
+        node = np.zeros(len(x), dtype=int)
+        while True:
+            inner = np.flatnonzero(self.feature[node] >= 0)
+            if len(inner) == 0:
+                return self.value[node]
+            go_left = x[inner, self.feature[node[inner]]] <= self.threshold[node[inner]]
+            node[inner] = np.where(go_left, self.left[node[inner]], self.right[node[inner]])
+
+
+class gradient_boosting(object):
+    # least-squares gradient boosting of regression trees
+    def __init__(self, tree_num=200, learning_rate=0.1, max_depth=3, min_samples_leaf=3):
+        self.tree_num = tree_num
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.base = 0.0
+        self.trees = []
+
+    def fit(self, x, y):
+        self.base = float(np.mean(y))
+        prediction = np.full(len(y), self.base)
+        self.trees = []
+        for _ in range(self.tree_num):
+            tree = regression_tree(self.max_depth, self.min_samples_leaf).fit(x, y - prediction)
+            if len(tree.value) == 1:
+                # no split reduces the residual
+                break
+            prediction += self.learning_rate * tree.predict(x)
+            self.trees.append(tree)
+        return self
+
+    def predict(self, x):
+        prediction = np.full(len(x), self.base)
+        for tree in self.trees:
+            prediction += self.learning_rate * tree.predict(x)
+        return prediction
+
+
+class surrogate_model(object):
+    def __init__(self, tree_num=200, learning_rate=0.1, max_depth=3, min_samples_leaf=3, coverage=0.9,
+                 calibration_ratio=0.2, seed=0):
+        '''
+        :param coverage: fraction of the design points within the calibrated error bound
+        :param calibration_ratio: fraction of the results held out to calibrate the error
+        '''
+        self.tree_num = tree_num
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.coverage = coverage
+        self.calibration_ratio = calibration_ratio
+        self.seed = seed
+        self.parameters = []
+        self.feature_names = []
+        self.model = collections.OrderedDict()
+            # gradient_boosting of each target, log of the target
+        self.calibration = collections.OrderedDict()
+            # error of each target on the held-out results: bound (relative, at coverage), mean and max relative error
+
+    def features(self, results):
+        return np.array([list(design_features(result, self.parameters).values()) for result in results], dtype=float)
+
+    def fit(self, results, parameters):
+        '''
+        :param results: results of design_space_exploration (the infeasible and pruned points are not used),
+                        with the network features (net_*)
+        :param parameters: swept parameters (names of the results)
+        :return: calibration
+        '''
+        results = [result for result in results if result['error'] is None and result['pruned'] is None]
+        assert len(results) >= 10, "at least 10 evaluated design points are needed"
+        self.parameters = list(parameters)
+        self.feature_names = list(design_features(results[0], self.parameters).keys())
+        x = self.features(results)
+        permutation = np.random.RandomState(self.seed).permutation(len(results))
+        calibration_num = max(int(len(results) * self.calibration_ratio), 1)
+        calibration, train = permutation[:calibration_num], permutation[calibration_num:]
+        for target in targets:
+            y = np.log(np.array([result[target] for result in results], dtype=float))
+            self.model[target] = gradient_boosting(self.tree_num, self.learning_rate, self.max_depth,
+                                                   self.min_samples_leaf).fit(x[train], y[train])
+            error = np.sort(np.abs(self.model[target].predict(x[calibration]) - y[calibration]))
+            # conformal quantile of the log error
+            rank = min(int(math.ceil((calibration_num + 1) * self.coverage)), calibration_num) - 1
+            self.calibration[target] = collections.OrderedDict([
+                ('bound', float(np.exp(error[rank]) - 1)), ('coverage', self.coverage),
+                ('mean_error', float(np.mean(np.exp(error) - 1))), ('max_error', float(np.exp(error[-1]) - 1)),
+                ('calibration_num', calibration_num)])
+        return self.calibration
+
+    def predict(self, results):
+        # {target: array}, results: design points with the parameters and the network features
+        x = self.features(results)
+        return collections.OrderedDict((target, np.exp(self.model[target].predict(x))) for target in targets)
+
+    def save(self, path):
+        header = {'version': surrogate_version, 'parameters': self.parameters, 'feature_names': self.feature_names,
+                  'calibration': self.calibration, 'base': {}, 'tree_num': {},
+                  'hyper_parameter': [self.tree_num, self.learning_rate, self.max_depth, self.min_samples_leaf,
+                                      self.coverage, self.calibration_ratio, self.seed]}
+        array = {}
+        for target, model in self.model.items():
+            header['base'][target] = model.base
+            header['tree_num'][target] = len(model.trees)
+            # nodes of the trees concatenated, with the number of nodes of each tree
+            array[target + '_node_num'] = np.array([len(tree.value) for tree in model.trees], dtype=int)
+            for name in ['feature', 'threshold', 'left', 'right', 'value']:
+                array[target + '_' + name] = np.concatenate([getattr(tree, name) for tree in model.trees] +
+                                                            [np.zeros(0)])
+        array['header'] = np.array(json.dumps(header))
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **array)
+
+
+def load_surrogate(path):
+    with np.load(path) as data:
+        header = json.loads(str(data['header']), object_pairs_hook=collections.OrderedDict)
+        assert header['version'] == surrogate_version, "surrogate version %s is not supported" % header['version']
+        array = {name: data[name] for name in data.files}
+    surrogate = surrogate_model(*header['hyper_parameter'])
+    # JSON stores the (section, option) parameters as lists
+    surrogate.parameters = [tuple(parameter) if isinstance(parameter, list) else parameter
+                            for parameter in header['parameters']]
+    surrogate.feature_names = header['feature_names']
+    surrogate.calibration = header['calibration']
+    for target in targets:
+        model = gradient_boosting(surrogate.tree_num, surrogate.learning_rate, surrogate.max_depth,
+                                  surrogate.min_samples_leaf)
+        model.base = header['base'][target]
+        bound = np.concatenate([[0], np.cumsum(array[target + '_node_num'])])
+        for i in range(header['tree_num'][target]):
+            tree = regression_tree(surrogate.max_depth, surrogate.min_samples_leaf)
+            for name, dtype in [('feature', int), ('threshold', float), ('left', int), ('right', int),
+                                ('value', float)]:
+                setattr(tree, name, array[target + '_' + name][bound[i]:bound[i + 1]].astype(dtype))
+            model.trees.append(tree)
+        surrogate.model[target] = model
+    return surrogate
@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import collections
+import os
+import pandas as pd
+from MNSIM.Interface.interface import *
+from MNSIM.Mapping_Model.Tile_connection_graph import TCG
+from MNSIM.Hardware_Model.Buffer import buffer
+from MNSIM.Hardware_Model.Adder import adder
+from MNSIM.Hardware_Model.Multiplier import multiplier
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
+from MNSIM.Hardware_Model.Characterization_cache import collect_attributes
+# Area, power and energy of a mapped network in one pass: the global buffer / adder / multiplier are built once,
+# each distinct tile shape (max_column, max_row, max_PE, max_group, layer type) is characterized once.
+# The results are attributes with the names of Model_area (arch_*_area), Model_inference_power (arch_*_power)
+# and Model_energy (arch_*_energy), which are views of a Model_evaluation.
+
+# module name in the results: tile attribute (tile_<attribute>_area, tile_<attribute>_read_power)
+area_module = [('', ''), ('xbar_', 'xbar_'), ('ADC_', 'ADC_'), ('DAC_', 'DAC_'), ('digital_', 'digital_'),
+               ('adder_', 'adder_'), ('shiftreg_', 'shiftreg_'), ('iReg_', 'iReg_'), ('oReg_', 'oReg_'),
+               ('input_demux_', 'input_demux_'), ('output_mux_', 'output_mux_'), ('jointmodule_', 'jointmodule_'),
+               ('buf_', 'buffer_'), ('pooling_', 'pooling_')]
+power_module = area_module + [('buf_r_', 'buffer_r_'), ('buf_w_', 'buffer_w_')]
+# energy of a module: power * latency (Model_latency.total_<latency>_latency)
+energy_module = [('xbar_', 'xbar'), ('ADC_', 'ADC'), ('DAC_', 'DAC'), ('adder_', 'adder'), ('shiftreg_', 'shiftreg'),
+                 ('iReg_', 'iReg'), ('oReg_', 'oReg'), ('input_demux_', 'input_demux'),
+                 ('output_mux_', 'output_mux'), ('jointmodule_', 'jointmodule'), ('buf_r_', 'buffer_r'),
+                 ('buf_w_', 'buffer_w'), ('pooling_', 'pooling')]
+# read power breakdown of one tile (tile_*_read_power) of each shape, shared by all the evaluations in the process:
+# LRU keyed by (SimConfig digest, max_column, max_row, max_PE, max_group, layer type, input / output buffer sizes),
+# a known shape is a dictionary lookup
+tile_power_memo = collections.OrderedDict()
+tile_power_memo_capacity = 4096
+
+# modules with a total energy (arch_total_<module>energy)
+energy_total_module = ['xbar_', 'ADC_', 'DAC_', 'digital_', 'adder_', 'shiftreg_', 'iReg_', 'input_demux_', 'output_mux_',
+                       'jointmodule_', 'buf_', 'buf_r_', 'buf_w_', 'pooling_']
+
+
+class Model_evaluation():
+    def __init__(self, NetStruct, SimConfig_path, multiple=None, TCG_mapping=None, model_latency=None):
+        # model_latency: computed Model_latency, the energy is only computed with it (calculate_model_energy)
+        self.NetStruct = NetStruct
+        self.SimConfig_path = SimConfig_path
+        if multiple is None:
+            multiple = [1] * len(self.NetStruct)
+        if TCG_mapping is None:
+            TCG_mapping = TCG(NetStruct, SimConfig_path, multiple)
+        self.graph = TCG_mapping
+        self.total_layer_num = self.graph.layer_num
+        self.tile_shape_num = 0
+            # number of characterized tile shapes
+        self.global_buf = buffer(SimConfig_path=self.SimConfig_path, buf_level=1,
+                                 default_buf_size=self.graph.global_buf_size)
+        self.global_buf.calculate_buf_area()
+        self.global_buf.calculate_buf_read_power()
+        self.global_buf.calculate_buf_write_power()
+        self.global_add = adder(SimConfig_path=self.SimConfig_path, bitwidth=self.graph.global_adder_bitwidth)
+        self.global_add.calculate_adder_area()
+        self.global_add.calculate_adder_power()
+        self.global_mul = multiplier(SimConfig_path=self.SimConfig_path, bitwidth=self.graph.global_multiplier_bitwidth)
+        self.calculate_model_area()
+        self.calculate_model_power()
+        self.model_latency = None
+        if model_latency is not None:
+            self.calculate_model_energy(model_latency)
+
+    def calculate_model_area(self):
+        self.graph.tile.calculate_tile_area_cached(SimConfig_path=self.SimConfig_path,
+                                                   default_inbuf_size=self.graph.max_inbuf_size,
+                                                   default_outbuf_size=self.graph.max_outbuf_size)
+        for name, attribute in area_module:
+            tile_area = getattr(self.graph.tile, 'tile_' + attribute + 'area')
+            setattr(self, 'arch_' + name + 'area', [tile_area * self.graph.layer_tileinfo[i]['tilenum']
+                                                    for i in range(self.total_layer_num)])
+        for name, attribute in area_module:
+            setattr(self, 'arch_total_' + name + 'area', sum(getattr(self, 'arch_' + name + 'area')))
+        self.arch_total_digital_area += self.global_add.adder_area * self.graph.global_adder_num
+        self.arch_total_adder_area += self.global_add.adder_area * self.graph.global_adder_num
+        self.arch_total_buf_area += self.global_buf.buf_area
+
+    def tile_shape(self, layer_id):
+        tileinfo = self.graph.layer_tileinfo[layer_id]
+        return (tileinfo['max_column'], tileinfo['max_row'], tileinfo['max_PE'], tileinfo['max_group'],
+                self.graph.net[layer_id][0][0]['type'])
+
+    def tile_read_power(self, shape, config_digest):
+        # read power breakdown of one tile of a shape (tile_power_memo), characterized on the first use
+        key = (config_digest,) + shape + (self.graph.max_inbuf_size, self.graph.max_outbuf_size)
+        power = tile_power_memo.get(key)
+        if power is not None:
+            tile_power_memo.move_to_end(key)
+            return power
+        max_column, max_row, max_PE, max_group, layer_type = shape
+        self.graph.tile.calculate_tile_read_power_fast(max_column=max_column, max_row=max_row, max_PE=max_PE,
+                                                       max_group=max_group, layer_type=layer_type,
+                                                       SimConfig_path=self.SimConfig_path,
+                                                       default_inbuf_size=self.graph.max_inbuf_size,
+                                                       default_outbuf_size=self.graph.max_outbuf_size)
+        power = collect_attributes(self.graph.tile, 'tile_', '_read_power')
+        tile_power_memo[key] = power
+        if len(tile_power_memo) > tile_power_memo_capacity:
+            tile_power_memo.popitem(last=False)
+        return power
+
+    def calculate_model_power(self):
+        # read power of one tile of each distinct shape
+        config_digest = load_SimConfig(self.SimConfig_path).digest()
+        shape_power = {}
+        for i in range(self.total_layer_num):
+            shape = self.tile_shape(i)
+            if shape not in shape_power:
+                shape_power[shape] = self.tile_read_power(shape, config_digest)
+        self.tile_shape_num = len(shape_power)
+        for name, attribute in power_module:
+            setattr(self, 'arch_' + name + 'power',
+                    [shape_power[self.tile_shape(i)]['tile_' + attribute + 'read_power'] *
+                     self.graph.layer_tileinfo[i]['tilenum'] for i in range(self.total_layer_num)])
+        for name, attribute in power_module:
+            setattr(self, 'arch_total_' + name + 'power', sum(getattr(self, 'arch_' + name + 'power')))
+        self.arch_total_digital_power += self.global_add.adder_power * self.graph.global_adder_num
+        self.arch_total_adder_power += self.global_add.adder_power * self.graph.global_adder_num
+        self.arch_total_buf_power += (self.global_buf.buf_wpower + self.global_buf.buf_rpower) * 1e-3
+        self.arch_total_buf_r_power += self.global_buf.buf_rpower * 1e-3
+        self.arch_total_buf_w_power += self.global_buf.buf_wpower * 1e-3
+
+    def calculate_model_energy(self, model_latency):
+        # energy of each module: power * latency of the layer
+        self.model_latency = model_latency
+        modelL_config = load_SimConfig(self.SimConfig_path)
+        NoC_Compute = int(modelL_config.get('Algorithm Configuration', 'NoC_enable'))
+        if NoC_Compute == 1:
+            path = os.getcwd() + '/Final_Results/'
+            data = pd.read_csv(path + 'Energy.csv')
+            self.arch_Noc_energy = float(data.columns[0].split(' ')[-2]) * 1e-3
+        else:
+            self.arch_Noc_energy = 0
+        for name, latency in energy_module:
+            power = getattr(self, 'arch_' + name + 'power')
+            latency = getattr(model_latency, 'total_' + latency + '_latency')
+            setattr(self, 'arch_' + name + 'energy', [power[i] * latency[i] for i in range(self.total_layer_num)])
+        self.arch_buf_energy = [self.arch_buf_r_energy[i] + self.arch_buf_w_energy[i] for i in range(self.total_layer_num)]
+        self.arch_digital_energy = [self.arch_shiftreg_energy[i] + self.arch_iReg_energy[i] + self.arch_oReg_energy[i] +
+                                    self.arch_input_demux_energy[i] + self.arch_output_mux_energy[i] +
+                                    self.arch_jointmodule_energy[i] for i in range(self.total_layer_num)]
+        self.arch_energy = [self.arch_xbar_energy[i] + self.arch_ADC_energy[i] + self.arch_DAC_energy[i] +
+                            self.arch_digital_energy[i] + self.arch_buf_energy[i] + self.arch_pooling_energy[i]
+                            for i in range(self.total_layer_num)]
+        self.arch_total_energy = sum(self.arch_energy) + self.arch_Noc_energy
+        for name in energy_total_module:
+            setattr(self, 'arch_total_' + name + 'energy', sum(getattr(self, 'arch_' + name + 'energy')))
+        global_add_energy = self.global_add.adder_power * self.graph.global_adder_num * self.global_add.adder_latency
+        self.arch_total_digital_energy += global_add_energy
+        self.arch_total_adder_energy += global_add_energy
+        self.arch_total_buf_energy = self.arch_total_buf_energy + self.global_buf.buf_rpower * 1e-3 * self.global_buf.buf_rlatency \
+                                     + self.global_buf.buf_wpower * 1e-3 * self.global_buf.buf_wlatency
+        self.arch_total_buf_r_energy += self.global_buf.buf_rpower * 1e-3 * self.global_buf.buf_rlatency
+        self.arch_total_buf_w_energy += self.global_buf.buf_wpower * 1e-3 * self.global_buf.buf_wlatency
+
+    def results(self):
+        # totals: {'area': {'total': um^2, module: um^2}, 'power': {... W}, 'energy': {... nJ}}
+        result = collections.OrderedDict()
+        for kind, module in [('area', [name for name, _ in area_module]), ('power', [name for name, _ in power_module]),
+                             ('energy', [''] + energy_total_module)]:
+            if kind == 'energy' and self.model_latency is None:
+                continue
+            result[kind] = collections.OrderedDict()
+            for name in module:
+                result[kind][name.rstrip('_') or 'total'] = getattr(self, 'arch_total_' + name + kind)
+        return result
@@ -3,14 +3,14 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 
 class ADC(object):
 	def __init__(self, SimConfig_path):
-		ADC_config = cp.ConfigParser()
-		ADC_config.read(SimConfig_path, encoding='UTF-8')
+		ADC_config = load_SimConfig(SimConfig_path)
 		self.PIM_type_adc = int(ADC_config.get('Process element level', 'PIM_Type'))
 		self.ADC_choice = int(ADC_config.get('Interface level', 'ADC_Choice'))
 		if self.PIM_type_adc == 1 and self.ADC_choice != -1:
@@ -132,8 +132,7 @@ class ADC(object):
 
 	def config_ADC_interval(self, SimConfig_path, WL_num = 0):
 		if self.ADC_interval[0] == -1: #User defined
-			ADC_config = cp.ConfigParser()
-			ADC_config.read(SimConfig_path, encoding='UTF-8')
+			ADC_config = load_SimConfig(SimConfig_path)
 			self.ADC_interval = (2**self.ADC_precision-1) * [0.0]
 			V_in = list(map(float, ADC_config.get('Device level', 'Read_Voltage').split(',')))
 			R = list(map(float, ADC_config.get('Device level', 'Device_Resistance').split(',')))
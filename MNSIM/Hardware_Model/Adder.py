@@ -3,6 +3,7 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
@@ -10,8 +11,7 @@ test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd()))
 class adder(object):
 	def __init__(self, SimConfig_path, bitwidth = None):
 		# frequency unit: MHz
-		adder_config = cp.ConfigParser()
-		adder_config.read(SimConfig_path, encoding='UTF-8')
+		adder_config = load_SimConfig(SimConfig_path)
 		self.adder_tech = int(adder_config.get('Digital module', 'Adder_Tech'))
 		self.adder_area = float(adder_config.get('Digital module', 'Adder_Area'))
 		self.adder_power = float(adder_config.get('Digital module', 'Adder_Power'))
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import os
+import json
+import hashlib
+import numbers
+import collections
+import numpy as np
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
+# Characterization cache: tile/PE area, power and latency characterizations are pure functions of
+# the SimConfig contents and a few shape arguments, so they are kept in an in-memory LRU
+# and, if MNSIM_CHAR_CACHE_DIR is set, in an on-disk store shared by successive runs (main.py, maxcut_main.py,
+# design sweeps). The on-disk entries are stored per digest of the hardware and latency model sources
+# (source_digest): an entry computed by another version of the models is never read.
+
+char_cache_version = 1
+hardware_sections = ['Device level', 'Crossbar level', 'Interface level', 'Process element level',
+	'Digital module', 'Tile level', 'Architecture level', 'Algorithm Configuration']
+default_cache_dir = os.environ.get('MNSIM_CHAR_CACHE_DIR')
+	# on-disk store, off unless MNSIM_CHAR_CACHE_DIR is set
+source_dirs = [os.path.dirname(os.path.abspath(__file__)),
+	os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Latency_Model')]
+	# the characterizations are computed by the hardware models and the tile latency models
+_source_digest = None
+
+
+def source_digest():
+	# SHA-1 of the model sources (source_dirs), computed once per process
+	global _source_digest
+	if _source_digest is None:
+		digest = hashlib.sha1(str(char_cache_version).encode('utf-8'))
+		for source_dir in source_dirs:
+			for file_name in sorted(os.listdir(source_dir)):
+				if file_name.endswith('.py'):
+					with open(os.path.join(source_dir, file_name), 'rb') as f:
+						digest.update(file_name.encode('utf-8'))
+						digest.update(f.read())
+		_source_digest = digest.hexdigest()
+	return _source_digest
+
+
+class characterization_cache(object):
+	def __init__(self, capacity = 1024, cache_dir = default_cache_dir):
+		# capacity: number of entries kept in memory
+		# cache_dir: directory of the on-disk store, None: memory only (default unless MNSIM_CHAR_CACHE_DIR is set)
+		self.capacity = capacity
+		self.cache_dir = cache_dir
+		self.entries = collections.OrderedDict()
+		self.hit = 0
+		self.disk_hit = 0
+		self.miss = 0
+
+	def key(self, name, SimConfig_path, args, sections = None):
+		config = load_SimConfig(SimConfig_path)
+		if sections is None:
+			sections = hardware_sections
+		description = json.dumps([char_cache_version, name, list(args), config.digest(sections)], sort_keys=True,
+			default=str)
+		return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+	def lookup(self, name, SimConfig_path, args, compute, sections = None):
+		# name: characterization name, args: shape arguments of the characterization
+		# compute: function returning a dict {attribute: value} when the entry is missing
+		key = self.key(name, SimConfig_path, args, sections)
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			self.hit += 1
+			return self.entries[key]
+		result = self.disk_load(key)
+		if result is not None:
+			self.disk_hit += 1
+		else:
+			self.miss += 1
+			result = compute()
+			self.disk_store(key, name, result)
+		self.entries[key] = result
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+		return result
+
+	def disk_path(self, key):
+		# entries of the current model sources, in a subdirectory of cache_dir
+		return os.path.join(self.cache_dir, source_digest(), key + '.json')
+
+	def disk_load(self, key):
+		if self.cache_dir is None:
+			return None
+		try:
+			with open(self.disk_path(key), 'r', encoding='UTF-8') as f:
+				return json.load(f)['result']
+		except (OSError, ValueError, KeyError):
+			return None
+
+	def disk_store(self, key, name, result):
+		if self.cache_dir is None:
+			return
+		try:
+			file_path = self.disk_path(key)
+			os.makedirs(os.path.dirname(file_path), exist_ok=True)
+			temp_path = file_path + '.%d.tmp' % os.getpid()
+			with open(temp_path, 'w', encoding='UTF-8') as f:
+				json.dump({'name': name, 'version': char_cache_version, 'source': source_digest(), 'result': result}, f)
+			os.replace(temp_path, file_path)
+		except OSError:
+			# the on-disk store is only an accelerator, a read-only or full disk is not an error
+			pass
+
+	def clear(self, disk = False):
+		self.entries.clear()
+		if disk and self.cache_dir is not None and os.path.isdir(self.cache_dir):
+			# entries of every model source version
+			for dir_path, _, file_names in os.walk(self.cache_dir):
+				for file_name in file_names:
+					if file_name.endswith('.json'):
+						os.remove(os.path.join(dir_path, file_name))
+
+	def cache_output(self):
+		print("characterization cache: memory hit", self.hit, ", disk hit", self.disk_hit, ", miss", self.miss)
+
+
+char_cache = characterization_cache()
+
+
+def collect_attributes(obj, prefix = '', suffix = ''):
+	# snapshot of the numeric attributes of obj named prefix*suffix, numpy scalars are stored as Python numbers
+	result = {}
+	for name, value in vars(obj).items():
+		if name.startswith(prefix) and name.endswith(suffix) and \
+				isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)):
+			result[name] = value.item() if isinstance(value, np.generic) else value
+	return result
+
+
+def restore_attributes(obj, result):
+	for name, value in result.items():
+		setattr(obj, name, value)
@@ -4,6 +4,7 @@ import configparser as cp
 import os
 import math
 from MNSIM.Hardware_Model.Device import device
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 import numpy as np
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 # Default SimConfig file path: MNSIM_Python/SimConfig.ini
@@ -12,8 +13,7 @@ test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd()))
 class crossbar(device):
 	def __init__(self, SimConfig_path):
 		device.__init__(self,SimConfig_path)
-		xbar_config = cp.ConfigParser()
-		xbar_config.read(SimConfig_path, encoding='UTF-8')
+		xbar_config = load_SimConfig(SimConfig_path)
 		self.xbar_size = list(map(int, xbar_config.get('Crossbar level', 'Xbar_Size').split(',')))
 		self.xbar_row = int(self.xbar_size[0])
 		self.xbar_column = int(self.xbar_size[1])
@@ -3,14 +3,14 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 
 class DAC(object):
 	def __init__(self, SimConfig_path):
-		DAC_config = cp.ConfigParser()
-		DAC_config.read(SimConfig_path, encoding='UTF-8')
+		DAC_config = load_SimConfig(SimConfig_path)
 		self.PIM_type_dac = int(DAC_config.get('Process element level', 'PIM_Type'))
 		self.DAC_choice = int(DAC_config.get('Interface level', 'DAC_Choice'))
 		if self.PIM_type_dac == 1 and self.DAC_choice != -1:
@@ -3,14 +3,14 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 # Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 
 class device(object):
 	def __init__(self, SimConfig_path):
-		device_config = cp.ConfigParser()
-		device_config.read(SimConfig_path, encoding='UTF-8')
+		device_config = load_SimConfig(SimConfig_path)
 		self.device_tech = float(device_config.get('Device level', 'Device_Tech'))
 		self.device_type = device_config.get('Device level', 'Device_Type')
 		self.device_area = float(device_config.get('Device level', 'Device_Area'))
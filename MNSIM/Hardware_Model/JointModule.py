@@ -3,14 +3,14 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
     #Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 class JointModule(object):
     def __init__(self, SimConfig_path, max_bitwidth = None):
         # frequency unit: MHz
-        jointmodule_config = cp.ConfigParser()
-        jointmodule_config.read(SimConfig_path, encoding='UTF-8')
+        jointmodule_config = load_SimConfig(SimConfig_path)
         self.jointmodule_tech = int(jointmodule_config.get('Digital module', 'JointModule_Tech'))
         if self.jointmodule_tech <= 0:
             self.jointmodule_tech = 65
@@ -4,6 +4,7 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
@@ -11,8 +12,7 @@ test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd()))
 class multiplier(object):
 	def __init__(self, SimConfig_path, bitwidth = None):
 		# frequency unit: MHz
-		multiplier_config = cp.ConfigParser()
-		multiplier_config.read(SimConfig_path, encoding='UTF-8')
+		multiplier_config = load_SimConfig(SimConfig_path)
 		self.multiplier_tech = int(multiplier_config.get('Digital module', 'Multiplier_Tech'))
 		self.multiplier_area = float(multiplier_config.get('Digital module', 'Multiplier_Area'))
 		self.multiplier_power = float(multiplier_config.get('Digital module', 'Multiplier_Power'))
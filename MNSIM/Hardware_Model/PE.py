@@ -16,18 +16,21 @@ from MNSIM.Hardware_Model.Adder import adder
 from MNSIM.Hardware_Model.ShiftReg import shiftreg
 from MNSIM.Hardware_Model.Reg import reg
 from MNSIM.Hardware_Model.Buffer import buffer
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig, get_prototype
 test_SimConfig_path = os.path.join(work_path,"SimConfig.ini")
 # print(test_SimConfig_path)
 # Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 
 class ProcessElement(crossbar, DAC, ADC):
-	def __init__(self, SimConfig_path):
+	def __init__(self, SimConfig_path, flyweight = True):
+		# flyweight: identical crossbars share one prototype until per-instance state is written
 		crossbar.__init__(self, SimConfig_path)
 		DAC.__init__(self, SimConfig_path)
 		ADC.__init__(self, SimConfig_path)
-		PE_config = cp.ConfigParser()
-		PE_config.read(SimConfig_path, encoding='UTF-8')
+		PE_config = load_SimConfig(SimConfig_path)
+		self.SimConfig_path = SimConfig_path
+		self.PE_flyweight = flyweight
 		self.PIM_type_pe = int(PE_config.get('Process element level', 'PIM_Type'))
 		self.sub_position = 0
 		__xbar_polarity = int(PE_config.get('Process element level', 'Xbar_Polarity'))
@@ -54,7 +57,10 @@ class ProcessElement(crossbar, DAC, ADC):
 			self.PE_xbar_list.append([])
 			self.PE_xbar_enable.append([])
 			for j in range(self.PE_multiplex_xbar_num[0] * self.PE_multiplex_xbar_num[1]):
-				__xbar = crossbar(SimConfig_path)
+				if flyweight:
+					__xbar = get_prototype(crossbar, SimConfig_path)
+				else:
+					__xbar = crossbar(SimConfig_path)
 				self.PE_xbar_list[i].append(__xbar)
 				self.PE_xbar_enable[i].append(0)
 
@@ -248,10 +254,19 @@ class ProcessElement(crossbar, DAC, ADC):
 			self.PE_adder_num += int(temp/2)*self.subarray_num
 			temp = int(temp/2) + temp%2
 
+	def materialize_xbar(self):
+		# replace the shared prototype crossbars by private instances
+		if self.PE_flyweight:
+			for i in range(len(self.PE_xbar_list)):
+				for j in range(len(self.PE_xbar_list[i])):
+					self.PE_xbar_list[i][j] = crossbar(self.SimConfig_path)
+			self.PE_flyweight = False
+
 	def PE_read_config(self, read_row = None, read_column = None, read_matrix = None, read_vector = None):
 		# read_row and read_column are lists with the length of #occupied groups
 		# read_matrix is a 2D list of matrices. The size of the list is (#occupied groups x Xbar_Polarity)
 		# read_vector is a list of vectors with the length of #occupied groups
+		self.materialize_xbar()
 		self.PE_utilization = 0
 		if self.PE_simulation_level == 0:
 			if (read_row is None) or (read_column is None):
@@ -358,6 +373,7 @@ class ProcessElement(crossbar, DAC, ADC):
 		# write_row and write_column are array with the length of #occupied groups
 		# write_matrix is a 2D array of matrices. The size of the list is (#occupied groups x Xbar_Polarity)
 		# write_vector is a array of vector with the length of #occupied groups
+		self.materialize_xbar()
 		if self.PE_simulation_level == 0:
 			if (write_row is None) or (write_column is None):
 				self.num_occupied_group = self.group_num
@@ -646,8 +662,7 @@ class ProcessElement(crossbar, DAC, ADC):
 			self.PE_read_power = self.PE_xbar_read_power + self.PE_DAC_read_power + self.PE_ADC_read_power + self.PE_digital_read_power
 
 	def calculate_PE_energy_efficiency(self, SimConfig_path=None):
-		PE_config = cp.ConfigParser()
-		PE_config.read(SimConfig_path, encoding='UTF-8')
+		PE_config = load_SimConfig(SimConfig_path)
 		self.digital_period = 1/float(PE_config.get('Digital module', 'Digital_Frequency'))*1e3
 		multiple_time = math.ceil(8/self.DAC_precision)
 		decoder1_8 = 0.27933
@@ -3,12 +3,12 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 
 class Pooling(object):
     def __init__(self, SimConfig_path):
-        Pooling_config = cp.ConfigParser()
-        Pooling_config.read(SimConfig_path, encoding='UTF-8')
+        Pooling_config = load_SimConfig(SimConfig_path)
         # self.Pooling_choice = Pooling_config.get()
 
         self.Pooling_unit_num = int(Pooling_config.get('Tile level', 'Pooling_unit_num'))
@@ -3,6 +3,7 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
@@ -10,8 +11,7 @@ test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd()))
 class reg(object):
 	def __init__(self, SimConfig_path, bitwidth = None):
 		# frequency unit: MHz
-		reg_config = cp.ConfigParser()
-		reg_config.read(SimConfig_path, encoding='UTF-8')
+		reg_config = load_SimConfig(SimConfig_path)
 		self.reg_tech = int(reg_config.get('Digital module', 'Reg_Tech'))
 		if self.reg_tech <= 0:
 			self.reg_tech = 65
@@ -3,6 +3,7 @@
 import configparser as cp
 import os
 import math
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 	#Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
@@ -10,8 +11,7 @@ test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd()))
 class shiftreg(object):
 	def __init__(self, SimConfig_path, max_shiftbase = None):
 		# frequency unit: MHz
-		shiftreg_config = cp.ConfigParser()
-		shiftreg_config.read(SimConfig_path, encoding='UTF-8')
+		shiftreg_config = load_SimConfig(SimConfig_path)
 		self.shiftreg_tech = int(shiftreg_config.get('Digital module', 'ShiftReg_Tech'))
 		if self.shiftreg_tech <= 0:
 			self.shiftreg_tech = 65
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import configparser as cp
+import os
+import collections
+import json
+import hashlib
+from types import MappingProxyType
+test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
+# Default SimConfig file path: MNSIM_Python/SimConfig.ini
+
+# Parsed configurations are shared process-wide, keyed by (absolute path, mtime)
+# Only the parse is shared: the options are stored as the strings of the file, get() returns them as
+# configparser does and the hardware models convert them (int(), float(), split(',')) where they read them.
+# The typed accessors (getint/getfloat/getlist) convert an option once per configuration.
+SimConfig_registry_enable = True
+_SimConfig_registry = {}
+
+
+class SimConfig(object):
+	# Immutable, parsed view of one SimConfig.ini file.
+	# get() mirrors configparser.ConfigParser.get, so hardware models can use it in place of a parser.
+	read_count = 0
+		# number of times a SimConfig file has been parsed in this process
+
+	def __init__(self, SimConfig_path, overrides=None):
+		# overrides: {(section, option): value}, options replaced in memory (SimConfig_variant)
+		config = cp.ConfigParser()
+		config.read(SimConfig_path, encoding='UTF-8')
+		SimConfig.read_count += 1
+		sections = {}
+		for section in config.sections():
+			sections[section] = dict(config.items(section))
+		if overrides:
+			for (section, option), value in overrides.items():
+				if section not in sections:
+					raise cp.NoSectionError(section)
+				sections[section][option.lower()] = format_option(value)
+		for section in sections:
+			sections[section] = MappingProxyType(sections[section])
+		object.__setattr__(self, 'path', SimConfig_path)
+		object.__setattr__(self, 'overrides', dict(overrides) if overrides else {})
+		object.__setattr__(self, '_digest', {})
+		object.__setattr__(self, '_typed', {})
+		object.__setattr__(self, '_sections', MappingProxyType(sections))
+
+	def __setattr__(self, name, value):
+		raise AttributeError("SimConfig is immutable")
+
+	def __delattr__(self, name):
+		raise AttributeError("SimConfig is immutable")
+
+	def __repr__(self):
+		if self.overrides:
+			return "SimConfig(%r, overrides=%r)" % (self.path, self.overrides)
+		return "SimConfig(%r)" % self.path
+
+	def sections(self):
+		return list(self._sections.keys())
+
+	def has_section(self, section):
+		return section in self._sections
+
+	def has_option(self, section, option):
+		return section in self._sections and option.lower() in self._sections[section]
+
+	def items(self, section):
+		if section not in self._sections:
+			raise cp.NoSectionError(section)
+		return list(self._sections[section].items())
+
+	def get(self, section, option, fallback=cp._UNSET):
+		if section not in self._sections:
+			if fallback is cp._UNSET:
+				raise cp.NoSectionError(section)
+			return fallback
+		value = self._sections[section].get(option.lower())
+		if value is None:
+			if fallback is cp._UNSET:
+				raise cp.NoOptionError(option, section)
+			return fallback
+		return value
+
+	def digest(self, sections=None):
+		# sha1 of the options of sections (default: all), computed once per parsed configuration
+		key = None if sections is None else tuple(sections)
+		if key not in self._digest:
+			if sections is None:
+				sections = self.sections()
+			items = [[section, sorted(self.items(section))] for section in sections if self.has_section(section)]
+			self._digest[key] = hashlib.sha1(json.dumps(items, sort_keys=True).encode('utf-8')).hexdigest()
+		return self._digest[key]
+
+	def typed(self, section, option, kind, convert):
+		# value of an option converted once by convert, cached per (section, option, kind)
+		key = (section, option.lower(), kind)
+		if key not in self._typed:
+			self._typed[key] = convert(self.get(section, option))
+		return self._typed[key]
+
+	def getint(self, section, option):
+		return self.typed(section, option, int, int)
+
+	def getfloat(self, section, option):
+		return self.typed(section, option, float, float)
+
+	def getlist(self, section, option, dtype=int):
+		# comma separated values, e.g. Xbar_Size = 256,256; a new list on each call, the callers may modify it
+		return list(self.typed(section, option, ('list', dtype),
+			lambda value: tuple(map(dtype, value.split(',')))))
+
+
+def format_option(value):
+	# option value as written in SimConfig.ini: (256, 256) -> '256,256'
+	if isinstance(value, (list, tuple)):
+		return ','.join(map(str, value))
+	return str(value)
+
+
+def find_option(SimConfig_path, option):
+	# (section, option) of an option name, the name must be in a single section (e.g. Tile_outBuf_Size is not)
+	if isinstance(option, tuple):
+		return option
+	config = load_SimConfig(SimConfig_path)
+	sections = [section for section in config.sections() if config.has_option(section, option)]
+	if len(sections) != 1:
+		raise KeyError("option %s is in %d sections, use (section, option)" % (option, len(sections)))
+	return (sections[0], option)
+
+
+def SimConfig_variant(SimConfig_path, overrides):
+	# in-memory copy of a SimConfig with some options replaced, e.g. {'Xbar_Size': (128, 128), 'ADC_Choice': 4}
+	# an option is given by its name or by (section, option); the SimConfig file is not modified
+	config = load_SimConfig(SimConfig_path)
+	variant_overrides = dict(config.overrides)
+	for option, value in overrides.items():
+		variant_overrides[find_option(config, option)] = value
+	return SimConfig(config.path, variant_overrides)
+
+
+def load_SimConfig(SimConfig_path):
+	# SimConfig_path: path of SimConfig.ini, or an already parsed SimConfig object
+	if isinstance(SimConfig_path, SimConfig):
+		return SimConfig_path
+	if not SimConfig_registry_enable:
+		return SimConfig(SimConfig_path)
+	abs_path = os.path.abspath(SimConfig_path)
+	try:
+		mtime = os.stat(abs_path).st_mtime_ns
+	except OSError:
+		mtime = None
+	key = (abs_path, mtime)
+	config = _SimConfig_registry.get(key)
+	if config is None:
+		config = SimConfig(SimConfig_path)
+		_SimConfig_registry[key] = config
+	return config
+
+
+def clear_SimConfig_registry():
+	_SimConfig_registry.clear()
+	_prototype_registry.clear()
+
+
+# Shared (flyweight) hardware instances, keyed by (class, digest of the configuration): the in-memory variants
+# with the same options (SimConfig_variant) share them. LRU of prototype_registry_capacity entries, an evicted
+# prototype stays alive as long as the hardware models referencing it.
+prototype_registry_capacity = 256
+_prototype_registry = collections.OrderedDict()
+
+
+def get_prototype(cls, SimConfig_path):
+	# returns one shared, read-only instance of cls for this configuration
+	# callers must replace it by a private instance before writing per-instance state
+	config = load_SimConfig(SimConfig_path)
+	key = (cls, config.digest())
+	prototype = _prototype_registry.get(key)
+	if prototype is None:
+		prototype = cls(config)
+		_prototype_registry[key] = prototype
+		if len(_prototype_registry) > prototype_registry_capacity:
+			_prototype_registry.popitem(last=False)
+	else:
+		_prototype_registry.move_to_end(key)
+	return prototype
+
+
+def SimConfig_test():
+	print("load file:", test_SimConfig_path)
+	_config = load_SimConfig(test_SimConfig_path)
+	print(_config.sections())
+	assert load_SimConfig(test_SimConfig_path) is _config
+	print("read count:", SimConfig.read_count)
+
+
+if __name__ == '__main__':
+	SimConfig_test()
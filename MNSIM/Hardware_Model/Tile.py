@@ -12,16 +12,18 @@ from MNSIM.Hardware_Model.ShiftReg import shiftreg
 from MNSIM.Hardware_Model.Reg import reg
 from MNSIM.Hardware_Model.JointModule import JointModule
 from MNSIM.Hardware_Model.Pooling import Pooling
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig, get_prototype
+from MNSIM.Hardware_Model.Characterization_cache import char_cache, collect_attributes, restore_attributes
 test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())),"SimConfig.ini")
 # Default SimConfig file path: MNSIM_Python/SimConfig.ini
 
 
 class tile(ProcessElement):
-	def __init__(self, SimConfig_path):
+	def __init__(self, SimConfig_path, flyweight = True):
 		# layer_num is a list with the size of 1xPE_num
-		ProcessElement.__init__(self, SimConfig_path)
-		tile_config = cp.ConfigParser()
-		tile_config.read(SimConfig_path, encoding='UTF-8')
+		# flyweight: identical PEs share one prototype until tile_read_config writes per-PE state
+		ProcessElement.__init__(self, SimConfig_path, flyweight)
+		tile_config = load_SimConfig(SimConfig_path)
 		self.tile_PE_num = list(map(int, tile_config.get('Tile level', 'PE_Num').split(',')))
 		if self.tile_PE_num[0] == 0:
 			self.tile_PE_num[0] = 4
@@ -32,13 +34,21 @@ class tile(ProcessElement):
 		self.tile_simulation_level = int(tile_config.get('Algorithm Configuration', 'Simulation_Level'))
 		self.tile_PE_list = []
 		self.tile_PE_enable = []
+		self.tile_PE_shared = []
+		self.tile_PE_private = None
+			# private PE of the tile computing the buffer-size dependent results of the shared prototype PEs
 		for i in range(self.tile_PE_num[0]):
 			self.tile_PE_list.append([])
 			self.tile_PE_enable.append([])
+			self.tile_PE_shared.append([])
 			for j in range(self.tile_PE_num[1]):
-				__PE = ProcessElement(SimConfig_path)
+				if flyweight:
+					__PE = get_prototype(ProcessElement, SimConfig_path)
+				else:
+					__PE = ProcessElement(SimConfig_path)
 				self.tile_PE_list[i].append(__PE)
 				self.tile_PE_enable[i].append(0)
+				self.tile_PE_shared[i].append(flyweight)
 		self.layer_type = 'conv'
 		self.tile_layer_num = 0
 		self.tile_activation_precision = 0
@@ -166,6 +176,22 @@ class tile(ProcessElement):
 		self.tile_shiftreg_num = temp_num
 		self.tile_jointmodule_num = temp_num
 
+	def materialize_PE(self, i, j):
+		# replace the shared prototype PE at (i, j) by a private instance before configuring it
+		if self.tile_PE_shared[i][j]:
+			self.tile_PE_list[i][j] = ProcessElement(self.SimConfig_path)
+			self.tile_PE_shared[i][j] = False
+		return self.tile_PE_list[i][j]
+
+	def private_PE(self, i, j):
+		# PE at (i, j) for a calculation writing per-instance state (e.g. inbuf): the PE itself if it is private,
+		# the private PE of the tile (same configuration) if it is the shared prototype
+		if not self.tile_PE_shared[i][j]:
+			return self.tile_PE_list[i][j]
+		if self.tile_PE_private is None:
+			self.tile_PE_private = ProcessElement(self.SimConfig_path)
+		return self.tile_PE_private
+
 	def update_tile_buf_size(self, SimConfig_path, default_buf_size = 16):
 		self.tile_buffer = buffer(SimConfig_path=SimConfig_path, default_buf_size=default_buf_size)
 
@@ -194,18 +220,19 @@ class tile(ProcessElement):
 
 		for i in range(self.tile_PE_num[0]):
 			for j in range(self.tile_PE_num[1]):
-				self.tile_PE_list[i][j].calculate_PE_area(SimConfig_path=SimConfig_path, default_inbuf_size = default_inbuf_size)
-				self.tile_xbar_area += self.tile_PE_list[i][j].PE_xbar_area
-				self.tile_ADC_area += self.tile_PE_list[i][j].PE_ADC_area
-				self.tile_DAC_area += self.tile_PE_list[i][j].PE_DAC_area
-				# self.tile_digital_area += self.tile_PE_list[i][j].PE_digital_area
-				self.tile_input_demux_area += self.tile_PE_list[i][j].PE_input_demux_area
-				self.tile_output_mux_area += self.tile_PE_list[i][j].PE_output_mux_area
-				self.tile_shiftreg_area += self.tile_PE_list[i][j].PE_shiftreg_area
-				self.tile_iReg_area += self.tile_PE_list[i][j].PE_iReg_area
-				self.tile_oReg_area += self.tile_PE_list[i][j].PE_oReg_area
-				self.tile_adder_area += self.tile_PE_list[i][j].PE_adder_area
-				self.tile_buffer_area += self.tile_PE_list[i][j].PE_inbuf_area
+				_PE = self.private_PE(i, j)
+				_PE.calculate_PE_area(SimConfig_path=SimConfig_path, default_inbuf_size = default_inbuf_size)
+				self.tile_xbar_area += _PE.PE_xbar_area
+				self.tile_ADC_area += _PE.PE_ADC_area
+				self.tile_DAC_area += _PE.PE_DAC_area
+				# self.tile_digital_area += _PE.PE_digital_area
+				self.tile_input_demux_area += _PE.PE_input_demux_area
+				self.tile_output_mux_area += _PE.PE_output_mux_area
+				self.tile_shiftreg_area += _PE.PE_shiftreg_area
+				self.tile_iReg_area += _PE.PE_iReg_area
+				self.tile_oReg_area += _PE.PE_oReg_area
+				self.tile_adder_area += _PE.PE_adder_area
+				self.tile_buffer_area += _PE.PE_inbuf_area
 		# self.tile_adder_area += self.tile_adder_num * self.tile_adder.adder_area
 		# self.tile_shiftreg_area += self.tile_shiftreg_num * self.tile_shiftreg.shiftreg_area
 		self.tile_jointmodule_area = self.tile_jointmodule_num * self.tile_jointmodule.jointmodule_area
@@ -271,6 +298,27 @@ class tile(ProcessElement):
 		self.tile_read_power = self.tile_xbar_read_power+self.tile_ADC_read_power+self.tile_DAC_read_power+\
 							   self.tile_digital_read_power+self.tile_pooling_read_power+self.tile_buffer_read_power
 
+	def calculate_tile_area_cached(self, SimConfig_path=None, default_inbuf_size = 16, default_outbuf_size = 4):
+		# same results as calculate_tile_area, served from the characterization cache
+		def compute():
+			self.calculate_tile_area(SimConfig_path=SimConfig_path, default_inbuf_size=default_inbuf_size,
+									 default_outbuf_size=default_outbuf_size)
+			return collect_attributes(self, 'tile_', '_area')
+		result = char_cache.lookup('tile_area', SimConfig_path, (default_inbuf_size, default_outbuf_size), compute)
+		restore_attributes(self, result)
+
+	def calculate_tile_read_power_fast_cached(self, max_column=0, max_row=0, max_PE=0, max_group=0, layer_type=None,
+											  SimConfig_path=None, default_inbuf_size = 16, default_outbuf_size = 4):
+		# same results as calculate_tile_read_power_fast, served from the characterization cache
+		def compute():
+			self.calculate_tile_read_power_fast(max_column=max_column, max_row=max_row, max_PE=max_PE, max_group=max_group,
+												layer_type=layer_type, SimConfig_path=SimConfig_path,
+												default_inbuf_size=default_inbuf_size, default_outbuf_size=default_outbuf_size)
+			return collect_attributes(self, 'tile_', '_read_power')
+		args = (max_column, max_row, max_PE, max_group, layer_type, default_inbuf_size, default_outbuf_size)
+		result = char_cache.lookup('tile_read_power_fast', SimConfig_path, args, compute)
+		restore_attributes(self, result)
+
 	def tile_read_config(self, layer_num = 0, activation_precision = 0, sliding_times = 0,
 						 read_row = None, read_column = None, read_matrix = None, read_vector = None):
 		# read_row and read_column are 2D lists with the size of (#occupied_PE x #occupied groups)
@@ -287,7 +335,7 @@ class tile(ProcessElement):
 				for i in range(self.tile_PE_num[0]):
 					for j in range(self.tile_PE_num[1]):
 						# temp_index = i*self.tile_PE_num[0] + self.tile_PE_num[1]
-						self.tile_PE_list[i][j].PE_read_config()
+						self.materialize_PE(i, j).PE_read_config()
 						self.tile_PE_enable[i][j] = 1
 						self.tile_utilization += self.tile_PE_list[i][j].PE_utilization
 			else:
@@ -298,8 +346,8 @@ class tile(ProcessElement):
 					for j in range(self.tile_PE_num[1]):
 						temp_index = i * self.tile_PE_num[0] + j
 						if temp_index < self.num_occupied_PE:
-							self.tile_PE_list[i][j].PE_read_config(read_row = read_row[temp_index],
-																   read_column = read_column[temp_index])
+							self.materialize_PE(i, j).PE_read_config(read_row = read_row[temp_index],
+																     read_column = read_column[temp_index])
 							self.tile_PE_enable[i][j] = 1
 							self.tile_utilization += self.tile_PE_list[i][j].PE_utilization
 						else:
@@ -309,7 +357,7 @@ class tile(ProcessElement):
 				self.num_occupied_group = self.tile_PE_total_num
 				for i in range(self.tile_PE_num[0]):
 					for j in range(self.tile_PE_num[1]):
-						self.tile_PE_list[i][j].PE_read_config()
+						self.materialize_PE(i, j).PE_read_config()
 						self.tile_PE_enable[i][j] = 1
 						self.tile_utilization += self.tile_PE_list[i][j].PE_utilization
 			else:
@@ -320,7 +368,7 @@ class tile(ProcessElement):
 						for j in range(self.tile_PE_num[1]):
 							temp_index = i * self.tile_PE_num[0] + j
 							if temp_index < self.num_occupied_PE:
-								self.tile_PE_list[i][j].PE_read_config(read_matrix = read_matrix[temp_index])
+								self.materialize_PE(i, j).PE_read_config(read_matrix = read_matrix[temp_index])
 								self.tile_PE_enable[i][j] = 1
 								self.tile_utilization += self.tile_PE_list[i][j].PE_utilization
 							else:
@@ -332,8 +380,8 @@ class tile(ProcessElement):
 						for j in range(self.tile_PE_num[1]):
 							temp_index = i * self.tile_PE_num[0] + j
 							if temp_index < self.num_occupied_PE:
-								self.tile_PE_list[i][j].PE_read_config(read_matrix = read_matrix[temp_index],
-																	   read_vector = read_vector[temp_index])
+								self.materialize_PE(i, j).PE_read_config(read_matrix = read_matrix[temp_index],
+																	     read_vector = read_vector[temp_index])
 								self.tile_PE_enable[i][j] = 1
 								self.tile_utilization += self.tile_PE_list[i][j].PE_utilization
 							else:
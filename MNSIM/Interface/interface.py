@@ -9,6 +9,7 @@ from importlib import import_module
 
 import numpy as np
 import torch
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 
 
 class TrainTestInterface(object):
@@ -24,8 +25,7 @@ class TrainTestInterface(object):
         self.test_loader = None
         # load simconfig
         ## xbar_size, input_bit, weight_bit, ADC_quantize_bit
-        xbar_config = configparser.ConfigParser()
-        xbar_config.read(SimConfig_path, encoding = 'UTF-8')
+        xbar_config = load_SimConfig(SimConfig_path)
         self.hardware_config = collections.OrderedDict()
         # xbar_size
         xbar_size = list(map(int, xbar_config.get('Crossbar level', 'Xbar_Size').split(',')))
@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import heapq
+import numpy as np
+# Discrete-event form of the pipeline model of Model_latency.
+# Each output of a layer is a task, served by a resource: the tile group of the layer (one per slice of a
+# replicated conv layer). As in the analytic model, the buffer accesses, the intra-layer merge and the
+# inter-tile transfer of an output are part of its service time, so a tile group is busy until its output
+# has been sent. A resource serves its tasks in order, a task starts when its resource is free and the
+# outputs it depends on (Judge-style last required position of every input layer) are finished:
+#   begin_time = max(ready_time, finish time of the previous task of the resource)
+# Several images can be streamed back to back through the resources, the simulation stops once the
+# interval between the completion of successive images (initiation interval) is steady.
+
+steady_tolerance = 1e-9
+
+
+class event_simulator(object):
+    def __init__(self, layer_tasks):
+        # layer_tasks: task tables of the layers in order (Model_latency.layer_tasks)
+        self.layer_num = len(layer_tasks)
+        self.task_num = [len(tasks['slice']) for tasks in layer_tasks]
+        self.task_offset = np.concatenate(([0], np.cumsum(self.task_num))).astype(int)
+        total_task_num = int(self.task_offset[-1])
+        task_resource = np.zeros(total_task_num, dtype=int)
+        task_next = np.full(total_task_num, -1, dtype=int)
+        self.resource_first = []
+        self.task_latency = []
+        source = []
+        destination = []
+        for layer_id, tasks in enumerate(layer_tasks):
+            offset = self.task_offset[layer_id]
+            for m in np.unique(tasks['slice']):
+                index = np.flatnonzero(tasks['slice'] == m) + offset
+                task_resource[index] = len(self.resource_first)
+                task_next[index[:-1]] = index[1:]
+                self.resource_first.append(int(index[0]))
+            latency = np.asarray(tasks['latency'], dtype=float)
+            if latency.ndim == 1:
+                latency = latency[:, np.newaxis]
+            self.task_latency.extend(map(tuple, latency.tolist()))
+            for input_layer_id, pos in tasks['dependency']:
+                # position of the input layer -> task of the input layer
+                output_task = layer_tasks[input_layer_id]['output_task']
+                output_num = self.task_num[input_layer_id] if output_task is None else len(output_task)
+                pos = np.broadcast_to(np.asarray(pos, dtype=int), (self.task_num[layer_id],))
+                pos = np.where(pos < 0, pos + output_num, pos)
+                if output_task is not None:
+                    pos = output_task[pos]
+                source.append(pos + self.task_offset[input_layer_id])
+                destination.append(np.arange(self.task_num[layer_id]) + offset)
+        source = np.concatenate(source) if len(source) else np.zeros(0, dtype=int)
+        destination = np.concatenate(destination) if len(destination) else np.zeros(0, dtype=int)
+        order = np.argsort(source, kind='stable')
+        self.dependent = destination[order].tolist()
+        self.dependent_start = np.searchsorted(source[order], np.arange(total_task_num + 1)).tolist()
+        self.dependency_num = np.bincount(destination, minlength=total_task_num).tolist()
+        self.task_resource = task_resource.tolist()
+        self.task_next = task_next.tolist()
+        self.begin_time = []
+        self.finish_time = []
+        self.image_finish_time = []
+        self.initiation_interval = None
+        self.event_num = 0
+
+    def run(self, image_num=1):
+        '''
+        simulate image_num images streamed back to back (the input of every image is ready at time 0)
+        :return: finish time of each simulated image, the begin/finish time of each task of the first image
+                 are stored in begin_time/finish_time (one array per layer)
+        '''
+        total_task_num = len(self.task_resource)
+        resource_num = len(self.resource_first)
+        task_resource = self.task_resource
+        task_next = self.task_next
+        task_latency = self.task_latency
+        dependent = self.dependent
+        dependent_start = self.dependent_start
+        resource_free = [0.0] * resource_num
+        resource_busy = [False] * resource_num
+        # next (image, task) of each resource
+        resource_head = [(0, task) for task in self.resource_first]
+        image_state = {}
+        image_finish_time = [None] * image_num
+        begin_time = [0.0] * total_task_num
+        finish_time = [0.0] * total_task_num
+        event = []
+        sequence = 0
+        self.initiation_interval = None
+
+        def state(image):
+            if image not in image_state:
+                # [remaining dependencies, ready time] of each task, number of unfinished tasks, finish time
+                image_state[image] = [list(self.dependency_num), [0.0] * total_task_num, total_task_num, 0.0]
+            return image_state[image]
+
+        def start(resource):
+            nonlocal sequence
+            if resource_busy[resource] or resource_head[resource] is None:
+                return
+            image, task = resource_head[resource]
+            current_state = state(image)
+            if current_state[0][task] > 0:
+                return
+            begin = max(current_state[1][task], resource_free[resource])
+            finish = begin
+            for latency in task_latency[task]:
+                finish = finish + latency
+            if image == 0:
+                begin_time[task] = begin
+                finish_time[task] = finish
+            resource_busy[resource] = True
+            heapq.heappush(event, (finish, sequence, image, task))
+            sequence += 1
+
+        for resource in range(resource_num):
+            start(resource)
+        while len(event):
+            finish, _, image, task = heapq.heappop(event)
+            self.event_num += 1
+            current_state = image_state[image]
+            resource = task_resource[task]
+            resource_busy[resource] = False
+            resource_free[resource] = finish
+            if task_next[task] >= 0:
+                resource_head[resource] = (image, task_next[task])
+            elif image + 1 < image_num:
+                resource_head[resource] = (image + 1, self.resource_first[resource])
+            else:
+                resource_head[resource] = None
+            remaining, ready_time = current_state[0], current_state[1]
+            for d in range(dependent_start[task], dependent_start[task + 1]):
+                next_task = dependent[d]
+                remaining[next_task] -= 1
+                if finish > ready_time[next_task]:
+                    ready_time[next_task] = finish
+                if remaining[next_task] == 0:
+                    start(task_resource[next_task])
+            start(resource)
+            current_state[2] -= 1
+            current_state[3] = max(current_state[3], finish)
+            if current_state[2] == 0:
+                image_finish_time[image] = current_state[3]
+                del image_state[image]
+                if self.steady(image_finish_time, image):
+                    break
+        self.image_finish_time = [time for time in image_finish_time if time is not None]
+        if self.initiation_interval is None and len(self.image_finish_time) > 1:
+            self.initiation_interval = self.image_finish_time[-1] - self.image_finish_time[-2]
+        self.begin_time = [np.array(begin_time[self.task_offset[i]:self.task_offset[i+1]]) for i in range(self.layer_num)]
+        self.finish_time = [np.array(finish_time[self.task_offset[i]:self.task_offset[i+1]]) for i in range(self.layer_num)]
+        return self.image_finish_time
+
+    def steady(self, image_finish_time, image):
+        # early exit: the three last images are finished and finish at a constant interval
+        if image < 2 or None in image_finish_time[:image + 1]:
+            return False
+        interval = image_finish_time[image] - image_finish_time[image - 1]
+        last_interval = image_finish_time[image - 1] - image_finish_time[image - 2]
+        if abs(interval - last_interval) <= steady_tolerance * max(abs(interval), 1):
+            self.initiation_interval = interval
+            return True
+        return False
+
+    def image_latency(self, image_num):
+        # finish time of image_num images streamed back to back, extrapolated with the initiation interval
+        if image_num <= len(self.image_finish_time):
+            return self.image_finish_time[image_num - 1]
+        assert self.initiation_interval is not None, "simulate at least two images"
+        return self.image_finish_time[-1] + (image_num - len(self.image_finish_time)) * self.initiation_interval
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import gzip
+import json
+import numpy as np
+# Timeline of the simulated pipeline in the Chrome trace event format (chrome://tracing, ui.perfetto.dev):
+# every layer is a process (track group), every slice (replicated tile group) of a layer a thread,
+# the outputs (or the merged working intervals) are complete events ('X'), an output waiting for its inputs
+# (pipeline bubble) gets a flow event from the input output it waited for.
+# The events are written layer by layer, a path ending with .gz is written gzip-compressed.
+# Times of Model_latency are in ns, the trace timestamps in us.
+
+
+class latency_trace(object):
+    def __init__(self, path, pixel=False, stall=True):
+        '''
+        :param path: trace file (.json or .json.gz)
+        :param pixel: True: one event per output, False: one event per merged working interval of a layer
+        :param stall: write the pipeline bubbles as flow events
+        '''
+        self.path = path
+        self.pixel = pixel
+        self.stall = stall
+        if path.endswith('.gz'):
+            self.file = gzip.open(path, 'wt')
+        else:
+            self.file = open(path, 'w')
+        self.file.write('{"displayTimeUnit": "ns", "traceEvents": [\n')
+        self.event_num = 0
+        self.flow_num = 0
+
+    def event(self, **event):
+        if self.event_num > 0:
+            self.file.write(',\n')
+        self.file.write(json.dumps(event))
+        self.event_num += 1
+
+    def layer(self, model_latency, layer_id):
+        # write the timeline of one layer (its inputs must still hold their history)
+        layer_type = model_latency.NetStruct[layer_id][0][0]['type']
+        begin_time = np.array(model_latency.begin_time[layer_id], dtype=float)
+        finish_time = np.array(model_latency.finish_time[layer_id], dtype=float)
+        slice_id = self.layer_slice(model_latency, layer_id, len(begin_time))
+        self.event(name='process_name', ph='M', pid=layer_id, args={'name': 'Layer %d %s' % (layer_id, layer_type)})
+        self.event(name='process_sort_index', ph='M', pid=layer_id, args={'sort_index': layer_id})
+        if self.pixel:
+            for m in np.unique(slice_id).tolist():
+                self.event(name='thread_name', ph='M', pid=layer_id, tid=m, args={'name': 'slice %d' % m})
+            # one event per output, formatted directly (json.dumps of every event is slow on large layers)
+            event_format = ',\n{"name": "%s", "cat": "output", "ph": "X", "pid": %d, "tid": %%d, "ts": %%r, "dur": %%r, ' \
+                           '"args": {"output": %%d}}' % (layer_type, layer_id)
+            for k, (m, begin, finish) in enumerate(zip(slice_id.tolist(), (begin_time / 1000).tolist(),
+                                                       ((finish_time - begin_time) / 1000).tolist())):
+                self.file.write(event_format % (m, begin, finish, k))
+            self.event_num += len(begin_time)
+        else:
+            self.event(name='thread_name', ph='M', pid=layer_id, tid=0, args={'name': 'working intervals'})
+            interval = model_latency.compute_interval[layer_id]
+            if len(interval) == 0 and len(begin_time):
+                # working intervals not recorded (estimate): the span of the layer
+                interval = [[float(begin_time.min()), float(finish_time.max())]]
+            for begin, finish in interval:
+                self.event(name=layer_type, cat='interval', ph='X', pid=layer_id, tid=0, ts=begin / 1000,
+                           dur=(finish - begin) / 1000)
+        if self.stall:
+            self.layer_stall(model_latency, layer_id, begin_time, finish_time, slice_id)
+
+    def layer_slice(self, model_latency, layer_id, output_num):
+        # slice of each output, the outputs are in the order row, slice, column of the slice
+        split = model_latency.layer_split[layer_id] if layer_id < len(model_latency.layer_split) else [1]
+        row_length = int(np.sum(split))
+        if len(split) == 1 or row_length == 0 or output_num % row_length != 0:
+            return np.zeros(output_num, dtype=int)
+        return np.tile(np.repeat(np.arange(len(split)), split), output_num // row_length)
+
+    def layer_stall(self, model_latency, layer_id, begin_time, finish_time, slice_id):
+        # outputs starting after the previous output of their slice: they wait for the output of an input layer
+        # which finishes at their begin time
+        previous_finish = np.full(len(begin_time), -np.inf)
+        for m in np.unique(slice_id):
+            index = np.flatnonzero(slice_id == m)
+            previous_finish[index[1:]] = finish_time[index[:-1]]
+        waiting = np.flatnonzero((begin_time > previous_finish) & (begin_time > 0))
+        if len(waiting) == 0:
+            return
+        found = np.zeros(len(waiting), dtype=bool)
+        for idx in model_latency.NetStruct[layer_id][0][0].get('Inputindex', []):
+            input_layer_id = layer_id + int(idx)
+            if input_layer_id < 0 or len(model_latency.finish_time[input_layer_id]) == 0:
+                continue
+            input_finish = np.array(model_latency.finish_time[input_layer_id], dtype=float)
+            input_slice = self.layer_slice(model_latency, input_layer_id, len(input_finish))
+            order = np.argsort(input_finish, kind='stable')
+            pos = np.minimum(np.searchsorted(input_finish[order], begin_time[waiting]), len(order) - 1)
+            match = (~found) & (input_finish[order][pos] == begin_time[waiting])
+            for k, source in zip(waiting[match].tolist(), order[pos[match]].tolist()):
+                source_tid = int(input_slice[source]) if self.pixel else 0
+                tid = int(slice_id[k]) if self.pixel else 0
+                self.event(name='stall', cat='stall', ph='s', id=self.flow_num, pid=input_layer_id, tid=source_tid,
+                           ts=input_finish[source] / 1000)
+                self.event(name='stall', cat='stall', ph='f', bp='e', id=self.flow_num, pid=layer_id, tid=tid,
+                           ts=begin_time[k] / 1000)
+                self.flow_num += 1
+            found |= match
+
+    def close(self):
+        self.file.write('\n]}\n')
+        self.file.close()
+
+
+def export_latency_trace(model_latency, path, pixel=False, stall=True):
+    # timeline of a computed Model_latency (not summary_only), see latency_trace
+    trace = latency_trace(path, pixel=pixel, stall=stall)
+    for layer_id in range(len(model_latency.begin_time)):
+        trace.layer(model_latency, layer_id)
+    trace.close()
+    return trace.event_num
@@ -3,6 +3,7 @@
 import sys
 import os
 import configparser as cp
+import json
 
 work_path = os.path.dirname(os.getcwd())
 sys.path.append(work_path)
@@ -10,10 +11,14 @@ import numpy as np
 import pandas as pd
 from MNSIM.Interface.interface import *
 from MNSIM.Mapping_Model.Tile_connection_graph import TCG
-from MNSIM.Latency_Model.Tile_latency import tile_latency_analysis
+from MNSIM.Latency_Model.Tile_latency import tile_latency_analysis, cached_tile_latency_analysis
 from MNSIM.Latency_Model.Pooling_latency import pooling_latency_analysis
+from MNSIM.Latency_Model.Pipeline_schedule import pipeline_schedule, pipeline_schedule_estimate, merge_interval_array, \
+    interval_runtime
+from MNSIM.Latency_Model.Event_simulator import event_simulator
 from MNSIM.NoC.interconnect_estimation import interconnect_estimation
 from MNSIM.Hardware_Model.Buffer import buffer
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 
 
 def merge_interval(interval):
@@ -44,6 +49,16 @@ def Search(value, data):
     return pos
 
 
+def Search_batch(value, data):
+    # Search for an array of values: first position with data[pos] >= value, len(data) if value > data[-1]
+    # binary search on the running maximum of data, so data does not need to be sorted
+    value = np.asarray(value)
+    data = np.asarray(data)
+    pos = np.searchsorted(np.maximum.accumulate(data), value, side='left')
+    pos[value > data[-1]] = len(data)
+    return pos
+
+
 def Split_map(padding, outputsize, multiple):  # 对下一层进行划分
     base = outputsize // multiple
     res = outputsize - base * multiple
@@ -63,10 +78,52 @@ def inoutsize_conversion(kernelsize, padding, stride, outputsize):
     return kernelsize+(outputsize-1)*stride-2*padding
 
 
+# per-output latency breakdown: one structured array per layer, one column per module (unit: ns)
+# resnet18 on 224x224 inputs (168308 outputs): 26.7 MB (vectorized engine) to 28.8 MB (loop engine,
+# the tables of element_sum layers grow on demand), instead of 49.2 MB for per-module lists of Python floats
+pixel_latency_fields = ['buffer_latency', 'buffer_r_latency', 'buffer_w_latency', 'computing_latency',
+                        'DAC_latency', 'xbar_latency', 'ADC_latency', 'digital_latency', 'iReg_latency',
+                        'input_demux_latency', 'output_mux_latency', 'shiftreg_latency', 'adder_latency',
+                        'oReg_latency', 'jointmodule_latency', 'pooling_latency', 'intra_tile_latency',
+                        'inter_tile_latency', 'tile_merge_latency', 'tile_transfer_latency']
+pixel_latency_dtype = np.dtype([(name, np.float64) for name in pixel_latency_fields])
+
+
+class pixel_latency_view(object):
+    # list-like view of one column of the per-output latency tables, compatible with the former
+    # per-module lists: model_latency.xbar_latency[layer_id][output_id]
+    def __init__(self, model_latency, name):
+        self.model_latency = model_latency
+        self.name = name
+
+    def __getitem__(self, layer_id):
+        return self.model_latency.pixel_latency[layer_id][self.name][:self.model_latency.pixel_count[layer_id]]
+
+    def __len__(self):
+        return len(self.model_latency.pixel_latency)
+
+    def __iter__(self):
+        for layer_id in range(len(self)):
+            yield self[layer_id]
+
+
+def sequential_sum(data):
+    # same result as sum(list(data)): np.cumsum adds in order, np.sum uses pairwise summation
+    if len(data) == 0:
+        return 0
+    return float(np.cumsum(data)[-1])
+
+
 class Model_latency():
-    def __init__(self, NetStruct, SimConfig_path, multiple=None, TCG_mapping=None):
-        modelL_config = cp.ConfigParser()
-        modelL_config.read(SimConfig_path, encoding='UTF-8')
+    def __init__(self, NetStruct, SimConfig_path, multiple=None, TCG_mapping=None, summary_only=False, layer_memo=False,
+                 trace=None):
+        # summary_only: keep the per-layer results only. The per-output begin time, intervals and latency breakdown
+        # of a layer are released once the layer is computed, its per-output finish times (read by Judge/Search of
+        # the next layers) once the layers reading it are computed: the peak memory is the finish times of the live
+        # layers (O(largest live layer outputs)), not a rolling window of the finish times Judge/Search can reach
+        # layer_memo: reuse the per-output latency terms of the layers with the same signature (repeated blocks)
+        # trace: latency_trace (Latency_trace), the timeline of each layer is written once the layer is computed
+        modelL_config = load_SimConfig(SimConfig_path)
         NoC_Compute = int(modelL_config.get('Algorithm Configuration', 'NoC_enable'))
         self.inter_tile_bandwidth = float(modelL_config.get('Tile level', 'Inter_Tile_Bandwidth'))
         self.NetStruct = NetStruct
@@ -75,8 +132,9 @@ class Model_latency():
         if TCG_mapping is None:
             TCG_mapping = TCG(NetStruct, SimConfig_path, multiple)
         self.graph = TCG_mapping
-        self.graph.mapping_net()
-        self.graph.calculate_transfer_distance()
+        if not getattr(self.graph, 'mapped', False):
+            self.graph.mapping_net()
+            self.graph.calculate_transfer_distance()
         self.begin_time = []
         self.finish_time = []
         self.layer_tile_latency = []
@@ -90,30 +148,14 @@ class Model_latency():
         self.occupancy = []
         self.multiple = multiple
 
-        self.buffer_latency = []
-        self.buffer_r_latency = []
-        self.buffer_w_latency = []
+        # per-output latency breakdown of each layer, see pixel_latency_fields
+        self.pixel_latency = []
+        self.pixel_count = []
+        for name in pixel_latency_fields:
+            setattr(self, name, pixel_latency_view(self, name))
         self.inbuffer_latency = [] # PE level input buffer latency
         self.outbuffer_latency = [] # Tile level output buffer latency
 
-        self.computing_latency = []
-        self.DAC_latency = []
-        self.xbar_latency = []
-        self.ADC_latency = []
-        self.digital_latency = []
-        self.iReg_latency = []
-        self.input_demux_latency = []
-        self.output_mux_latency = []
-        self.shiftreg_latency = []
-        self.adder_latency = []
-        self.oReg_latency = []
-        self.jointmodule_latency = []
-        self.pooling_latency = []
-        self.intra_tile_latency = []
-        self.inter_tile_latency = []
-        self.tile_merge_latency = []
-        self.tile_transfer_latency = []
-
         self.total_buffer_latency = []
         self.total_computing_latency = []
         self.total_DAC_latency = []
@@ -139,6 +181,30 @@ class Model_latency():
         self.layer_split = []
         self.pre_max_time = 0
 
+        self.summary_only = summary_only
+        # layer signature -> per-output latency terms (layer_memo_lookup)
+        # calculate_model_latency computes the first layer of a signature with its per-output loop and records
+        # the signature with None, the terms are stored at the second occurrence (layer_memo_lookup);
+        # the task engines (vectorized, event, estimate) store them at the first occurrence
+        self.layer_memo = dict() if layer_memo else None
+        self.layer_memo_hit = 0
+        self.trace = trace
+        self.layer_begin_time = [] # start time of each layer
+        self.layer_finish_time = [] # finish time of each layer
+        self.layer_initiation_interval = [] # busy time of each layer per image
+        self.initiation_interval = None # steady-state interval between two images
+        self.bottleneck_layer = None
+        self.layer_error_bound = [] # error bound of the finish times of each layer (mode 3 estimate)
+        self.latency_error_bound = None # error bound of the entire latency (mode 3 estimate)
+        self.latency_mode = None # mode of the computed latency (calculate_model_latency)
+        # last_use[i]: the last layer reading the outputs of layer i
+        self.last_use = list(range(len(self.NetStruct)))
+        for layer_id in range(len(self.NetStruct)):
+            layer_dict = self.NetStruct[layer_id][0][0]
+            for idx in list(map(int, layer_dict.get('Inputindex', [-1]))):
+                if layer_id + idx >= 0:
+                    self.last_use[layer_id + idx] = max(self.last_use[layer_id + idx], layer_id)
+
     def Judge(self, last_layer_id ,last_layer_pos, current_layer_id):
         # calculate the position of the most time consuming output of the input layer (used in replicate mode)
         layer_dict = self.NetStruct[current_layer_id][0][0]
@@ -162,145 +228,82 @@ class Model_latency():
                 pos += last_split[m]  # get the last data point in each multiple
             return pos - 1 + Row * input_size
 
+    def pixel_latency_breakdown(self, layer_type='conv', temp_tile_latency=None, temp_pooling_latency=None, global_buf=None,
+                                merge_time=0, transfer_time=0, buf_rlatency=0, buf_wlatency=0):
+        # latency of each module for one output (or an array of outputs) of a layer
+        # buf_rlatency, buf_wlatency: input buffer read/write latency (conv/fc: PE input buffer, pooling: inbuf)
+        breakdown = dict()
+        if layer_type in ['conv', 'fc']:
+            breakdown['buffer_latency'] = temp_tile_latency.tile_buf_wlatency + temp_tile_latency.tile_buf_rlatency + \
+                buf_rlatency + buf_wlatency
+            breakdown['computing_latency'] = temp_tile_latency.computing_latency
+            breakdown['DAC_latency'] = temp_tile_latency.DAC_latency
+            breakdown['xbar_latency'] = temp_tile_latency.xbar_latency
+            breakdown['ADC_latency'] = temp_tile_latency.ADC_latency
+            breakdown['buffer_r_latency'] = temp_tile_latency.tile_buf_rlatency+buf_rlatency
+            breakdown['buffer_w_latency'] = temp_tile_latency.tile_buf_wlatency+buf_wlatency
+            breakdown['iReg_latency'] = temp_tile_latency.iReg_latency
+            breakdown['input_demux_latency'] = temp_tile_latency.input_demux_latency
+            breakdown['output_mux_latency'] = temp_tile_latency.output_mux_latency
+            breakdown['shiftreg_latency'] = temp_tile_latency.shiftreg_latency
+            breakdown['adder_latency'] = temp_tile_latency.adder_latency
+            breakdown['oReg_latency'] = temp_tile_latency.oReg_latency
+            breakdown['jointmodule_latency'] = temp_tile_latency.jointmodule_latency
+            breakdown['digital_latency'] = temp_tile_latency.iReg_latency + temp_tile_latency.input_demux_latency + \
+                temp_tile_latency.output_mux_latency + temp_tile_latency.shiftreg_latency + \
+                temp_tile_latency.adder_latency + temp_tile_latency.oReg_latency + temp_tile_latency.jointmodule_latency
+            breakdown['intra_tile_latency'] = temp_tile_latency.transfer_latency
+        elif layer_type == 'pooling':
+            breakdown['buffer_latency'] = buf_wlatency + buf_rlatency + temp_pooling_latency.outbuf_wlatency + \
+                temp_pooling_latency.outbuf_rlatency
+            breakdown['buffer_r_latency'] = buf_rlatency + temp_pooling_latency.outbuf_rlatency
+            breakdown['buffer_w_latency'] = buf_wlatency + temp_pooling_latency.outbuf_wlatency
+            breakdown['pooling_latency'] = temp_pooling_latency.digital_latency
+        elif layer_type in ['element_sum', 'element_multiply']:
+            breakdown['buffer_latency'] = global_buf.buf_rlatency+global_buf.buf_wlatency
+            breakdown['buffer_r_latency'] = global_buf.buf_rlatency
+            breakdown['buffer_w_latency'] = global_buf.buf_wlatency
+            breakdown['digital_latency'] = 10
+        breakdown['inter_tile_latency'] = merge_time + transfer_time
+        breakdown['tile_merge_latency'] = merge_time
+        breakdown['tile_transfer_latency'] = transfer_time
+        return breakdown
+
+    def pixel_latency_append(self, layer_id, breakdown):
+        # store the latency breakdown of the next output of the layer, the other modules are 0
+        table = self.pixel_latency[layer_id]
+        count = self.pixel_count[layer_id]
+        if count == len(table):
+            table = np.concatenate((table, np.zeros(max(count, 16), dtype=pixel_latency_dtype)))
+            self.pixel_latency[layer_id] = table
+        table[count] = tuple(breakdown.get(name, 0) for name in pixel_latency_fields)
+        self.pixel_count[layer_id] = count + 1
+
     def pipe_result_update(self, layer_type='conv', begin_time=0, compute_time=0, layer_id=0,
                            temp_tile_latency=None, temp_pooling_latency = None, global_buf = None,
                            merge_time=0, transfer_time=0, output_size=0):
-        if layer_type == 'conv':
-            self.begin_time[layer_id].append(begin_time)
-            self.finish_time[layer_id].append(compute_time)
-            self.compute_interval[layer_id].append([begin_time, compute_time])
-
-            self.buffer_latency[layer_id].append(temp_tile_latency.tile_buf_wlatency + temp_tile_latency.tile_buf_rlatency +
-                temp_tile_latency.PE_buf_rlatency + temp_tile_latency.PE_buf_wlatency)
-            self.computing_latency[layer_id].append(temp_tile_latency.computing_latency)
-            self.DAC_latency[layer_id].append(temp_tile_latency.DAC_latency)
-            self.xbar_latency[layer_id].append(temp_tile_latency.xbar_latency)
-            self.ADC_latency[layer_id].append(temp_tile_latency.ADC_latency)
-            self.buffer_r_latency[layer_id].append(temp_tile_latency.tile_buf_rlatency+temp_tile_latency.PE_buf_rlatency)
-            self.buffer_w_latency[layer_id].append(temp_tile_latency.tile_buf_wlatency+temp_tile_latency.PE_buf_wlatency)
-            self.iReg_latency[layer_id].append(temp_tile_latency.iReg_latency)
-            self.input_demux_latency[layer_id].append(temp_tile_latency.input_demux_latency)
-            self.output_mux_latency[layer_id].append(temp_tile_latency.output_mux_latency)
-            self.shiftreg_latency[layer_id].append(temp_tile_latency.shiftreg_latency)
-            self.adder_latency[layer_id].append(temp_tile_latency.adder_latency)
-            self.oReg_latency[layer_id].append(temp_tile_latency.oReg_latency)
-            self.jointmodule_latency[layer_id].append(temp_tile_latency.jointmodule_latency)
-
-            self.digital_latency[layer_id].append(temp_tile_latency.iReg_latency + temp_tile_latency.input_demux_latency +
-                                                  temp_tile_latency.output_mux_latency + temp_tile_latency.shiftreg_latency +
-                                                  temp_tile_latency.adder_latency + temp_tile_latency.oReg_latency + temp_tile_latency.jointmodule_latency)
-            self.pooling_latency[layer_id].append(0)
-            self.intra_tile_latency[layer_id].append(temp_tile_latency.transfer_latency)
-            self.inter_tile_latency[layer_id].append(merge_time + transfer_time)
-            self.tile_merge_latency[layer_id].append(merge_time)
-            self.tile_transfer_latency[layer_id].append(transfer_time)
-        elif layer_type == 'fc':
+        if layer_type == 'fc':
             self.begin_time[layer_id] = output_size * [begin_time]
             self.finish_time[layer_id] = output_size * [compute_time]
-            self.compute_interval[layer_id].append([begin_time, compute_time])
-
-            self.buffer_latency[layer_id].append(temp_tile_latency.tile_buf_wlatency + temp_tile_latency.tile_buf_rlatency +
-                                                temp_tile_latency.PE_buf_rlatency + temp_tile_latency.PE_buf_wlatency)
-            self.computing_latency[layer_id].append(temp_tile_latency.computing_latency)
-            self.DAC_latency[layer_id].append(temp_tile_latency.DAC_latency)
-            self.xbar_latency[layer_id].append(temp_tile_latency.xbar_latency)
-            self.ADC_latency[layer_id].append(temp_tile_latency.ADC_latency)
-            self.buffer_r_latency[layer_id].append(temp_tile_latency.tile_buf_rlatency+temp_tile_latency.PE_buf_rlatency)
-            self.buffer_w_latency[layer_id].append(temp_tile_latency.tile_buf_wlatency+temp_tile_latency.PE_buf_wlatency)
-            self.iReg_latency[layer_id].append(temp_tile_latency.iReg_latency)
-            self.input_demux_latency[layer_id].append(temp_tile_latency.input_demux_latency)
-            self.output_mux_latency[layer_id].append(temp_tile_latency.output_mux_latency)
-            self.shiftreg_latency[layer_id].append(temp_tile_latency.shiftreg_latency)
-            self.adder_latency[layer_id].append(temp_tile_latency.adder_latency)
-            self.oReg_latency[layer_id].append(temp_tile_latency.oReg_latency)
-            self.jointmodule_latency[layer_id].append(temp_tile_latency.jointmodule_latency)
-
-            self.digital_latency[layer_id].append(temp_tile_latency.iReg_latency + temp_tile_latency.input_demux_latency +
-                                                  temp_tile_latency.output_mux_latency + temp_tile_latency.shiftreg_latency +
-                                                  temp_tile_latency.adder_latency + temp_tile_latency.oReg_latency + temp_tile_latency.jointmodule_latency)
-            self.pooling_latency[layer_id].append(0)
-            self.intra_tile_latency[layer_id].append(temp_tile_latency.transfer_latency)
-            self.inter_tile_latency[layer_id].append(merge_time + transfer_time)
-            self.tile_merge_latency[layer_id].append(merge_time)
-            self.tile_transfer_latency[layer_id].append(transfer_time)
-        elif layer_type == 'pooling':
-            self.begin_time[layer_id].append(begin_time)
-            self.finish_time[layer_id].append(compute_time)
-            self.compute_interval[layer_id].append([begin_time, compute_time])
-            self.buffer_latency[layer_id].append(temp_pooling_latency.inbuf_wlatency + temp_pooling_latency.inbuf_rlatency +
-                                                 temp_pooling_latency.outbuf_wlatency + temp_pooling_latency.outbuf_rlatency)
-            self.computing_latency[layer_id].append(0)
-            self.DAC_latency[layer_id].append(0)
-            self.xbar_latency[layer_id].append(0)
-            self.ADC_latency[layer_id].append(0)
-            self.buffer_r_latency[layer_id].append(temp_pooling_latency.inbuf_rlatency + temp_pooling_latency.outbuf_rlatency)
-            self.buffer_w_latency[layer_id].append(temp_pooling_latency.inbuf_wlatency + temp_pooling_latency.outbuf_wlatency)
-            self.iReg_latency[layer_id].append(0)
-            self.input_demux_latency[layer_id].append(0)
-            self.output_mux_latency[layer_id].append(0)
-            self.shiftreg_latency[layer_id].append(0)
-            self.adder_latency[layer_id].append(0)
-            self.oReg_latency[layer_id].append(0)
-            self.jointmodule_latency[layer_id].append(0)
-
-            self.digital_latency[layer_id].append(0)
-            self.pooling_latency[layer_id].append(temp_pooling_latency.digital_latency)
-            self.intra_tile_latency[layer_id].append(0)
-            self.inter_tile_latency[layer_id].append(merge_time + transfer_time)
-            self.tile_merge_latency[layer_id].append(merge_time)
-            self.tile_transfer_latency[layer_id].append(transfer_time)
-        elif layer_type == 'element_sum':
-            self.begin_time[layer_id].append(begin_time)
-            self.finish_time[layer_id].append(compute_time)
-            self.compute_interval[layer_id].append([begin_time, compute_time])
-            self.buffer_latency[layer_id].append(global_buf.buf_rlatency+global_buf.buf_wlatency)
-            self.computing_latency[layer_id].append(0)
-            self.DAC_latency[layer_id].append(0)
-            self.xbar_latency[layer_id].append(0)
-            self.ADC_latency[layer_id].append(0)
-            self.buffer_r_latency[layer_id].append(global_buf.buf_rlatency)
-            self.buffer_w_latency[layer_id].append(global_buf.buf_wlatency)
-            self.iReg_latency[layer_id].append(0)
-            self.input_demux_latency[layer_id].append(0)
-            self.output_mux_latency[layer_id].append(0)
-            self.shiftreg_latency[layer_id].append(0)
-            self.adder_latency[layer_id].append(0)
-            self.oReg_latency[layer_id].append(0)
-            self.jointmodule_latency[layer_id].append(0)
-
-            self.digital_latency[layer_id].append(10)
-            self.pooling_latency[layer_id].append(0)
-            self.intra_tile_latency[layer_id].append(0)
-            self.inter_tile_latency[layer_id].append(merge_time + transfer_time)
-            self.tile_merge_latency[layer_id].append(merge_time)
-            self.tile_transfer_latency[layer_id].append(transfer_time)
-        
-        elif layer_type == 'element_multiply':
+        else:
             self.begin_time[layer_id].append(begin_time)
             self.finish_time[layer_id].append(compute_time)
-            self.compute_interval[layer_id].append([begin_time, compute_time])
-            self.buffer_latency[layer_id].append(global_buf.buf_rlatency+global_buf.buf_wlatency)
-            self.computing_latency[layer_id].append(0)
-            self.DAC_latency[layer_id].append(0)
-            self.xbar_latency[layer_id].append(0)
-            self.ADC_latency[layer_id].append(0)
-            self.buffer_r_latency[layer_id].append(global_buf.buf_rlatency)
-            self.buffer_w_latency[layer_id].append(global_buf.buf_wlatency)
-            self.iReg_latency[layer_id].append(0)
-            self.input_demux_latency[layer_id].append(0)
-            self.output_mux_latency[layer_id].append(0)
-            self.shiftreg_latency[layer_id].append(0)
-            self.adder_latency[layer_id].append(0)
-            self.oReg_latency[layer_id].append(0)
-            self.jointmodule_latency[layer_id].append(0)
-
-            self.digital_latency[layer_id].append(10)
-            self.pooling_latency[layer_id].append(0)
-            self.intra_tile_latency[layer_id].append(0)
-            self.inter_tile_latency[layer_id].append(merge_time + transfer_time)
-            self.tile_merge_latency[layer_id].append(merge_time)
-            self.tile_transfer_latency[layer_id].append(transfer_time)
-       
+        self.compute_interval[layer_id].append([begin_time, compute_time])
+        if layer_type in ['conv', 'fc']:
+            breakdown = self.pixel_latency_breakdown(layer_type, temp_tile_latency=temp_tile_latency,
+                                                     merge_time=merge_time, transfer_time=transfer_time,
+                                                     buf_rlatency=temp_tile_latency.PE_buf_rlatency,
+                                                     buf_wlatency=temp_tile_latency.PE_buf_wlatency)
+        elif layer_type == 'pooling':
+            breakdown = self.pixel_latency_breakdown(layer_type, temp_pooling_latency=temp_pooling_latency,
+                                                     merge_time=merge_time, transfer_time=transfer_time,
+                                                     buf_rlatency=temp_pooling_latency.inbuf_rlatency,
+                                                     buf_wlatency=temp_pooling_latency.inbuf_wlatency)
+        else:
+            breakdown = self.pixel_latency_breakdown(layer_type, global_buf=global_buf,
+                                                     merge_time=merge_time, transfer_time=transfer_time)
+        self.pixel_latency_append(layer_id, breakdown)
+
     def calculate_model_latency_nopipe(self):
         # TODO: CHECK THIS FUNCTION
         for layer_id in range(len(self.NetStruct)):
@@ -320,14 +323,14 @@ class Model_latency():
                 # print(self.graph.layer_tileinfo[layer_id]['max_row'])
                 input_channel_PE = self.graph.layer_tileinfo[layer_id]['max_row'] / (kernelsize ** 2)
                 # the input channel number each PE processes
-                temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                          read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                          read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
-                                                          indata=0, rdata=0, inprecision=inputbit,
-                                                          PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                          default_inbuf_size=self.graph.max_inbuf_size,
-                                                          default_outbuf_size=self.graph.max_outbuf_size
-                                                          )
+                temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                                 read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                                 read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
+                                                                 indata=0, rdata=0, inprecision=inputbit,
+                                                                 PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                                 default_inbuf_size=self.graph.max_inbuf_size,
+                                                                 default_outbuf_size=self.graph.max_outbuf_size
+                                                                 )
                 temp_tile_latency.outbuf.calculate_buf_read_latency(rdata = (self.graph.layer_tileinfo[layer_id]['max_column']*outputbit*self.graph.layer_tileinfo[layer_id]['max_PE']/8))
                 temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
                 merge_time = temp_tile_latency.tile_buf_rlatency+self.graph.inLayer_distance[0][layer_id] * \
@@ -392,15 +395,15 @@ class Model_latency():
                     inputindex = Inputindex_list[0]
                     input_channel_PE = self.graph.layer_tileinfo[layer_id]['max_row'] / (kernelsize ** 2)
                     # the input channel number each PE processes
-                    temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                              read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                              read_column=self.graph.layer_tileinfo[layer_id][
-                                                                  'max_column'],
-                                                              indata=0, rdata=0, inprecision=inputbit,
-                                                              PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                              default_inbuf_size=self.graph.max_inbuf_size,
-                                                              default_outbuf_size=self.graph.max_outbuf_size
-                                                              )
+                    temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                                     read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                                     read_column=self.graph.layer_tileinfo[layer_id][
+                                                                         'max_column'],
+                                                                     indata=0, rdata=0, inprecision=inputbit,
+                                                                     PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                                     default_inbuf_size=self.graph.max_inbuf_size,
+                                                                     default_outbuf_size=self.graph.max_outbuf_size
+                                                                     )
                     temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
                                outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
                     temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
@@ -472,14 +475,14 @@ class Model_latency():
                     self.layer_latency_initial()
                     indata = self.graph.layer_tileinfo[layer_id]['max_row'] * inputbit / 8
                     rdata = indata
-                    temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                                  read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                                  read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
-                                                                  indata=indata, rdata=rdata, inprecision=inputbit,
-                                                                  PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                                  default_inbuf_size=self.graph.max_inbuf_size,
-                                                                  default_outbuf_size=self.graph.max_outbuf_size
-                                                                  )
+                    temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                                         read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                                         read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
+                                                                         indata=indata, rdata=rdata, inprecision=inputbit,
+                                                                         PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                                         default_inbuf_size=self.graph.max_inbuf_size,
+                                                                         default_outbuf_size=self.graph.max_outbuf_size
+                                                                         )
                     temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
                         outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
                     temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
@@ -634,29 +637,34 @@ class Model_latency():
             for l in range(len(self.compute_interval[layer_id])):
                 temp_runtime += (self.compute_interval[layer_id][l][1] - self.compute_interval[layer_id][l][0])
             self.occupancy.append(1)
-            self.total_buffer_latency.append(sum(self.buffer_latency[layer_id]))
-            self.total_computing_latency.append(sum(self.computing_latency[layer_id]))
-            self.total_DAC_latency.append(sum(self.DAC_latency[layer_id]))
-            self.total_xbar_latency.append(sum(self.xbar_latency[layer_id]))
-            self.total_ADC_latency.append(sum(self.ADC_latency[layer_id]))
-            self.total_digital_latency.append(sum(self.digital_latency[layer_id]))
-            self.total_inter_tile_latency.append(sum(self.inter_tile_latency[layer_id]))
-            self.total_intra_tile_latency.append(sum(self.intra_tile_latency[layer_id]))
-            self.total_tile_merge_latency.append(sum(self.tile_merge_latency[layer_id]))
-            self.total_tile_transfer_latency.append(sum(self.tile_transfer_latency[layer_id]))
-            self.total_iReg_latency.append(sum(self.iReg_latency[layer_id]))
-            self.total_oReg_latency.append(sum(self.oReg_latency[layer_id]))
-            self.total_input_demux_latency.append(sum(self.input_demux_latency[layer_id]))
-            self.total_output_mux_latency.append(sum(self.output_mux_latency[layer_id]))
-            self.total_shiftreg_latency.append(sum(self.shiftreg_latency[layer_id]))
-            self.total_adder_latency.append(sum(self.adder_latency[layer_id]))
-            self.total_jointmodule_latency.append(sum(self.jointmodule_latency[layer_id]))
-            self.total_pooling_latency.append(sum(self.pooling_latency[layer_id]))
-            self.total_buffer_r_latency.append(sum(self.buffer_r_latency[layer_id]))
-            self.total_buffer_w_latency.append(sum(self.buffer_w_latency[layer_id]))
+            self.total_buffer_latency.append(sequential_sum(self.buffer_latency[layer_id]))
+            self.total_computing_latency.append(sequential_sum(self.computing_latency[layer_id]))
+            self.total_DAC_latency.append(sequential_sum(self.DAC_latency[layer_id]))
+            self.total_xbar_latency.append(sequential_sum(self.xbar_latency[layer_id]))
+            self.total_ADC_latency.append(sequential_sum(self.ADC_latency[layer_id]))
+            self.total_digital_latency.append(sequential_sum(self.digital_latency[layer_id]))
+            self.total_inter_tile_latency.append(sequential_sum(self.inter_tile_latency[layer_id]))
+            self.total_intra_tile_latency.append(sequential_sum(self.intra_tile_latency[layer_id]))
+            self.total_tile_merge_latency.append(sequential_sum(self.tile_merge_latency[layer_id]))
+            self.total_tile_transfer_latency.append(sequential_sum(self.tile_transfer_latency[layer_id]))
+            self.total_iReg_latency.append(sequential_sum(self.iReg_latency[layer_id]))
+            self.total_oReg_latency.append(sequential_sum(self.oReg_latency[layer_id]))
+            self.total_input_demux_latency.append(sequential_sum(self.input_demux_latency[layer_id]))
+            self.total_output_mux_latency.append(sequential_sum(self.output_mux_latency[layer_id]))
+            self.total_shiftreg_latency.append(sequential_sum(self.shiftreg_latency[layer_id]))
+            self.total_adder_latency.append(sequential_sum(self.adder_latency[layer_id]))
+            self.total_jointmodule_latency.append(sequential_sum(self.jointmodule_latency[layer_id]))
+            self.total_pooling_latency.append(sequential_sum(self.pooling_latency[layer_id]))
+            self.total_buffer_r_latency.append(sequential_sum(self.buffer_r_latency[layer_id]))
+            self.total_buffer_w_latency.append(sequential_sum(self.buffer_w_latency[layer_id]))
+            self.layer_summary_update(layer_id)
 
     def Latency_stall_calculate(self):
-        ''' should be used after the calculate_model '''
+        '''
+        should be used after the calculate_model
+        :return: stalled layers, [(layer_id, stalled input layer, first stalled output of layer_id)]
+        '''
+        assert not self.summary_only, "the stall analysis needs the per-output history (summary_only=False)"
         Linebuffer_Size = 2048  # Bytes
         OutputBuffer_Size = 32 * 1024  # Bytes
         layer_occu = []
@@ -667,9 +675,9 @@ class Model_latency():
                 # if ((self.occupancy[layer_id] == 1) and (layer_dict['type'] == 'conv')) or (layer_dict['type'] == 'pooling'):
                 layer_occu.append(layer_id)
         ''' check the consecuive of the layer '''
+        stalled = []
         if len(layer_occu) == 0:
-            return
-        print(layer_occu)
+            return stalled
         layer_stall = []
         start = layer_occu[0]
         end = start
@@ -684,8 +692,8 @@ class Model_latency():
         if end > start:
             layer_stall.append([start, end])
         if len(layer_stall) == 0:
-            print("No need to be stalled")
-            return
+            # no need to be stalled
+            return stalled
         else:
             # print(layer_stall)
             for i in range(len(layer_stall)):
@@ -706,54 +714,75 @@ class Model_latency():
                     ''' get the point number of this layer and then go back to the previous layer '''
                     # TODO: update the tile usage of this
                     tile_num = self.graph.layer_tileinfo[layer_id]['tilenum']
-                    pre_point = 0
-                    cur_point = 0
-                    res = 0
                     if layer_dict['type'] == 'conv':
                         storage_capacity = Linebuffer_Size / input_channel_PE + OutputBuffer_Size * tile_num / outputchannel
                     else:
                         storage_capacity = Linebuffer_Size / inputchannel + OutputBuffer_Size * tile_num / outputchannel
                     # print("Storage is: ", storage_capacity)
-                    for cur_point in range(len(self.begin_time[layer_id])):
-                        cur_row = cur_point // output_size[1]  # begin from 0
-                        cur_column = cur_point - cur_row * output_size[1]  # begin from 0
-                        used_point = (stride * cur_row - padding) * input_size[1] + \
-                                     (cur_column * stride - padding) * stride
-                        pre_point = Search(self.begin_time[layer_id][cur_point], self.begin_time[layer_id+inputindex])
-                        # begin from 1
-                        res = storage_capacity - (pre_point + cur_point - used_point)
-                        # print(res)
-                        if res <= 0:
-                            print("You need to stall the Pipeline on Layer %d" % (layer_id+inputindex))
-                            break
+                    point_num = len(self.begin_time[layer_id])
+                    if point_num == 0:
+                        continue
+                    cur_point = np.arange(point_num)
+                    cur_row = cur_point // output_size[1]  # begin from 0
+                    cur_column = cur_point - cur_row * output_size[1]  # begin from 0
+                    used_point = (stride * cur_row - padding) * input_size[1] + \
+                                 (cur_column * stride - padding) * stride
+                    pre_point = Search_batch(self.begin_time[layer_id], self.begin_time[layer_id+inputindex])
+                    # begin from 1
+                    res = storage_capacity - (pre_point + cur_point - used_point)
+                    stall_point = np.flatnonzero(res <= 0)
                     # update the stall time
-                    if res > 0:
-                        print("No need to be stalled")
+                    if len(stall_point) == 0:
+                        # no need to be stalled
                         continue
                     else:
-                        pre_point = pre_point - 1
-                        # print(pre_point)
-                        while (pre_point < input_size[0] * input_size[1]):
-                            delta = self.begin_time[layer_id][cur_point] - self.begin_time[layer_id+inputindex][pre_point]
-                            assert delta > 0, "delta is not 0, something error"
-                            # self.begin_time[layer_id - 1][pre_point] = self.begin_time[layer_id][cur_point]
-                            consumption = stride ** 2
-                            for num in range(consumption):
-                                self.begin_time[layer_id+inputindex][pre_point + num] += delta
-                                self.finish_time[layer_id+inputindex][pre_point + num] += delta
-                                pre_point += consumption
-                            cur_point += 1
-                        interval = []
-                        for i in range(len(self.begin_time[layer_id+inputindex])):
-                            interval.append([self.begin_time[layer_id+inputindex][i], self.finish_time[layer_id+inputindex][i]])
-                        stall_interval = merge_interval(interval)
-                        self.compute_interval[layer_id+inputindex] = stall_interval
-                        print("++++++++++++++++++++++++++++++++")
-                        print("updated: ", self.begin_time[layer_id+inputindex])
-                        print("         ", self.finish_time[layer_id+inputindex])
-                        print("         ", self.compute_interval[layer_id+inputindex])
-                        print(len(stall_interval))
-        return
+                        # the pipeline is stalled on layer layer_id+inputindex
+                        cur_point = int(stall_point[0])
+                        stalled.append((layer_id, layer_id+inputindex, cur_point))
+                        pre_point = int(pre_point[cur_point]) - 1
+                        self.pipeline_stall_update(layer_id, layer_id+inputindex, cur_point, pre_point,
+                                                   input_size[0] * input_size[1], stride ** 2)
+        return stalled
+
+    def pipeline_stall_update(self, layer_id, pre_layer_id, cur_point, pre_point, input_num, consumption):
+        # delay the outputs of pre_layer_id from pre_point on, until the buffer of layer_id can hold them:
+        # step t delays consumption outputs of the previous layer by the begin time difference with point cur_point+t
+        # of this layer, the outputs of step t are pre_point+t*consumption**2+num*(consumption+1), num < consumption
+        step_num = max(0, -(-(input_num - pre_point) // consumption ** 2))
+        cur_begin_time = np.array(self.begin_time[layer_id])
+        pre_begin_time = np.array(self.begin_time[pre_layer_id])
+        pre_finish_time = np.array(self.finish_time[pre_layer_id])
+        step_point = pre_point + np.arange(step_num) * consumption ** 2
+        stall_point = (step_point[:, np.newaxis] + np.arange(consumption) * (consumption + 1)).ravel()
+        if pre_point < 0 or cur_point + step_num > len(cur_begin_time) or \
+                (step_num > 0 and stall_point[-1] >= len(pre_begin_time)):
+            # the stall runs over the end of a layer: keep the sequential update (and its errors)
+            self.pipeline_stall_update_sequential(layer_id, pre_layer_id, cur_point, pre_point, input_num, consumption)
+            return
+        delta = cur_begin_time[cur_point:cur_point + step_num] - pre_begin_time[step_point]
+        if not (delta > 0).all():
+            self.pipeline_stall_update_sequential(layer_id, pre_layer_id, cur_point, pre_point, input_num, consumption)
+            return
+        delta = np.repeat(delta, consumption)
+        pre_begin_time[stall_point] += delta
+        pre_finish_time[stall_point] += delta
+        self.begin_time[pre_layer_id] = pre_begin_time.tolist()
+        self.finish_time[pre_layer_id] = pre_finish_time.tolist()
+        self.compute_interval[pre_layer_id] = merge_interval_array(pre_begin_time, pre_finish_time)
+
+    def pipeline_stall_update_sequential(self, layer_id, pre_layer_id, cur_point, pre_point, input_num, consumption):
+        while (pre_point < input_num):
+            delta = self.begin_time[layer_id][cur_point] - self.begin_time[pre_layer_id][pre_point]
+            assert delta > 0, "delta is not 0, something error"
+            for num in range(consumption):
+                self.begin_time[pre_layer_id][pre_point + num] += delta
+                self.finish_time[pre_layer_id][pre_point + num] += delta
+                pre_point += consumption
+            cur_point += 1
+        interval = []
+        for i in range(len(self.begin_time[pre_layer_id])):
+            interval.append([self.begin_time[pre_layer_id][i], self.finish_time[pre_layer_id][i]])
+        self.compute_interval[pre_layer_id] = merge_interval(interval)
 
     def model_latency_output(self, module_information=1, layer_information=1):
         print(' ')
@@ -774,9 +803,9 @@ class Model_latency():
                     final_idx=list(map(int, input_l))
                     print("total latency:", total_latency)
                     if i == 0:
-                        print("layer latency:", max(self.finish_time[i]))
+                        print("layer latency:", self.layer_finish_time[i])
                     else:
-                        print("layer latency:", max(self.finish_time[i])-max(self.finish_time[i+final_idx[0]]))
+                        print("layer latency:", self.layer_finish_time[i]-self.layer_finish_time[i+final_idx[0]])
 
                     print("Buffer latency of layer", i, ":", self.total_buffer_latency[i], '(',
                           "%.2f" % (100 * self.total_buffer_latency[i] / total_latency), '%)')
@@ -820,43 +849,79 @@ class Model_latency():
                           "%.2f" % (100 * self.total_tile_transfer_latency[i] / total_latency), '%)')
                 print('----------------------------------------------')
         # print("Latency simulation finished!")
-        print("Entire latency:", max(max(self.finish_time)), "ns")
+        print("Entire latency:", max(self.layer_finish_time), "ns")
+        if self.latency_error_bound is not None:
+            print("Latency error bound:", self.latency_error_bound, "ns")
+
+    def calculate_model_throughput(self):
+        '''
+        steady-state throughput when images are streamed back to back through the layer pipeline,
+        should be used after the calculate_model_latency
+        the tiles of a layer are busy occupancy * (finish time - start time) per image,
+        the busiest layer (bottleneck) sets the initiation interval
+        :return: initiation interval (ns)
+        '''
+        self.layer_initiation_interval = [self.occupancy[i] * (self.layer_finish_time[i] - self.layer_begin_time[i])
+                                          for i in range(len(self.layer_finish_time))]
+        self.initiation_interval = max(self.layer_initiation_interval)
+        self.bottleneck_layer = self.layer_initiation_interval.index(self.initiation_interval)
+        return self.initiation_interval
+
+    def batch_latency(self, image_num=1):
+        # latency of image_num images streamed back to back (ns)
+        if self.initiation_interval is None:
+            self.calculate_model_throughput()
+        return max(self.layer_finish_time) + (image_num - 1) * self.initiation_interval
+
+    def model_throughput_output(self, image_num=1, layer_information=1):
+        if self.initiation_interval is None:
+            self.calculate_model_throughput()
+        if (layer_information):
+            for i in range(len(self.layer_initiation_interval)):
+                print("Initiation interval of layer", i, ":", self.layer_initiation_interval[i], "ns")
+        print("Bottleneck layer:", self.bottleneck_layer, " type:", self.NetStruct[self.bottleneck_layer][0][0]['type'])
+        print("Initiation interval:", self.initiation_interval, "ns")
+        print("Throughput:", 1e9 / self.initiation_interval, "images/s")
+        print("Latency of", image_num, "images:", self.batch_latency(image_num), "ns")
 
-    def layer_latency_initial(self):
+    def layer_latency_initial(self, output_num=None):
+        # output_num: number of outputs of the new layer, default: from its Outputsize (the table grows if needed)
+        if output_num is None:
+            layer_dict = self.NetStruct[len(self.begin_time)][0][0]
+            if 'Outputsize' in layer_dict:
+                output_num = int(np.prod(list(map(int, layer_dict['Outputsize']))))
+            else:
+                output_num = 1
         self.begin_time.append([])
         self.finish_time.append([])
         self.compute_interval.append([])
-        self.buffer_latency.append([])
-        self.computing_latency.append([])
-        self.DAC_latency.append([])
-        self.xbar_latency.append([])
-        self.ADC_latency.append([])
-        self.buffer_r_latency.append([])
-        self.buffer_w_latency.append([])
+        self.pixel_latency.append(np.zeros(output_num, dtype=pixel_latency_dtype))
+        self.pixel_count.append(0)
         self.inbuffer_latency.append([])
         self.outbuffer_latency.append([])
-        self.iReg_latency.append([])
-        self.input_demux_latency.append([])
-        self.output_mux_latency.append([])
-        self.shiftreg_latency.append([])
-        self.adder_latency.append([])
-        self.oReg_latency.append([])
-        self.jointmodule_latency.append([])
-        self.pooling_latency.append([])
-        self.digital_latency.append([])
-        self.intra_tile_latency.append([])
-        self.inter_tile_latency.append([])
-        self.tile_merge_latency.append([])
-        self.tile_transfer_latency.append([])
 
     def calculate_model_latency(self, mode=0):
         '''
         merge the latency_0 and latency_1
         :param mode: 0: fill in input data row by row, 1: fill in input data kerlenl size by kernel size (column direction)
+                     (other modes, e.g. 2, are the same as 1), 3: fast estimate of mode 1 (calculate_model_latency_estimate)
         :return:
         '''
+        if mode == 3:
+            self.calculate_model_latency_estimate()
+            return
+        self.latency_mode = mode
         for layer_id in range(len(self.NetStruct)):
             layer_dict = self.NetStruct[layer_id][0][0]
+            if self.layer_memo is not None:
+                signature = self.layer_signature(layer_id, mode)
+                if signature in self.layer_memo:
+                    # repeated layer: per-output latency terms of the memo table, same results as the loops below
+                    tasks = self.layer_tasks(layer_id, mode)
+                    self.layer_tasks_update(layer_id, tasks, *self.layer_tasks_schedule(tasks))
+                    self.layer_latency_statistics(layer_id)
+                    continue
+                self.layer_memo[signature] = None
             if layer_id == 0:
                 # for the first layer, first layer must be conv layer
                 self.layer_latency_initial()
@@ -871,14 +936,14 @@ class Model_latency():
                 outputbit = int(layer_dict['outputbit'])
                 input_channel_PE = self.graph.layer_tileinfo[layer_id]['max_row'] / (kernelsize ** 2)
                 # the input channel number each PE processes
-                temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                          read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                          read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
-                                                          indata=0, rdata=0, inprecision=inputbit,
-                                                          PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                          default_inbuf_size=self.graph.max_inbuf_size,
-                                                          default_outbuf_size=self.graph.max_outbuf_size
-                                                          )
+                temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                                 read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                                 read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
+                                                                 indata=0, rdata=0, inprecision=inputbit,
+                                                                 PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                                 default_inbuf_size=self.graph.max_inbuf_size,
+                                                                 default_outbuf_size=self.graph.max_outbuf_size
+                                                                 )
                 temp_tile_latency.outbuf.calculate_buf_read_latency(rdata = (self.graph.layer_tileinfo[layer_id]['max_column']*
                                                                              outputbit*self.graph.layer_tileinfo[layer_id]['max_PE']/8))
                 temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
@@ -997,15 +1062,15 @@ class Model_latency():
                     inputindex = Inputindex_list[0]
                     input_channel_PE = self.graph.layer_tileinfo[layer_id]['max_row'] / (kernelsize ** 2)
                     # the input channel number each PE processes
-                    temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                              read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                              read_column=self.graph.layer_tileinfo[layer_id][
-                                                                  'max_column'],
-                                                              indata=0, rdata=0, inprecision=inputbit,
-                                                              PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                              default_inbuf_size=self.graph.max_inbuf_size,
-                                                              default_outbuf_size=self.graph.max_outbuf_size
-                                                              )
+                    temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                                     read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                                     read_column=self.graph.layer_tileinfo[layer_id][
+                                                                         'max_column'],
+                                                                     indata=0, rdata=0, inprecision=inputbit,
+                                                                     PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                                     default_inbuf_size=self.graph.max_inbuf_size,
+                                                                     default_outbuf_size=self.graph.max_outbuf_size
+                                                                     )
                     temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
                                outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
                     temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
@@ -1165,41 +1230,7 @@ class Model_latency():
                     cur_multiple = self.multiple[layer_id]
                     assert cur_multiple == 1, "Only the conv layer can be multipled"
                     if layer_dict['type'] == 'fc':
-                        output_size = int(layer_dict['Outfeature'])
-                        input_size = int(layer_dict['Infeature'])
-                        self.layer_split.append([input_size])
-                        inputbit = int(layer_dict['Inputbit'])
-                        outputbit = int(layer_dict['outputbit'])
-                        self.layer_latency_initial()
-                        indata = self.graph.layer_tileinfo[layer_id]['max_row'] * inputbit / 8
-                        rdata = indata
-                        temp_tile_latency = tile_latency_analysis(SimConfig_path=self.SimConfig_path,
-                                                                  read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
-                                                                  read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
-                                                                  indata=indata, rdata=rdata, inprecision=inputbit,
-                                                                  PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
-                                                                  default_inbuf_size=self.graph.max_inbuf_size,
-                                                                  default_outbuf_size=self.graph.max_outbuf_size
-                                                                  )
-                        temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
-                                   outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
-                        temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
-                        merge_time = temp_tile_latency.tile_buf_rlatency + self.graph.inLayer_distance[0][layer_id] * \
-                                     (temp_tile_latency.digital_period + self.graph.layer_tileinfo[layer_id]['max_column'] *
-                                      self.graph.layer_tileinfo[layer_id]['max_PE'] * outputbit / self.inter_tile_bandwidth)
-                        # Todo: update merge time (adder tree) and transfer data volume
-                        transfer_time = self.graph.transLayer_distance[0][layer_id] * (
-                                    output_size * outputbit / self.inter_tile_bandwidth)
-                        temp_Inputindex = self.graph.layer_tileinfo[layer_id]['Inputindex']
-                        max_prelayer_time = 0
-                        for idx in temp_Inputindex:
-                            tmp_time = self.finish_time[layer_id+idx][-1]
-                            if tmp_time > max_prelayer_time:
-                                max_prelayer_time = tmp_time
-                        begin_time = max_prelayer_time
-                        compute_time = temp_tile_latency.tile_latency + merge_time + transfer_time + begin_time
-                        self.pipe_result_update(layer_type='fc', begin_time=begin_time, compute_time=compute_time, layer_id=layer_id,
-                                                temp_tile_latency=temp_tile_latency, merge_time=merge_time, transfer_time=transfer_time, output_size=output_size)
+                        self.fc_layer_latency(layer_id)
                     elif layer_dict['type'] == 'pooling':
                         self.layer_latency_initial()
                         output_size = list(map(int, layer_dict['Outputsize']))
@@ -1368,32 +1399,553 @@ class Model_latency():
                                 self.pre_max_time = compute_time
                                 self.pipe_result_update(layer_type='element_multiply', begin_time=begin_time, compute_time=compute_time, layer_id=layer_id,
                                                         global_buf=global_buf, merge_time=merge_time, transfer_time=transfer_time)
+            self.layer_latency_statistics(layer_id)
+
+    def fc_layer_tasks(self, layer_id):
+        # task table of a fc layer, see conv_layer_tasks
+        layer_dict = self.NetStruct[layer_id][0][0]
+        output_size = int(layer_dict['Outfeature'])
+        input_size = int(layer_dict['Infeature'])
+        self.layer_split.append([input_size])
+        inputbit = int(layer_dict['Inputbit'])
+        outputbit = int(layer_dict['outputbit'])
+        self.layer_latency_initial()
+        indata = self.graph.layer_tileinfo[layer_id]['max_row'] * inputbit / 8
+        rdata = indata
+        temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                         read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                         read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
+                                                         indata=indata, rdata=rdata, inprecision=inputbit,
+                                                         PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                         default_inbuf_size=self.graph.max_inbuf_size,
+                                                         default_outbuf_size=self.graph.max_outbuf_size
+                                                         )
+        temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
+                   outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
+        temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
+        merge_time = temp_tile_latency.tile_buf_rlatency + self.graph.inLayer_distance[0][layer_id] * \
+                     (temp_tile_latency.digital_period + self.graph.layer_tileinfo[layer_id]['max_column'] *
+                      self.graph.layer_tileinfo[layer_id]['max_PE'] * outputbit / self.inter_tile_bandwidth)
+        # Todo: update merge time (adder tree) and transfer data volume
+        transfer_time = self.graph.transLayer_distance[0][layer_id] * (
+                    output_size * outputbit / self.inter_tile_bandwidth)
+        # one task: all the outputs are ready at the same time, when the last inputs are ready
+        dependency = [(layer_id + idx, np.array([-1])) for idx in self.graph.layer_tileinfo[layer_id]['Inputindex']]
+        return {'layer_type': 'fc', 'slice': np.zeros(1, dtype=int), 'row_num': 1,
+                'latency': np.array([temp_tile_latency.tile_latency + merge_time + transfer_time]),
+                'dependency': dependency, 'output_task': np.zeros(output_size, dtype=int),
+                'update': dict(temp_tile_latency=temp_tile_latency, merge_time=merge_time, transfer_time=transfer_time,
+                               output_size=output_size)}
+
+    def fc_layer_latency(self, layer_id):
+        tasks = self.fc_layer_tasks(layer_id)
+        self.layer_tasks_update(layer_id, tasks, *self.layer_tasks_schedule(tasks))
+
+    def layer_latency_statistics(self, layer_id, runtime=None):
+        # occupancy and total latency of each module of one layer
+        # runtime: working time of the layer, default: from its working intervals (compute_interval)
+        if runtime is None:
             self.compute_interval[layer_id] = merge_interval(self.compute_interval[layer_id])
             temp_runtime = 0
             for l in range(len(self.compute_interval[layer_id])):
                 temp_runtime += (self.compute_interval[layer_id][l][1] - self.compute_interval[layer_id][l][0])
-            self.occupancy.append(temp_runtime / (max(self.finish_time[layer_id]) - min(self.begin_time[layer_id])))
-            self.total_buffer_latency.append(sum(self.buffer_latency[layer_id]))
-            self.total_computing_latency.append(sum(self.computing_latency[layer_id]))
-            self.total_DAC_latency.append(sum(self.DAC_latency[layer_id]))
-            self.total_xbar_latency.append(sum(self.xbar_latency[layer_id]))
-            self.total_ADC_latency.append(sum(self.ADC_latency[layer_id]))
-            self.total_digital_latency.append(sum(self.digital_latency[layer_id]))
-            self.total_inter_tile_latency.append(sum(self.inter_tile_latency[layer_id]))
-            self.total_intra_tile_latency.append(sum(self.intra_tile_latency[layer_id]))
-            self.total_tile_merge_latency.append(sum(self.tile_merge_latency[layer_id]))
-            self.total_tile_transfer_latency.append(sum(self.tile_transfer_latency[layer_id]))
-            self.total_iReg_latency.append(sum(self.iReg_latency[layer_id]))
-            self.total_oReg_latency.append(sum(self.oReg_latency[layer_id]))
-            self.total_input_demux_latency.append(sum(self.input_demux_latency[layer_id]))
-            self.total_output_mux_latency.append(sum(self.output_mux_latency[layer_id]))
-            self.total_shiftreg_latency.append(sum(self.shiftreg_latency[layer_id]))
-            self.total_adder_latency.append(sum(self.adder_latency[layer_id]))
-            self.total_jointmodule_latency.append(sum(self.jointmodule_latency[layer_id]))
-            self.total_pooling_latency.append(sum(self.pooling_latency[layer_id]))
-            self.total_buffer_r_latency.append(sum(self.buffer_r_latency[layer_id]))
-            self.total_buffer_w_latency.append(sum(self.buffer_w_latency[layer_id]))
+        else:
+            temp_runtime = runtime
+        self.occupancy.append(temp_runtime / (max(self.finish_time[layer_id]) - min(self.begin_time[layer_id])))
+        self.total_buffer_latency.append(sequential_sum(self.buffer_latency[layer_id]))
+        self.total_computing_latency.append(sequential_sum(self.computing_latency[layer_id]))
+        self.total_DAC_latency.append(sequential_sum(self.DAC_latency[layer_id]))
+        self.total_xbar_latency.append(sequential_sum(self.xbar_latency[layer_id]))
+        self.total_ADC_latency.append(sequential_sum(self.ADC_latency[layer_id]))
+        self.total_digital_latency.append(sequential_sum(self.digital_latency[layer_id]))
+        self.total_inter_tile_latency.append(sequential_sum(self.inter_tile_latency[layer_id]))
+        self.total_intra_tile_latency.append(sequential_sum(self.intra_tile_latency[layer_id]))
+        self.total_tile_merge_latency.append(sequential_sum(self.tile_merge_latency[layer_id]))
+        self.total_tile_transfer_latency.append(sequential_sum(self.tile_transfer_latency[layer_id]))
+        self.total_iReg_latency.append(sequential_sum(self.iReg_latency[layer_id]))
+        self.total_oReg_latency.append(sequential_sum(self.oReg_latency[layer_id]))
+        self.total_input_demux_latency.append(sequential_sum(self.input_demux_latency[layer_id]))
+        self.total_output_mux_latency.append(sequential_sum(self.output_mux_latency[layer_id]))
+        self.total_shiftreg_latency.append(sequential_sum(self.shiftreg_latency[layer_id]))
+        self.total_adder_latency.append(sequential_sum(self.adder_latency[layer_id]))
+        self.total_jointmodule_latency.append(sequential_sum(self.jointmodule_latency[layer_id]))
+        self.total_pooling_latency.append(sequential_sum(self.pooling_latency[layer_id]))
+        self.total_buffer_r_latency.append(sequential_sum(self.buffer_r_latency[layer_id]))
+        self.total_buffer_w_latency.append(sequential_sum(self.buffer_w_latency[layer_id]))
+        self.layer_summary_update(layer_id)
+
+    def layer_summary_update(self, layer_id):
+        # record the start/finish time of the layer, release the history which is no longer needed
+        self.layer_begin_time.append(min(self.begin_time[layer_id]))
+        self.layer_finish_time.append(max(self.finish_time[layer_id]))
+        if self.trace is not None:
+            self.trace.layer(self, layer_id)
+        if self.summary_only:
+            # the next layers only read the finish times
+            self.layer_history_release(layer_id, finish_time=False)
+            for i in range(layer_id + 1):
+                if self.last_use[i] == layer_id:
+                    self.layer_history_release(i)
 
+    def layer_history_release(self, layer_id, finish_time=True):
+        self.begin_time[layer_id] = []
+        if finish_time:
+            self.finish_time[layer_id] = []
+        self.compute_interval[layer_id] = []
+        self.pixel_latency[layer_id] = np.zeros(0, dtype=pixel_latency_dtype)
+        self.pixel_count[layer_id] = 0
+        self.inbuffer_latency[layer_id] = []
+        self.outbuffer_latency[layer_id] = []
+
+
+    def Judge_batch(self, last_layer_id, last_layer_pos, current_layer_id):
+        # vectorized Judge over an array of positions of the input layer
+        layer_dict = self.NetStruct[current_layer_id][0][0]
+        kernelsize = int(layer_dict['Kernelsize'])
+        last_split = np.array(self.layer_split[last_layer_id])
+        input_size = list(map(int, layer_dict['Inputsize']))[1]
+        Row = (last_layer_pos+1) // input_size
+        last_column = (last_layer_pos+1) % input_size
+        split_bound = np.cumsum(last_split)
+        m = np.searchsorted(split_bound, last_column, side='left')
+        if np.any(m >= len(last_split)):
+            raise IndexError("list index out of range")
+        last_column = last_column - np.concatenate(([0], split_bound))[m]
+        pos = m * last_split[m]  # Judge adds last_split[m] m times
+        return np.where((last_column - kernelsize >= 0) | (m == 0), last_layer_pos, pos - 1 + Row * input_size)
+
+    def pipe_result_update_batch(self, layer_type='conv', begin_time=None, compute_time=None, layer_id=0,
+                                 temp_tile_latency=None, temp_pooling_latency=None, global_buf=None,
+                                 merge_time=0, transfer_time=0, buf_rlatency=0, buf_wlatency=0, record_interval=True):
+        # pipe_result_update for all outputs of one layer
+        # buf_rlatency, buf_wlatency: per-output input buffer read/write latency (conv: PE input buffer, pooling: inbuf)
+        # record_interval: False: the working intervals are not recorded (compute_interval is left empty)
+        self.begin_time[layer_id] = begin_time.tolist()
+        self.finish_time[layer_id] = compute_time.tolist()
+        if record_interval:
+            self.compute_interval[layer_id] = merge_interval_array(begin_time, compute_time)
+        breakdown = self.pixel_latency_breakdown(layer_type, temp_tile_latency=temp_tile_latency,
+                                                 temp_pooling_latency=temp_pooling_latency, global_buf=global_buf,
+                                                 merge_time=merge_time, transfer_time=transfer_time,
+                                                 buf_rlatency=buf_rlatency, buf_wlatency=buf_wlatency)
+        table = np.zeros(len(begin_time), dtype=pixel_latency_dtype)
+        for name, value in breakdown.items():
+            table[name] = value
+        self.pixel_latency[layer_id] = table
+        self.pixel_count[layer_id] = len(table)
+
+    def conv_layer_tasks(self, layer_id, mode=0):
+        '''
+        task table of a conv layer: the outputs in the order of the loops of calculate_model_latency
+        slice: the slice (replicated tile group) computing each output, the outputs of a slice are computed in order
+        row_num: number of output rows (the outputs of a slice are computed row by row)
+        latency: latency terms of each output (added to its begin time in this order)
+        dependency: [(input layer id, position of the last required output of the input layer), ...]
+        output_task: task of each output (None: one task per output)
+        update: arguments of the result update of the layer
+        '''
+        layer_dict = self.NetStruct[layer_id][0][0]
+        self.layer_latency_initial()
+        output_size = list(map(int, layer_dict['Outputsize']))
+        input_size = list(map(int, layer_dict['Inputsize']))
+        kernelsize = int(layer_dict['Kernelsize'])
+        stride = int(layer_dict['Stride'])
+        outputchannel = int(layer_dict['Outputchannel'])
+        padding = int(layer_dict['Padding'])
+        inputbit = int(layer_dict['Inputbit'])
+        outputbit = int(layer_dict['outputbit'])
+        input_channel_PE = self.graph.layer_tileinfo[layer_id]['max_row'] / (kernelsize ** 2)
+        # the input channel number each PE processes
+        temp_tile_latency = cached_tile_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                         read_row=self.graph.layer_tileinfo[layer_id]['max_row'],
+                                                         read_column=self.graph.layer_tileinfo[layer_id]['max_column'],
+                                                         indata=0, rdata=0, inprecision=inputbit,
+                                                         PE_num=self.graph.layer_tileinfo[layer_id]['max_PE'],
+                                                         default_inbuf_size=self.graph.max_inbuf_size,
+                                                         default_outbuf_size=self.graph.max_outbuf_size
+                                                         )
+        temp_tile_latency.outbuf.calculate_buf_read_latency(rdata=(self.graph.layer_tileinfo[layer_id]['max_column'] *
+                                                                   outputbit * self.graph.layer_tileinfo[layer_id]['max_PE'] / 8))
+        temp_tile_latency.tile_buf_rlatency = temp_tile_latency.outbuf.buf_rlatency
+        merge_time = temp_tile_latency.tile_buf_rlatency + self.graph.inLayer_distance[0][layer_id] * \
+                     (temp_tile_latency.digital_period + self.graph.layer_tileinfo[layer_id]['max_column'] *
+                      self.graph.layer_tileinfo[layer_id]['max_PE'] * outputbit / self.inter_tile_bandwidth)
+        transfer_time = self.graph.transLayer_distance[0][layer_id] * (outputchannel * outputbit / self.inter_tile_bandwidth)
+        cur_multiple = self.multiple[layer_id]
+        split_size = Split_map(padding=padding, outputsize=output_size[1], multiple=cur_multiple)
+        self.layer_split.append(split_size)
+
+        def conv_service():
+            # per-output latency terms and input positions, shared by the layers with the same signature
+            # input data volume of the first output, of the first output of a row and of the other outputs (per slice)
+            first_indata = []
+            row_indata = []
+            for m in range(cur_multiple):
+                if mode == 0:
+                    if cur_multiple == 1:
+                        first_indata.append(input_channel_PE * (input_size[1] * max(kernelsize - padding - 1, 0) +
+                                                                max(kernelsize - padding, 0)) * inputbit / 8)
+                        row_indata.append(input_channel_PE * (input_size[1] * (stride - 1) + max(kernelsize - padding, 0)) * inputbit / 8)
+                    elif m == 0:
+                        temp_insize = inoutsize_conversion(kernelsize=kernelsize, padding=padding / 2, stride=stride,
+                                                           outputsize=split_size[m])  # only one padding column
+                        first_indata.append(input_channel_PE * (temp_insize * max(kernelsize - padding - 1, 0) +
+                                                                max(kernelsize - padding, 0)) * inputbit / 8)
+                        row_indata.append(input_channel_PE * (temp_insize * (stride - 1) + max(kernelsize - padding, 0)) * inputbit / 8)
+                    elif m == cur_multiple - 1:
+                        temp_insize = inoutsize_conversion(kernelsize=kernelsize, padding=padding / 2, stride=stride,
+                                                           outputsize=split_size[m])  # only one padding column
+                        first_indata.append(input_channel_PE * (temp_insize * max(kernelsize - padding - 1, 0) +
+                                                                kernelsize) * inputbit / 8)
+                        row_indata.append(input_channel_PE * (temp_insize * (stride - 1) + kernelsize) * inputbit / 8)
+                    else:
+                        temp_insize = inoutsize_conversion(kernelsize=kernelsize, padding=0, stride=stride,
+                                                           outputsize=split_size[m])  # only one padding column
+                        first_indata.append(input_channel_PE * (temp_insize * max(kernelsize - padding - 1, 0) +
+                                                                kernelsize) * inputbit / 8)
+                        row_indata.append(input_channel_PE * (temp_insize * (stride - 1) + kernelsize) * inputbit / 8)
+                else:
+                    if (cur_multiple == 1) or (m == 0):
+                        first_indata.append(input_channel_PE * (max(kernelsize - padding, 0) ** 2) * inputbit / 8)
+                        row_indata.append(input_channel_PE * stride * max(kernelsize - padding, 0) * inputbit / 8)
+                    else:
+                        first_indata.append(input_channel_PE * (max(kernelsize - padding, 0) * kernelsize) * inputbit / 8)
+                        row_indata.append(input_channel_PE * stride * kernelsize * inputbit / 8)
+            if mode == 0:
+                first_row_indata = input_channel_PE * stride * inputbit / 8
+                other_row_indata = first_row_indata
+            else:
+                first_row_indata = input_channel_PE * stride * kernelsize * inputbit / 8
+                other_row_indata = input_channel_PE * stride ** 2 * inputbit / 8
+            line_rdata = self.graph.layer_tileinfo[layer_id]['max_row'] * inputbit / 8
+            kernel_rdata = stride * kernelsize * input_channel_PE * inputbit / 8
+
+            # outputs in the order of the loops of calculate_model_latency: row i, slice m, column j of the slice
+            row = np.repeat(np.arange(output_size[0]), output_size[1])
+            slice_id = np.tile(np.repeat(np.arange(cur_multiple), split_size), output_size[0])
+            column = np.tile(np.concatenate([np.arange(size) for size in split_size]).astype(int), output_size[0])
+            indata = np.where(column > 0, np.where(row == 0, first_row_indata, other_row_indata),
+                              np.where(row == 0, np.array(first_indata)[slice_id], np.array(row_indata)[slice_id]))
+            rdata = np.where(column > 0, kernel_rdata, line_rdata)
+            tile_latency, PE_buf_rlatency, PE_buf_wlatency = temp_tile_latency.calculate_tile_latency_batch(indata=indata, rdata=rdata)
+
+            # the required input data (in all input layers)
+            dependency = []
+            if layer_id != 0:
+                if kernelsize > 1:
+                    last_layer_pos = (np.minimum(max(kernelsize-padding, 1) + stride * row, input_size[0]) - 1) * \
+                                     input_size[1] + np.minimum(max(kernelsize-padding, 1) + stride * column, input_size[1]) - 1
+                else:
+                    last_layer_pos = row*stride*input_size[1]+column*stride
+                for idx in self.graph.layer_tileinfo[layer_id]['Inputindex']:
+                    if cur_multiple == 1:
+                        pos = last_layer_pos
+                    else:
+                        pos = self.Judge_batch(last_layer_id=(layer_id+idx), last_layer_pos=last_layer_pos, current_layer_id=layer_id)
+                    dependency.append((idx, pos))
+            return {'slice': slice_id, 'tile_latency': tile_latency, 'PE_buf_rlatency': PE_buf_rlatency,
+                    'PE_buf_wlatency': PE_buf_wlatency, 'dependency': dependency}
+
+        service = self.layer_memo_lookup(layer_id, mode, conv_service)
+        dependency = [(layer_id + idx, pos) for idx, pos in service['dependency']]
+        return {'layer_type': 'conv', 'slice': service['slice'], 'row_num': output_size[0],
+                'latency': service['tile_latency'] + merge_time + transfer_time,
+                'dependency': dependency, 'output_task': None,
+                'update': dict(temp_tile_latency=temp_tile_latency, merge_time=merge_time, transfer_time=transfer_time,
+                               buf_rlatency=service['PE_buf_rlatency'], buf_wlatency=service['PE_buf_wlatency'])}
+
+    def pooling_layer_tasks(self, layer_id, mode=0):
+        # task table of a pooling layer, see conv_layer_tasks
+        layer_dict = self.NetStruct[layer_id][0][0]
+        self.layer_latency_initial()
+        output_size = list(map(int, layer_dict['Outputsize']))
+        input_size = list(map(int, layer_dict['Inputsize']))
+        self.layer_split.append([input_size[1]])
+        kernelsize = int(layer_dict['Kernelsize'])
+        stride = int(layer_dict['Stride'])
+        inputchannel = int(layer_dict['Inputchannel'])
+        outputchannel = int(layer_dict['Outputchannel'])
+        padding = int(layer_dict['Padding'])
+        inputbit = int(layer_dict['Inputbit'])
+        outputbit = int(layer_dict['outputbit'])
+        temp_pooling_latency = pooling_latency_analysis(SimConfig_path=self.SimConfig_path,
+                                                        indata=0, rdata=0, outprecision = outputbit,
+                                                        default_inbuf_size = self.graph.max_inbuf_size,
+                                                        default_outbuf_size = self.graph.max_outbuf_size,
+                                                        default_inchannel = inputchannel, default_size = (kernelsize**2))
+        temp_pooling_latency.outbuf.calculate_buf_read_latency(rdata=(outputchannel*outputbit/8))
+        temp_pooling_latency.outbuf_rlatency = temp_pooling_latency.outbuf.buf_rlatency
+        merge_time = temp_pooling_latency.outbuf_rlatency
+        transfer_time = self.graph.transLayer_distance[0][layer_id] * (
+                outputchannel * outputbit / self.inter_tile_bandwidth)
+
+        def pooling_service():
+            if mode == 0:
+                first_indata = inputchannel * (input_size[1] * max(kernelsize-padding-1,0)+max(kernelsize-padding,0))*inputbit/8
+                row_indata = inputchannel * (input_size[1] * (stride - 1) + max(kernelsize - padding, 0)) * inputbit/8
+                other_indata = inputchannel * stride * inputbit / 8
+            else:
+                first_indata = inputchannel * (max(kernelsize-padding,0)**2)*inputbit/8
+                row_indata = inputchannel * stride * max(kernelsize - padding, 0) * inputbit / 8
+                other_indata = inputchannel * stride **2 * inputbit / 8
+            row = np.repeat(np.arange(output_size[0]), output_size[1])
+            column = np.tile(np.arange(output_size[1]), output_size[0])
+            indata = np.where(column > 0, other_indata, np.where(row == 0, first_indata, row_indata))
+            rdata = np.where(column > 0, stride * kernelsize * inputchannel * inputbit / 8, inputchannel * kernelsize ** 2 * inputbit / 8)
+            pooling_latency, inbuf_rlatency, inbuf_wlatency = temp_pooling_latency.calculate_pooling_latency_batch(indata=indata, rdata=rdata)
+            last_layer_pos = (np.minimum(max(kernelsize - padding, 1) + stride * row, input_size[0]) - 1) * \
+                             input_size[1] + np.minimum(max(kernelsize - padding, 1) + stride * column, input_size[1]) - 1
+            return {'pooling_latency': pooling_latency, 'inbuf_rlatency': inbuf_rlatency, 'inbuf_wlatency': inbuf_wlatency,
+                    'last_layer_pos': last_layer_pos}
+
+        service = self.layer_memo_lookup(layer_id, mode, pooling_service)
+        dependency = [(layer_id + idx, service['last_layer_pos']) for idx in self.graph.layer_tileinfo[layer_id]['Inputindex']]
+        return {'layer_type': 'pooling', 'slice': np.zeros(len(service['last_layer_pos']), dtype=int), 'row_num': output_size[0],
+                'latency': service['pooling_latency'] + merge_time + transfer_time, 'dependency': dependency, 'output_task': None,
+                'update': dict(temp_pooling_latency=temp_pooling_latency, merge_time=merge_time, transfer_time=transfer_time,
+                               buf_rlatency=service['inbuf_rlatency'], buf_wlatency=service['inbuf_wlatency'])}
+
+    def element_layer_tasks(self, layer_id):
+        # task table of an element_sum / element_multiply layer, see conv_layer_tasks
+        layer_dict = self.NetStruct[layer_id][0][0]
+        self.layer_latency_initial()
+        Inputindex_list = list(map(int, layer_dict['Inputindex']))
+        assert len(Inputindex_list) > 1, "the number of %s's previous layers must > 1" % layer_dict['type']
+        idx = 0
+        previous_layer_dict = self.NetStruct[layer_id + Inputindex_list[0]][0][0]
+        if layer_dict['type'] == 'element_multiply':
+            # find the inputlayer with the max input size
+            for i in range(len(Inputindex_list)):
+                if self.NetStruct[layer_id + Inputindex_list[i]][0][0]['Outputsize'] > previous_layer_dict['Outputsize']:
+                    previous_layer_dict = self.NetStruct[layer_id + Inputindex_list[i]][0][0]
+        while previous_layer_dict['type'] == layer_dict['type']:
+            idx = idx + 1
+            previous_layer_dict = self.NetStruct[layer_id + Inputindex_list[idx]][0][0]
+        output_size = list(map(int, previous_layer_dict['Outputsize']))
+        input_size = list(map(int, previous_layer_dict['Outputsize']))
+        self.layer_split.append([input_size[1]])
+        inputchannel = int(previous_layer_dict['Outputchannel'])
+        outputchannel = int(previous_layer_dict['Outputchannel'])
+        inputbit = int(previous_layer_dict['outputbit'])
+        outputbit = int(previous_layer_dict['outputbit'])
+        merge_time = 0
+        transfer_time = self.graph.transLayer_distance[0][layer_id]*(outputchannel*outputbit/self.inter_tile_bandwidth)
+        global_buf = buffer(SimConfig_path=self.SimConfig_path,buf_level=2,default_buf_size=self.graph.global_buf_size)
+        global_buf.calculate_buf_read_latency(rdata=(len(Inputindex_list)*inputbit*inputchannel/8))
+        global_buf.calculate_buf_write_latency(wdata=(len(Inputindex_list)*inputbit*inputchannel/8))
+        position = (np.arange(output_size[0])[:, np.newaxis] * input_size[1] + np.arange(output_size[1])).ravel()
+        dependency = []
+        for idx in Inputindex_list:
+            if (layer_dict['type'] == 'element_multiply') and (self.NetStruct[layer_id + idx][0][0]['type'] == 'fc'):
+                dependency.append((layer_id + idx, np.zeros(len(position), dtype=int)))
+            else:
+                dependency.append((layer_id + idx, position))
+        # compute_time = 10+merge_time+transfer_time+begin_time+global_buf.buf_rlatency+global_buf.buf_wlatency
+        latency = np.empty((len(position), 3))
+        latency[:, 0] = 10 + merge_time + transfer_time
+        latency[:, 1] = global_buf.buf_rlatency
+        latency[:, 2] = global_buf.buf_wlatency
+        return {'layer_type': layer_dict['type'], 'slice': np.zeros(len(position), dtype=int), 'row_num': output_size[0],
+                'latency': latency,
+                'dependency': dependency, 'output_task': None,
+                'update': dict(global_buf=global_buf, merge_time=merge_time, transfer_time=transfer_time)}
+
+    def layer_signature(self, layer_id, mode=0):
+        # the per-output latency terms of a layer only depend on its signature,
+        # the merge/transfer time (tile distances) are added per layer
+        layer_dict = self.NetStruct[layer_id][0][0]
+        tileinfo = self.graph.layer_tileinfo[layer_id]
+        signature = [mode == 0, layer_id == 0, self.multiple[layer_id],
+                     [[key, value] for key, value in layer_dict.items() if key not in ['Layerindex', 'Outputindex']],
+                     [tileinfo['max_row'], tileinfo['max_column'], tileinfo['max_PE']]]
+        if layer_dict['type'] == 'conv' and self.multiple[layer_id] > 1:
+            # the input positions depend on the split of the input layers (Judge)
+            signature.append([self.layer_split[layer_id + idx] for idx in tileinfo['Inputindex'] if layer_id + idx >= 0])
+        elif layer_dict['type'] in ['element_sum', 'element_multiply']:
+            signature.append([[[key, value] for key, value in self.NetStruct[layer_id + idx][0][0].items()
+                               if key not in ['Layerindex', 'Outputindex']] for idx in layer_dict['Inputindex']])
+        return json.dumps(signature, default=str)
+
+    def layer_memo_lookup(self, layer_id, mode, compute):
+        # compute: function returning the per-output latency terms of the layer
+        # a missing or None entry (signature seen once by calculate_model_latency) is computed and stored
+        if self.layer_memo is None:
+            return compute()
+        signature = self.layer_signature(layer_id, mode)
+        if self.layer_memo.get(signature) is None:
+            self.layer_memo[signature] = compute()
+        else:
+            self.layer_memo_hit += 1
+        return self.layer_memo[signature]
+
+    def layer_tasks(self, layer_id, mode=0):
+        # task table of a layer
+        layer_dict = self.NetStruct[layer_id][0][0]
+        if (layer_id == 0) or (layer_dict['type'] == 'conv'):
+            # the first layer must be conv layer
+            return self.conv_layer_tasks(layer_id, mode)
+        cur_multiple = self.multiple[layer_id]
+        assert cur_multiple == 1, "Only the conv layer can be multipled"
+        if layer_dict['type'] == 'fc':
+            return self.fc_layer_tasks(layer_id)
+        elif layer_dict['type'] == 'pooling':
+            return self.pooling_layer_tasks(layer_id, mode)
+        elif layer_dict['type'] in ['element_sum', 'element_multiply']:
+            return self.element_layer_tasks(layer_id)
+
+    def layer_tasks_ready_time(self, tasks):
+        # time when the inputs of each task are ready, the input layers are computed
+        ready_time = np.zeros(len(tasks['slice']))
+        for input_layer_id, pos in tasks['dependency']:
+            ready_time = np.maximum(ready_time, np.array(self.finish_time[input_layer_id])[pos])
+        return ready_time
+
+    def layer_tasks_schedule(self, tasks):
+        # begin/finish time of the tasks of a layer, the input layers are computed
+        ready_time = self.layer_tasks_ready_time(tasks)
+        begin_time = np.zeros(len(ready_time))
+        compute_time = np.zeros(len(ready_time))
+        # each slice is an independent pipeline
+        for m in np.unique(tasks['slice']):
+            index = np.flatnonzero(tasks['slice'] == m)
+            begin_time[index], compute_time[index] = pipeline_schedule(ready_time[index], tasks['latency'][index])
+        return begin_time, compute_time
+
+    def layer_tasks_schedule_estimate(self, tasks, fill_rows=4):
+        # layer_tasks_schedule with the steady rows of each slice extrapolated (pipeline_schedule_estimate)
+        # return: begin/finish time of the tasks, error bound of the finish times for exact ready times
+        ready_time = self.layer_tasks_ready_time(tasks)
+        begin_time = np.zeros(len(ready_time))
+        compute_time = np.zeros(len(ready_time))
+        error_bound = 0.0
+        for m in np.unique(tasks['slice']):
+            index = np.flatnonzero(tasks['slice'] == m)
+            begin_time[index], compute_time[index], slice_error_bound = \
+                pipeline_schedule_estimate(ready_time[index], tasks['latency'][index], tasks['row_num'], fill_rows)
+            error_bound = max(error_bound, slice_error_bound)
+        return begin_time, compute_time, error_bound
+
+    def layer_tasks_update(self, layer_id, tasks, begin_time, compute_time, record_interval=True):
+        if tasks['layer_type'] == 'fc':
+            self.pipe_result_update(layer_type='fc', begin_time=float(begin_time[0]), compute_time=float(compute_time[0]),
+                                    layer_id=layer_id, **tasks['update'])
+        else:
+            self.pipe_result_update_batch(layer_type=tasks['layer_type'], begin_time=begin_time, compute_time=compute_time,
+                                          layer_id=layer_id, record_interval=record_interval, **tasks['update'])
+
+    def calculate_model_latency_vectorized(self, mode=0):
+        '''
+        vectorized engine of calculate_model_latency, same results (begin/finish time of each output, occupancy and
+        total latency of each module), the outputs of one layer are computed with array operations
+        :param mode: 0: fill in input data row by row, 1: fill in input data kerlenl size by kernel size (column direction)
+        :return:
+        '''
+        self.latency_mode = mode
+        for layer_id in range(len(self.NetStruct)):
+            self.layer_latency_vectorized(layer_id, mode)
+
+    def layer_latency_vectorized(self, layer_id, mode=0):
+        tasks = self.layer_tasks(layer_id, mode)
+        self.layer_tasks_update(layer_id, tasks, *self.layer_tasks_schedule(tasks))
+        self.layer_latency_statistics(layer_id)
+
+    def calculate_model_latency_estimate(self, fill_rows=4):
+        '''
+        fast estimate of calculate_model_latency(mode=1): the first rows of each layer (pipeline fill, until the
+        row period is steady) and its last rows are scheduled exactly, the rows in between are extrapolated,
+        the working intervals are not recorded (compute_interval)
+        the total latency of each module is exact, the error of the begin/finish times is bounded by
+        layer_error_bound (per layer) and latency_error_bound (entire latency)
+        :param fill_rows: number of rows scheduled exactly before the row period is checked (>= 3)
+        :return: error bound of the entire latency (ns)
+        '''
+        self.latency_mode = 3
+        for layer_id in range(len(self.NetStruct)):
+            self.layer_latency_estimate(layer_id, fill_rows)
+        self.latency_error_bound = max(self.layer_error_bound)
+        return self.latency_error_bound
+
+    def layer_latency_estimate(self, layer_id, fill_rows=4):
+        tasks = self.layer_tasks(layer_id, 1)
+        begin_time, compute_time, error_bound = self.layer_tasks_schedule_estimate(tasks, fill_rows)
+        # the schedule does not increase the error of the ready times
+        input_error_bound = [self.layer_error_bound[input_layer_id] for input_layer_id, _ in tasks['dependency']]
+        self.layer_error_bound.append(max(input_error_bound, default=0.0) + error_bound)
+        self.layer_tasks_update(layer_id, tasks, begin_time, compute_time, record_interval=False)
+        self.layer_latency_statistics(layer_id, runtime=interval_runtime(begin_time, compute_time))
+
+    def calculate_model_latency_event(self, mode=0, image_num=1):
+        '''
+        discrete-event engine of calculate_model_latency, same results for the first image
+        :param mode: 0: fill in input data row by row, 1: fill in input data kerlenl size by kernel size (column direction)
+        :param image_num: number of images streamed back to back, the simulation stops once the initiation interval is steady
+        :return: the event simulator (finish time of each image, initiation interval)
+        '''
+        self.latency_mode = mode
+        layer_tasks = [self.layer_tasks(layer_id, mode) for layer_id in range(len(self.NetStruct))]
+        self.event_simulator = event_simulator(layer_tasks)
+        self.event_simulator.run(image_num)
+        for layer_id in range(len(self.NetStruct)):
+            self.layer_tasks_update(layer_id, layer_tasks[layer_id], self.event_simulator.begin_time[layer_id],
+                                    self.event_simulator.finish_time[layer_id])
+            self.layer_latency_statistics(layer_id)
+        return self.event_simulator
+
+    def layer_key(self, layer_id, mode=0):
+        # everything the latency of a layer depends on, besides the hardware description and its input layers
+        return json.dumps([self.layer_signature(layer_id, mode), self.graph.inLayer_distance[0][layer_id],
+                           self.graph.transLayer_distance[0][layer_id], self.graph.max_inbuf_size,
+                           self.graph.max_outbuf_size, self.graph.global_buf_size], default=str)
+
+    def layer_result_copy(self, previous, layer_id):
+        # take the results of one layer from previous (Model_latency of the same network)
+        self.begin_time.append(list(previous.begin_time[layer_id]))
+        self.finish_time.append(list(previous.finish_time[layer_id]))
+        self.compute_interval.append(list(previous.compute_interval[layer_id]))
+        self.pixel_latency.append(previous.pixel_latency[layer_id])
+        self.pixel_count.append(previous.pixel_count[layer_id])
+        self.inbuffer_latency.append(previous.inbuffer_latency[layer_id])
+        self.outbuffer_latency.append(previous.outbuffer_latency[layer_id])
+        self.layer_split.append(previous.layer_split[layer_id])
+        self.occupancy.append(previous.occupancy[layer_id])
+        for name in vars(previous):
+            if name.startswith('total_'):
+                getattr(self, name).append(getattr(previous, name)[layer_id])
+        if previous.latency_mode == 3:
+            self.layer_error_bound.append(previous.layer_error_bound[layer_id])
+        self.layer_summary_update(layer_id)
+
+    def calculate_model_latency_incremental(self, previous, changed_layer=(), mode=0):
+        '''
+        incremental calculate_model_latency after a change of some layers (e.g. their replication):
+        the changed layers and the layers reading their outputs (directly or not) are computed, the results of
+        the other layers are taken from previous
+        :param previous: Model_latency of the same network, computed with the same mode (not summary_only)
+        :param changed_layer: layers changed in a way which is not visible in the network structure and mapping
+                              (e.g. a new hardware description of their tiles), the layers whose parameters,
+                              replication or tile distances differ from previous are found automatically
+        :param mode: same as calculate_model_latency (the computed layers use the vectorized engine)
+        :return: the computed layers
+        '''
+        assert len(previous.NetStruct) == len(self.NetStruct), "previous must model the same network"
+        assert previous.latency_mode == mode, "previous must be computed with the same mode"
+        assert not previous.summary_only, "the incremental computation needs the per-output history of previous"
+        self.latency_mode = mode
+        computed_layer = []
+        for layer_id in range(len(self.NetStruct)):
+            input_layer = [layer_id + idx for idx in self.graph.layer_tileinfo[layer_id]['Inputindex'] if layer_id + idx >= 0]
+            if (layer_id in changed_layer) or any(l in computed_layer for l in input_layer) or \
+                    self.layer_key(layer_id, mode) != previous.layer_key(layer_id, mode):
+                computed_layer.append(layer_id)
+                if mode == 3:
+                    self.layer_latency_estimate(layer_id)
+                else:
+                    self.layer_latency_vectorized(layer_id, mode)
+            else:
+                self.layer_result_copy(previous, layer_id)
+        if mode == 3:
+            self.latency_error_bound = max(self.layer_error_bound)
+        return computed_layer
 
 if __name__ == '__main__':
     test_SimConfig_path = os.path.join(os.path.dirname(os.path.dirname(os.getcwd())), "SimConfig.ini")
@@ -10,6 +10,7 @@ sys.path.append(work_path)
 from MNSIM.Hardware_Model.PE import ProcessElement
 from MNSIM.Hardware_Model.Buffer import buffer
 from MNSIM.Interface.interface import *
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 
 
 class PE_latency_analysis():
@@ -21,8 +22,7 @@ class PE_latency_analysis():
         # outdata: volume of output data (for PE) (Byte)
         # inprecision: input data precision of each Xbar
         # default_buf_size: default input buffer size (KB)
-        PEl_config = cp.ConfigParser()
-        PEl_config.read(SimConfig_path, encoding='UTF-8')
+        PEl_config = load_SimConfig(SimConfig_path)
         self.inbuf = buffer(SimConfig_path=SimConfig_path, buf_level=1, default_buf_size=default_buf_size)
         self.PE = ProcessElement(SimConfig_path)
         self.inbuf.calculate_buf_write_latency(indata)
@@ -88,6 +88,12 @@ class PE_latency_analysis():
         self.inbuf.calculate_buf_read_latency(rdata)
         self.PE_buf_rlatency = self.inbuf.buf_rlatency
         self.PE_latency = self.PE_buf_wlatency + self.PE_buf_rlatency + self.computing_latency + self.PE_digital_latency
+    def calculate_PE_latency_batch(self, indata=0, rdata=0):
+        # vectorized update_PE_latency: indata and rdata are arrays (e.g. of all output pixels of one layer)
+        # returns (PE_latency, PE_buf_rlatency, PE_buf_wlatency) arrays, the attributes are not modified
+        PE_buf_rlatency, PE_buf_wlatency = self.inbuf.calculate_buf_latency_batch(rdata=rdata, wdata=indata)
+        PE_latency = PE_buf_wlatency + PE_buf_rlatency + self.computing_latency + self.PE_digital_latency
+        return PE_latency, PE_buf_rlatency, PE_buf_wlatency
 
 
 if __name__ == '__main__':
@@ -0,0 +1,194 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import numpy as np
+# Array form of the pipeline recurrence used by Model_latency:
+#   begin_time[k] = max(ready_time[k], finish_time[k-1]),  finish_time[-1] = start_time
+#   finish_time[k] = ((begin_time[k] + addend[k][0]) + addend[k][1]) + ...
+# ready_time[k] is the time when the input data of output k is available (finish time of the previous layers),
+# addend[k] are the latency terms of output k, added in the same order as the sequential code.
+# A run of outputs whose begin time is the finish time of their predecessor is a plain running sum,
+# which np.cumsum evaluates in the same order (and thus with the same rounding) as the sequential loop.
+
+long_segment_length = 32
+max_repair_iteration = 16
+
+
+def segmented_chain(base, addend, starts):
+    # finish times of the runs starting at starts, run s begins at base[s]
+    # addend: (n, p) array
+    n, p = addend.shape
+    finish = np.empty(n)
+    if n == 0:
+        return finish
+    ends = np.append(starts[1:], n)
+    lengths = ends - starts
+    long_run = lengths > long_segment_length
+    for s, e, b in zip(starts[long_run], ends[long_run], base[long_run]):
+        chain = np.cumsum(np.concatenate(([b], addend[s:e].ravel())))
+        finish[s:e] = chain[p::p]
+    short_starts = starts[~long_run]
+    short_lengths = lengths[~long_run]
+    short_base = base[~long_run]
+    for offset in range(int(short_lengths.max()) if len(short_lengths) else 0):
+        active = short_lengths > offset
+        index = short_starts[active] + offset
+        if offset == 0:
+            value = short_base[active]
+        else:
+            value = finish[index - 1]
+        for column in range(p):
+            value = value + addend[index, column]
+        finish[index] = value
+    return finish
+
+
+def chain_step(begin, addend):
+    finish = begin
+    for column in range(addend.shape[1]):
+        finish = finish + addend[:, column]
+    return finish
+
+
+def pipeline_schedule(ready_time, addend, start_time = 0):
+    '''
+    vectorized pipeline recurrence, bit-identical to the sequential evaluation
+    :param ready_time: (n,) array, time when the inputs of each output are ready
+    :param addend: (n,) or (n, p) array, latency terms of each output
+    :param start_time: finish time of the predecessor of the first output
+    :return: begin_time, finish_time arrays
+    '''
+    ready_time = np.asarray(ready_time, dtype=float)
+    addend = np.asarray(addend, dtype=float)
+    if addend.ndim == 1:
+        addend = addend[:, np.newaxis]
+    n = len(ready_time)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    # initial guess of the restart points: finish[k] = max_s(ready[s] + sum(addend[s..k])),
+    # a new run starts where ready[s] - sum(addend[..s-1]) reaches a new maximum
+    total = np.cumsum(addend.ravel())[addend.shape[1]-1::addend.shape[1]]
+    gain = ready_time - np.concatenate(([0], total[:-1]))
+    gain[0] = max(ready_time[0], start_time)
+    restart = np.empty(n, dtype=bool)
+    restart[0] = True
+    restart[1:] = gain[1:] > np.maximum.accumulate(gain)[:-1]
+    finish = np.empty(n)
+    first = 0
+    for iteration in range(max_repair_iteration):
+        starts = first + np.flatnonzero(restart[first:])
+        if len(starts) == 0 or starts[0] != first:
+            starts = np.concatenate(([first], starts))
+        base = ready_time[starts].copy()
+        if first == 0:
+            base[0] = max(ready_time[0], start_time)
+        else:
+            base[0] = max(ready_time[first], finish[first - 1])
+        finish[first:] = segmented_chain(base, addend[first:], starts - first)
+        # check the recurrence, the outputs before the first inconsistent one are exact
+        previous = np.concatenate(([start_time], finish[:-1]))
+        begin = np.maximum(ready_time, previous)
+        wrong = np.flatnonzero(chain_step(begin, addend) != finish)
+        if len(wrong) == 0:
+            return begin, finish
+        first = int(wrong[0])
+        restart = ready_time > previous
+    # fallback: sequential evaluation of the remaining outputs
+    for k in range(first, n):
+        value = max(ready_time[k], finish[k - 1] if k > 0 else start_time)
+        for column in range(addend.shape[1]):
+            value = value + addend[k, column]
+        finish[k] = value
+    previous = np.concatenate(([start_time], finish[:-1]))
+    return np.maximum(ready_time, previous), finish
+
+
+def merge_interval_array(begin_time, finish_time):
+    # same as Model_latency.merge_interval([[begin, finish], ...]), returns a list of [lower, upper]
+    if len(begin_time) == 0:
+        return []
+    order = np.lexsort((finish_time, begin_time))
+    lower = np.asarray(begin_time)[order]
+    upper = np.maximum.accumulate(np.asarray(finish_time)[order])
+    group_start = np.concatenate(([0], np.flatnonzero(lower[1:] > upper[:-1]) + 1))
+    group_end = np.append(group_start[1:] - 1, len(lower) - 1)
+    return [[l, u] for l, u in zip(lower[group_start].tolist(), upper[group_end].tolist())]
+
+
+def pipeline_schedule_estimate(ready_time, addend, row_num, fill_rows=4, tail_rows=2, tolerance=1e-9):
+    '''
+    approximate pipeline_schedule for outputs computed row by row (row_num rows of the same length):
+    the first rows (until the row period is steady) and the last rows are scheduled exactly,
+    the rows in between are extrapolated with the steady row period
+    :return: begin_time, finish_time arrays, error bound of the finish times (max |estimate - exact|)
+    '''
+    ready_time = np.asarray(ready_time, dtype=float)
+    addend = np.asarray(addend, dtype=float)
+    if addend.ndim == 1:
+        addend = addend[:, np.newaxis]
+    assert fill_rows >= 3, "the row period is checked on the last three simulated rows"
+    n = len(ready_time)
+    if row_num < fill_rows + tail_rows + 2 or n % row_num != 0:
+        begin_time, finish_time = pipeline_schedule(ready_time, addend)
+        return begin_time, finish_time, 0.0
+    row_length = n // row_num
+    finish = np.empty(n)
+    _, finish[:fill_rows * row_length] = pipeline_schedule(ready_time[:fill_rows * row_length], addend[:fill_rows * row_length])
+    fill_end = fill_rows
+    while True:
+        # row period of the last two simulated rows
+        row_finish = finish[(fill_end - 3) * row_length:fill_end * row_length].reshape(3, row_length)
+        period = row_finish[2] - row_finish[1]
+        if np.abs(period - (row_finish[1] - row_finish[0])).max() <= tolerance * max(np.abs(period).max(), 1):
+            break
+        next_end = min(2 * fill_end, row_num - tail_rows)
+        if next_end <= fill_end:
+            break
+        _, finish[fill_end * row_length:next_end * row_length] = pipeline_schedule(
+            ready_time[fill_end * row_length:next_end * row_length], addend[fill_end * row_length:next_end * row_length],
+            start_time=finish[fill_end * row_length - 1])
+        fill_end = next_end
+    tail_begin = row_num - tail_rows
+    if fill_end < tail_begin:
+        step = np.arange(1, tail_begin - fill_end + 1)[:, np.newaxis]
+        finish[fill_end * row_length:tail_begin * row_length] = (row_finish[2] + step * period).ravel()
+        # the extrapolation holds while the recurrence holds (e.g. not at the last rows, where the kernel is clipped),
+        # the rows from the first inconsistent output on are scheduled exactly
+        extrapolated = slice(fill_end * row_length, tail_begin * row_length)
+        previous = finish[fill_end * row_length - 1:tail_begin * row_length - 1]
+        residual = np.abs(finish[extrapolated] - chain_step(np.maximum(ready_time[extrapolated], previous), addend[extrapolated]))
+        wrong = np.flatnonzero(residual > tolerance * max(np.abs(period).max(), 1))
+        if len(wrong):
+            tail_begin = fill_end + int(wrong[0]) // row_length
+    _, finish[tail_begin * row_length:] = pipeline_schedule(ready_time[tail_begin * row_length:],
+                                                            addend[tail_begin * row_length:],
+                                                            start_time=finish[tail_begin * row_length - 1])
+    previous = np.concatenate(([0], finish[:-1]))
+    begin = np.maximum(ready_time, previous)
+    # the recurrence is 1-Lipschitz in the finish time of the previous output:
+    # the error is at most the sum of the residuals of the extrapolated outputs
+    residual = np.abs(finish - chain_step(begin, addend))
+    return begin, finish, float(residual.sum())
+
+
+def interval_runtime(begin_time, finish_time):
+    # total length of the union of the intervals [begin, finish]
+    if len(begin_time) == 0:
+        return 0.0
+    order = np.lexsort((finish_time, begin_time))
+    lower = np.asarray(begin_time)[order]
+    upper = np.maximum.accumulate(np.asarray(finish_time)[order])
+    group_start = np.concatenate(([0], np.flatnonzero(lower[1:] > upper[:-1]) + 1))
+    group_end = np.append(group_start[1:] - 1, len(lower) - 1)
+    return float(np.sum(upper[group_end] - lower[group_start]))
+
+
+if __name__ == '__main__':
+    _ready = np.random.rand(1000) * 100
+    _addend = np.random.rand(1000)
+    _begin, _finish = pipeline_schedule(_ready, _addend)
+    _pre = 0
+    for _k in range(1000):
+        _b = max(_ready[_k], _pre)
+        _pre = _b + _addend[_k]
+        assert _b == _begin[_k] and _pre == _finish[_k]
+    print("pipeline_schedule: ok")
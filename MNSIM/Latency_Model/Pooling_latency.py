@@ -43,6 +43,12 @@ class pooling_latency_analysis():
         self.inbuf.calculate_buf_read_latency(rdata)
         self.inbuf_rlatency = self.inbuf.buf_rlatency
         self.pooling_latency = self.inbuf_wlatency + self.inbuf_rlatency + self.digital_latency + self.outbuf_rlatency + self.outbuf_wlatency
+    def calculate_pooling_latency_batch(self, indata=0, rdata=0):
+        # vectorized update_pooling_latency: indata and rdata are arrays
+        # returns (pooling_latency, inbuf_rlatency, inbuf_wlatency) arrays, the attributes are not modified
+        inbuf_rlatency, inbuf_wlatency = self.inbuf.calculate_buf_latency_batch(rdata=rdata, wdata=indata)
+        pooling_latency = inbuf_wlatency + inbuf_rlatency + self.digital_latency + self.outbuf_rlatency + self.outbuf_wlatency
+        return pooling_latency, inbuf_rlatency, inbuf_wlatency
 
 
 
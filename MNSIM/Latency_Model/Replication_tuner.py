@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+from MNSIM.Mapping_Model.Tile_connection_graph import TCG
+from MNSIM.Latency_Model.Model_latency import Model_latency
+# Greedy tuning of the layer replication (multiple) for pipeline balancing: the bottleneck layer (largest busy time
+# per image, Model_latency.calculate_model_throughput) is duplicated once more at each step, as long as the tiles fit
+# in the budget. Each step is computed incrementally (calculate_model_latency_incremental): only the duplicated layer,
+# the layers whose tile distances changed and the layers after them are computed again.
+# The area of a step is the area of Model_area (arch_total_area): every tile has the area of the largest buffers
+# of the mapping, the tile area is characterized once per buffer size (characterization cache).
+
+default_max_step = 64
+    # maximum number of duplications of run
+
+
+class replication_tuner(object):
+    def __init__(self, NetStruct, SimConfig_path, tile_budget=None, mode=3, area=True):
+        '''
+        :param tile_budget: maximum number of used tiles, default: all the tiles of Tile_Num
+        :param mode: mode of calculate_model_latency (3: estimate)
+        :param area: compute the area of every step (arch_total_area of Model_area)
+        '''
+        self.NetStruct = NetStruct
+        self.SimConfig_path = SimConfig_path
+        self.tile_budget = tile_budget
+        self.mode = mode
+        self.area = area
+        self.curve = []
+            # one entry per step: multiple, duplicated layer, used tiles, latency (ns), area (um^2)
+
+    def mapping(self, multiple):
+        # TCG of a replication, None if it does not fit in the tiles
+        graph = TCG(self.NetStruct, self.SimConfig_path, multiple, check_tile_num=False)
+        if graph.used_tile_num > graph.tile_total_num:
+            return None
+        if self.tile_budget is not None and graph.used_tile_num > self.tile_budget:
+            return None
+        return graph
+
+    def evaluate(self, multiple, graph, previous=None, layer_id=None):
+        latency = Model_latency(self.NetStruct, self.SimConfig_path, multiple=multiple, TCG_mapping=graph)
+        if previous is None:
+            latency.calculate_model_latency(mode=self.mode)
+        else:
+            latency.calculate_model_latency_incremental(previous, mode=self.mode)
+        latency.calculate_model_throughput()
+        self.curve.append({'multiple': list(multiple), 'layer': layer_id, 'tile_num': graph.used_tile_num,
+                           'latency': max(latency.layer_finish_time),
+                           'area': self.tile_area(graph) if self.area else None})
+        return latency
+
+    def tile_area(self, graph):
+        # arch_total_area of Model_area: area of the used tiles, with the largest buffers of the mapping
+        graph.tile.calculate_tile_area_cached(SimConfig_path=self.SimConfig_path,
+                                              default_inbuf_size=graph.max_inbuf_size,
+                                              default_outbuf_size=graph.max_outbuf_size)
+        return sum([graph.tile.tile_area * graph.layer_tileinfo[i]['tilenum'] for i in range(graph.layer_num)])
+
+    def candidate_layer(self, latency, multiple):
+        # conv layers by decreasing busy time per image, a layer is split along its output columns
+        candidate = []
+        for layer_id in range(len(self.NetStruct)):
+            layer_dict = self.NetStruct[layer_id][0][0]
+            if layer_dict['type'] == 'conv' and multiple[layer_id] < int(layer_dict['Outputsize'][1]):
+                candidate.append(layer_id)
+        return sorted(candidate, key=lambda layer_id: -latency.layer_initiation_interval[layer_id])
+
+    def run(self, multiple=None, max_step=default_max_step):
+        '''
+        :param multiple: initial replication, default: no replication
+        :param max_step: maximum number of duplications (None: until no bottleneck layer fits in the tiles)
+        :return: multiple with the lowest latency, latency/area trade-off curve (self.curve)
+        '''
+        if multiple is None:
+            multiple = [1] * len(self.NetStruct)
+        multiple = list(multiple)
+        self.curve = []
+        graph = self.mapping(multiple)
+        assert graph is not None, "Tile number is not enough"
+        latency = self.evaluate(multiple, graph)
+        step = 0
+        while max_step is None or step < max_step:
+            for layer_id in self.candidate_layer(latency, multiple):
+                multiple[layer_id] += 1
+                graph = self.mapping(multiple)
+                if graph is not None:
+                    break
+                multiple[layer_id] -= 1
+            else:
+                # no layer can be duplicated
+                break
+            latency = self.evaluate(multiple, graph, latency, layer_id)
+            step += 1
+        best = min(self.curve, key=lambda point: point['latency'])
+        return list(best['multiple']), self.curve
@@ -9,7 +9,10 @@ work_path = os.path.dirname(os.getcwd())
 sys.path.append(work_path)
 from MNSIM.Interface.interface import *
 from MNSIM.Latency_Model.PE_latency import PE_latency_analysis
+from MNSIM.Hardware_Model.PE import ProcessElement
 from MNSIM.Hardware_Model.Buffer import buffer
+from MNSIM.Hardware_Model.Characterization_cache import char_cache, collect_attributes, restore_attributes
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 
 
 class tile_latency_analysis(PE_latency_analysis):
@@ -26,8 +29,7 @@ class tile_latency_analysis(PE_latency_analysis):
         # default_outbuf_size: the default Tile-level output buffer size (unit: KB)
         PE_latency_analysis.__init__(self, SimConfig_path, read_row=read_row, read_column=read_column,
                                      indata=indata, rdata=rdata, inprecision=inprecision, default_buf_size = default_inbuf_size)
-        tilel_config = cp.ConfigParser()
-        tilel_config.read(SimConfig_path, encoding='UTF-8')
+        tilel_config = load_SimConfig(SimConfig_path)
         self.intra_tile_bandwidth = float(tilel_config.get('Tile level', 'Intra_Tile_Bandwidth'))
         merge_time = math.ceil(math.log2(PE_num))
         self.tile_PE_num = list(map(int, tilel_config.get('Tile level', 'PE_Num').split(',')))
@@ -43,7 +45,8 @@ class tile_latency_analysis(PE_latency_analysis):
         self.jointmodule_latency = merge_time * self.digital_period
         self.transfer_latency = (total_level*(self.PE.ADC_precision+merge_time)-merge_time*(merge_time+1)/2)\
                                 *read_column/self.intra_tile_bandwidth
-        self.outbuf.calculate_buf_write_latency(wdata=((self.PE.ADC_precision + merge_time)*read_column*PE_num/8))
+        self.outbuf_wdata = (self.PE.ADC_precision + merge_time)*read_column*PE_num/8
+        self.outbuf.calculate_buf_write_latency(wdata=self.outbuf_wdata)
         self.tile_buf_rlatency = 0
         self.tile_buf_wlatency = self.outbuf.buf_wlatency
          # do not consider
@@ -51,6 +54,55 @@ class tile_latency_analysis(PE_latency_analysis):
     def update_tile_latency(self, indata = 0, rdata = 0):
         self.update_PE_latency(indata=indata,rdata=rdata)
         self.tile_latency = self.PE_latency + self.jointmodule_latency + self.transfer_latency + self.tile_buf_wlatency
+    def calculate_tile_latency_batch(self, indata = 0, rdata = 0):
+        # vectorized update_tile_latency: indata and rdata are arrays (e.g. of all output pixels of one layer)
+        # returns (tile_latency, PE_buf_rlatency, PE_buf_wlatency) arrays, the attributes are not modified
+        PE_latency, PE_buf_rlatency, PE_buf_wlatency = self.calculate_PE_latency_batch(indata=indata, rdata=rdata)
+        tile_latency = PE_latency + self.jointmodule_latency + self.transfer_latency + self.tile_buf_wlatency
+        return tile_latency, PE_buf_rlatency, PE_buf_wlatency
+    @classmethod
+    def from_characterization(cls, SimConfig_path, result, indata = 0, rdata = 0, default_inbuf_size = 16,
+                              default_outbuf_size = 4):
+        # complete object from the numeric attributes of a characterization (collect_attributes), same attributes
+        # as __init__: the configuration lists and the buffers are rebuilt, the PE is built on the first access
+        _latency = cls.__new__(cls)
+        restore_attributes(_latency, result)
+        _latency.SimConfig_path = SimConfig_path
+        tilel_config = load_SimConfig(SimConfig_path)
+        _latency.tile_PE_num = list(map(int, tilel_config.get('Tile level', 'PE_Num').split(',')))
+        if _latency.tile_PE_num[0] == 0:
+            _latency.tile_PE_num[0] = 4
+            _latency.tile_PE_num[1] = 4
+        _latency.inbuf = buffer(SimConfig_path=SimConfig_path, buf_level=1, default_buf_size=default_inbuf_size)
+        _latency.outbuf = buffer(SimConfig_path=SimConfig_path, buf_level=2, default_buf_size=default_outbuf_size)
+        _latency.outbuf.calculate_buf_write_latency(wdata=_latency.outbuf_wdata)
+        _latency.update_tile_latency(indata=indata, rdata=rdata)
+        return _latency
+    def __getattr__(self, name):
+        # only reached for an attribute that is not set: the PE of an object of from_characterization
+        if name == 'PE' and 'SimConfig_path' in self.__dict__:
+            self.PE = ProcessElement(self.SimConfig_path)
+            self.PE.calculate_xbar_read_latency()
+            self.PE.calculate_DAC_latency()
+            self.PE.calculate_ADC_latency()
+            return self.PE
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+
+def cached_tile_latency_analysis(SimConfig_path, read_row=0, read_column=0, indata=0, rdata=0, inprecision = 8,
+                                 PE_num=0, default_inbuf_size = 16, default_outbuf_size = 4):
+    # same as tile_latency_analysis(...), but the indata/rdata independent part of the characterization
+    # (PE construction, computing and digital latency) is served from the characterization cache
+    def compute():
+        _latency = tile_latency_analysis(SimConfig_path, read_row=read_row, read_column=read_column, indata=0, rdata=0,
+                                         inprecision=inprecision, PE_num=PE_num, default_inbuf_size=default_inbuf_size,
+                                         default_outbuf_size=default_outbuf_size)
+        return collect_attributes(_latency)
+    args = (read_row, read_column, inprecision, PE_num, default_inbuf_size, default_outbuf_size)
+    result = char_cache.lookup('tile_latency', SimConfig_path, args, compute)
+    return tile_latency_analysis.from_characterization(SimConfig_path, result, indata=indata, rdata=rdata,
+                                                       default_inbuf_size=default_inbuf_size,
+                                                       default_outbuf_size=default_outbuf_size)
 
 
 if __name__ == '__main__':
@@ -11,14 +11,14 @@ sys.path.append(work_path)
 from MNSIM.Hardware_Model import *
 from MNSIM.Hardware_Model.Tile import tile
 from MNSIM.Interface.interface import *
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
 
 
 class behavior_mapping(tile):
     def __init__(self, NetStruct, SimConfig_path):
         self.SimConfig_path = SimConfig_path
         tile.__init__(self, SimConfig_path)
-        bm_config = cp.ConfigParser()
-        bm_config.read(SimConfig_path, encoding='UTF-8')
+        bm_config = load_SimConfig(SimConfig_path)
         self.xbar_polarity = int(bm_config.get('Process element level', 'Xbar_Polarity'))
         self.net_structure = NetStruct
         self.arch_config = SimConfig_path
@@ -176,6 +176,8 @@ class behavior_mapping(tile):
             current_PE_num = 0
             read_column = []
             read_row = []
+            configured_tile = {}
+                # tiles of this layer with identical read_row/read_column share one configured instance
             kernel_length_2bsplit = self.kernel_length[layer_id]
             while kernel_length_2bsplit > 0:
                 if kernel_length_2bsplit < xbar_used_length:
@@ -206,15 +208,18 @@ class behavior_mapping(tile):
                         if current_PE_num == self.tile_PE_total_num or \
                                 ((kernel_length_2bsplit==0)&(channel_width_2bsplit==0)&(weight_precision_2bsplit==0)):
                             # print("yes")
-                            __temp_tile = tile(self.SimConfig_path)
-                            self.tile_list[layer_id].append(__temp_tile)
-                            self.tile_list[layer_id][tile_index].tile_read_config(
-                                layer_num=layer_id,
-                                activation_precision=self.activation_precision[layer_id],
-                                sliding_times=self.sliding_times[layer_id],
-                                read_row=read_row,
-                                read_column=read_column
-                            )
+                            tile_key = (tuple(map(tuple, read_row)), tuple(map(tuple, read_column)))
+                            if tile_key not in configured_tile:
+                                __temp_tile = tile(self.SimConfig_path)
+                                __temp_tile.tile_read_config(
+                                    layer_num=layer_id,
+                                    activation_precision=self.activation_precision[layer_id],
+                                    sliding_times=self.sliding_times[layer_id],
+                                    read_row=read_row,
+                                    read_column=read_column
+                                )
+                                configured_tile[tile_key] = __temp_tile
+                            self.tile_list[layer_id].append(configured_tile[tile_key])
                             tile_index += 1
                             current_PE_num = 0
                             read_column = []
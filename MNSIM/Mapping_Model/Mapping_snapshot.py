@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import collections
+import hashlib
+import json
+import os
+import numpy as np
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
+from MNSIM.Hardware_Model.Tile import tile
+from MNSIM.Mapping_Model.Tile_connection_graph import TCG
+# Snapshot of the mapping stage (network structure + TCG after mapping_net and calculate_transfer_distance) in one
+# .npz file: the arrays of the TCG (distances, aggregate tiles, tile coordinates of each layer, occupancy bitmap) and a
+# JSON header (version, key, layer parameters of the structure, the other TCG attributes).
+# The weights in the structure are not stored (the hardware models only use the layer parameters).
+# The key is a hash of everything the mapping depends on: network, dataset, weights file, SimConfig, multiple;
+# the hash of the structure is stored in the header to check a snapshot against a given structure.
+
+snapshot_version = 1
+
+
+def structure_hash(NetStruct):
+    # hash of the layer parameters of a network structure
+    return hashlib.sha256(json.dumps([layer[0][0] for layer in NetStruct], default=str).encode()).hexdigest()
+
+
+def snapshot_key(network_module, dataset_module, weights_file, SimConfig_path, multiple=None):
+    config = load_SimConfig(SimConfig_path)
+    weights = None
+    if weights_file is not None and os.path.exists(weights_file):
+        weights = [os.path.abspath(weights_file), os.path.getsize(weights_file), os.path.getmtime(weights_file)]
+    content = [snapshot_version, network_module, dataset_module, weights, multiple,
+               [[section, sorted(config.items(section))] for section in config.sections()]]
+    return hashlib.sha256(json.dumps(content, default=str).encode()).hexdigest()
+
+
+def json_value(value):
+    # numpy scalars in the TCG attributes
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("%r is not JSON serializable" % value)
+
+
+def save_mapping_snapshot(path, key, NetStruct, graph):
+    # graph: TCG after mapping_net and calculate_transfer_distance
+    header = {'version': snapshot_version, 'key': key, 'structure_hash': structure_hash(NetStruct),
+              'structure': [layer[0][0] for layer in NetStruct], 'attribute': {}}
+    array = {}
+    for name, value in vars(graph).items():
+        if name in ['tile', 'net', 'layer_tile_position', 'placement_result', 'mapping_result_cache']:
+            continue
+        if isinstance(value, np.ndarray):
+            array['attribute_' + name] = value
+        else:
+            header['attribute'][name] = value
+    # tile coordinates of each layer: concatenated, with the number of tiles of each layer
+    array['layer_position'] = np.concatenate(graph.layer_tile_position + [np.zeros([0, 2], dtype=int)])
+    array['layer_position_num'] = np.array([len(position) for position in graph.layer_tile_position], dtype=int)
+    array['header'] = np.array(json.dumps(header, default=json_value))
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **array)
+
+
+def load_mapping_snapshot(path, key, SimConfig_path, NetStruct=None):
+    '''
+    :param key: snapshot_key of the run, the snapshot is only used if it matches
+    :param NetStruct: structure of the network, if known (checked against the snapshot)
+    :return: (structure, TCG) of the snapshot, None if there is no matching snapshot
+    '''
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        header = json.loads(str(data['header']), object_pairs_hook=collections.OrderedDict)
+        if header['version'] != snapshot_version or header['key'] != key:
+            return None
+        if NetStruct is not None and header['structure_hash'] != structure_hash(NetStruct):
+            return None
+        array = {name: data[name] for name in data.files}
+    if NetStruct is None:
+        NetStruct = [[(layer_dict, None)] for layer_dict in header['structure']]
+    graph = TCG.__new__(TCG)
+    for name, value in header['attribute'].items():
+        setattr(graph, name, value)
+    for name, value in array.items():
+        if name.startswith('attribute_'):
+            setattr(graph, name[len('attribute_'):], value)
+    bound = np.concatenate([[0], np.cumsum(array['layer_position_num'])])
+    graph.layer_tile_position = [array['layer_position'][bound[i]:bound[i + 1]] for i in range(graph.layer_num)]
+    # the snapshot is taken after mapping_net: the optimized placement is the mapping (Tile_Connection = 4)
+    graph.placement_result = graph.layer_tile_position if graph.tile_connection == 4 else None
+    graph.mapping_result_cache = None
+    graph.mapped = True
+    graph.net = NetStruct
+    graph.tile = tile(SimConfig_path)
+    return NetStruct, graph
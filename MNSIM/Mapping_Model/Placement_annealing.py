@@ -0,0 +1,208 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import math
+import numpy as np
+# Simulated annealing of the tile-to-layer assignment, stored sparse as TCG.layer_tile_position: the layer of each
+# used tile is kept in a dict {(x, y): layer} (a missing tile is free), the (row, column) grid is never built.
+# In the rotated coordinates u = x + y, v = x - y the Manhattan distance is max(|du|, |dv|), so the distances of
+# TCG.calculate_transfer_distance (maximum distance from the aggregate tile of a layer to its tiles and to the tiles
+# of its next layers) are estimated from the bounding box [u_min, u_max] x [v_min, v_max] of each layer:
+#   inLayer: half the size of the bounding box, aggregate tile at its center
+#   transLayer: maximum distance from the center to the bounding box of the next layer
+#   cost = sum_l in_weight[l] * inLayer[l] + sum_(src, dst, weight) weight * transLayer(src, dst)
+# (a layer without tiles is at the position of the global buffer). The tiles of each layer are counted per u and
+# per v value, a swap of two tiles only changes the bounding boxes of their two layers: the cost change of a move
+# is computed in O(number of edges of the two layers), independent of the number of tiles.
+
+move_per_tile = 50
+move_radius = 4
+    # the second tile of a move is at most move_radius rows / columns away from the first one
+move_attempts = 100
+    # random draws of a move before random_move gives up (no tile of another layer or free tile is near)
+initial_temperature_ratio = 0.1
+    # initial temperature / mean cost change of random moves
+final_temperature_ratio = 1e-3
+
+
+class placement_annealing(object):
+    def __init__(self, layer_tile_position, shape, in_weight, edge, global_pos, seed=0):
+        '''
+        :param layer_tile_position: (n, 2) coordinates of the tiles of each layer (TCG.layer_tile_position)
+        :param shape: (row, column) of the tiles
+        :param in_weight: weight of the inLayer distance of each layer
+        :param edge: [(src layer, dst layer, weight of the transLayer distance), ...]
+        :param global_pos: position of the layers without tiles (global buffer)
+        '''
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.layer_num = len(in_weight)
+        self.tile_layer = dict()
+        for layer_id, position in enumerate(layer_tile_position):
+            for x, y in np.asarray(position, dtype=int).reshape(-1, 2).tolist():
+                self.tile_layer[(x, y)] = layer_id
+        self.in_weight = list(map(float, in_weight))
+        self.edge = [(int(src), int(dst), float(weight)) for src, dst, weight in edge]
+        self.layer_edge = [[] for _ in range(self.layer_num)]
+        for e, (src, dst, weight) in enumerate(self.edge):
+            self.layer_edge[src].append(e)
+            if dst != src:
+                self.layer_edge[dst].append(e)
+        self.global_box = (global_pos[0] + global_pos[1], global_pos[0] + global_pos[1],
+                           global_pos[0] - global_pos[1], global_pos[0] - global_pos[1])
+        self.random_state = np.random.RandomState(seed)
+        row, column = self.shape
+        # number of tiles of each layer per u (0 ~ row+column-2) and per v (offset column-1) value
+        self.v_offset = column - 1
+        self.u_count = np.zeros([self.layer_num, row + column - 1], dtype=int)
+        self.v_count = np.zeros([self.layer_num, row + column - 1], dtype=int)
+        for (x, y), layer_id in self.tile_layer.items():
+            self.u_count[layer_id][x + y] += 1
+            self.v_count[layer_id][x - y + self.v_offset] += 1
+        # bounding box of each layer: (u_min, u_max, v_min, v_max)
+        self.box = [self.layer_box(layer_id) for layer_id in range(self.layer_num)]
+
+    def layer_at(self, pos):
+        # layer of the tile pos, -1: free tile
+        return self.tile_layer.get(pos, -1)
+
+    def layer_box(self, layer_id):
+        u = np.flatnonzero(self.u_count[layer_id])
+        v = np.flatnonzero(self.v_count[layer_id]) - self.v_offset
+        if len(u) == 0:
+            return self.global_box
+        return int(u[0]), int(u[-1]), int(v[0]), int(v[-1])
+
+    def in_cost(self, layer_id, box):
+        return self.in_weight[layer_id] * max(box[1] - box[0], box[3] - box[2]) / 2
+
+    def edge_cost(self, e, box):
+        src, dst, weight = self.edge[e]
+        src_box = box[src] if src in box else self.box[src]
+        dst_box = box[dst] if dst in box else self.box[dst]
+        center_u = (src_box[0] + src_box[1]) / 2
+        center_v = (src_box[2] + src_box[3]) / 2
+        return weight * max(center_u - dst_box[0], dst_box[1] - center_u, center_v - dst_box[2], dst_box[3] - center_v)
+
+    def cost(self):
+        return sum(self.in_cost(l, self.box[l]) for l in range(self.layer_num)) + \
+               sum(self.edge_cost(e, {}) for e in range(len(self.edge)))
+
+    def count_bound(self, count, low, high, remove, add):
+        # bounds of the nonzero values of count after one remove and one add
+        if remove == add:
+            return low, high
+        if count[remove] == 1 and remove in (low, high):
+            # the only value at a bound is removed: next nonzero value
+            rest = np.flatnonzero(count)
+            rest = rest[rest != remove]
+            if len(rest) == 0:
+                return add, add
+            low, high = int(rest[0]), int(rest[-1])
+        return min(low, add), max(high, add)
+
+    def moved_box(self, layer_id, remove_pos, add_pos):
+        # bounding box of a layer after moving one of its tiles from remove_pos to add_pos
+        box = self.box[layer_id]
+        u_low, u_high = self.count_bound(self.u_count[layer_id], box[0], box[1], remove_pos[0] + remove_pos[1],
+                                         add_pos[0] + add_pos[1])
+        v_low, v_high = self.count_bound(self.v_count[layer_id], box[2] + self.v_offset, box[3] + self.v_offset,
+                                         remove_pos[0] - remove_pos[1] + self.v_offset,
+                                         add_pos[0] - add_pos[1] + self.v_offset)
+        return u_low, u_high, v_low - self.v_offset, v_high - self.v_offset
+
+    def swap_delta(self, pos_a, pos_b):
+        # cost change and new bounding boxes when the tiles pos_a (layer >= 0) and pos_b (other layer or free) are swapped
+        layer_a = self.layer_at(pos_a)
+        layer_b = self.layer_at(pos_b)
+        box = {layer_a: self.moved_box(layer_a, pos_a, pos_b)}
+        if layer_b >= 0:
+            box[layer_b] = self.moved_box(layer_b, pos_b, pos_a)
+        delta = 0.0
+        for l in box:
+            delta += self.in_cost(l, box[l]) - self.in_cost(l, self.box[l])
+        for e in set(e for l in box for e in self.layer_edge[l]):
+            delta += self.edge_cost(e, box) - self.edge_cost(e, {})
+        return delta, box
+
+    def swap(self, pos_a, pos_b, box):
+        layer_a = self.layer_at(pos_a)
+        layer_b = self.layer_at(pos_b)
+        for pos, other_pos, layer_id in [(pos_a, pos_b, layer_a), (pos_b, pos_a, layer_b)]:
+            if layer_id >= 0:
+                self.u_count[layer_id][pos[0] + pos[1]] -= 1
+                self.v_count[layer_id][pos[0] - pos[1] + self.v_offset] -= 1
+                self.u_count[layer_id][other_pos[0] + other_pos[1]] += 1
+                self.v_count[layer_id][other_pos[0] - other_pos[1] + self.v_offset] += 1
+        for l in box:
+            self.box[l] = box[l]
+        for pos, layer_id in [(pos_a, layer_b), (pos_b, layer_a)]:
+            if layer_id >= 0:
+                self.tile_layer[pos] = layer_id
+            else:
+                self.tile_layer.pop(pos, None)
+
+    def random_move(self, tile_pos, shape):
+        # a random tile of a layer (index in tile_pos) and a nearby tile of another layer or free,
+        # None if no such move is found in move_attempts draws
+        for _ in range(move_attempts):
+            i = self.random_state.randint(len(tile_pos))
+            x, y = tile_pos[i]
+            pos_b = (min(max(x + self.random_state.randint(-move_radius, move_radius + 1), 0), shape[0] - 1),
+                     min(max(y + self.random_state.randint(-move_radius, move_radius + 1), 0), shape[1] - 1))
+            if self.layer_at(pos_b) != self.layer_at(tile_pos[i]):
+                return i, tile_pos[i], pos_b
+        return None
+
+    def placement(self):
+        # (n, 2) coordinates of the used tiles in row-major order and layer of each used tile (TCG.tile_position_update)
+        position = np.array(list(self.tile_layer.keys()), dtype=int).reshape(-1, 2)
+        position_layer = np.array(list(self.tile_layer.values()), dtype=int)
+        order = np.lexsort((position[:, 1], position[:, 0]))
+        return position[order], position_layer[order]
+
+    def run(self, move_num=None):
+        '''
+        :param move_num: number of moves (default: move_per_tile per used tile)
+        :return: best placement (coordinates of the used tiles, layer of each used tile), cost of the best placement
+        '''
+        shape = self.shape
+        tile_pos = [tuple(pos) for pos in self.placement()[0].tolist()]
+        value_num = len(set(self.tile_layer.values())) + (len(tile_pos) < shape[0] * shape[1])
+            # number of distinct layers of the tiles (-1: free)
+        if value_num < 2 or len(tile_pos) == 0:
+            # no move
+            return self.placement() + (self.cost(),)
+        if move_num is None:
+            move_num = move_per_tile * len(tile_pos)
+        # initial temperature: mean cost change of random moves
+        sample = [self.random_move(tile_pos, shape) for _ in range(min(100, move_num))]
+        sample = [abs(self.swap_delta(*move[1:])[0]) for move in sample if move is not None]
+        if len(sample) == 0:
+            # no legal move
+            return self.placement() + (self.cost(),)
+        temperature = max(initial_temperature_ratio * float(np.mean(sample)), 1e-12)
+        cooling = final_temperature_ratio ** (1 / max(move_num, 1))
+        current_cost = self.cost()
+        best_cost = current_cost
+        accepted = []
+            # swaps accepted after the best placement, undone at the end
+        for _ in range(move_num):
+            move = self.random_move(tile_pos, shape)
+            if move is not None:
+                i, pos_a, pos_b = move
+                delta, box = self.swap_delta(pos_a, pos_b)
+                if delta <= 0 or self.random_state.rand() < math.exp(-delta / temperature):
+                    self.swap(pos_a, pos_b, box)
+                    accepted.append((pos_a, pos_b))
+                    current_cost += delta
+                    if self.layer_at(pos_a) < 0:
+                        # moved to a free tile
+                        tile_pos[i] = pos_b
+                    if current_cost < best_cost:
+                        best_cost = current_cost
+                        accepted = []
+            temperature *= cooling
+        # back to the best placement
+        for pos_a, pos_b in reversed(accepted):
+            self.swap(pos_a, pos_b, {})
+        self.box = [self.layer_box(layer_id) for layer_id in range(self.layer_num)]
+        return self.placement() + (best_cost,)
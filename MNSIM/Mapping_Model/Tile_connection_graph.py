@@ -12,6 +12,8 @@ from MNSIM.Hardware_Model import *
 from MNSIM.Hardware_Model.Crossbar import crossbar
 from MNSIM.Hardware_Model.Tile import tile
 from MNSIM.Interface.interface import *
+from MNSIM.Hardware_Model.SimConfig import load_SimConfig
+from MNSIM.Mapping_Model.Placement_annealing import placement_annealing
 import collections
 import pandas as pd
 
@@ -88,35 +90,31 @@ def generate_snake_matrix(row, column):
             start += 1
     return matrix
 
-def generate_hui_matrix(row, column):
-    matrix = np.zeros([row, column])
+def hui_walk(row, column, num):
+    # tile coordinates of the first num tiles of the hui order
     state = 0
     stride = 1
     step = 0
-    start = 0
     dl = 0
     ru = 0
     i = 0
     j = 0
-    for x in range(row * column):
+    for x in range(num):
         if x == 0:
-            matrix[i][j] = start
+            yield i, j
         else:
             if state == 0:
                 j += 1
-                matrix[i][j] = start
                 state = 1
             elif state == 1:
                 if dl == 0:
                     i += 1
-                    matrix[i][j] = start
                     step += 1
                     if step == stride:
                         dl = 1
                         step = 0
                 elif dl == 1:
                     j -= 1
-                    matrix[i][j] = start
                     step += 1
                     if step == stride:
                         dl = 0
@@ -125,52 +123,50 @@ def generate_hui_matrix(row, column):
                         state = 2
             elif state == 2:
                 i += 1
-                matrix[i][j] = start
                 state = 3
             elif state == 3:
                 if ru == 0:
                     j += 1
-                    matrix[i][j] = start
                     step += 1
                     if step == stride:
                         ru = 1
                         step = 0
                 elif ru == 1:
                     i -= 1
-                    matrix[i][j] = start
                     step += 1
                     if step == stride:
                         ru = 0
                         step = 0
                         stride += 1
                         state = 0
-        start += 1
-    return matrix
+            yield i, j
 
-def generate_zigzag_matrix(row, column):
+def generate_hui_matrix(row, column):
     matrix = np.zeros([row, column])
+    for start, (i, j) in enumerate(hui_walk(row, column, row * column)):
+        matrix[i][j] = start
+    return matrix
+
+def zigzag_walk(row, column, num):
+    # tile coordinates of the first num tiles of the zigzag order
     state = 0
     stride = 1
     step = 0
     i = 0
     j = 0
-    start = 0
-    for x in range(row * column):
+    for x in range(num):
         if x == 0:
-            matrix[i][j] = start
+            yield i, j
         else:
             if state == 0:
                 if j < column - 1:
                     j += 1
-                    matrix[i][j] = start
                 else:
                     i += 1
-                    matrix[i][j] = start
                 state = 1
             elif state == 1:
                 i += 1
                 j -= 1
-                matrix[i][j] = start
                 step += 1
                 if i == row - 1:
                     state = 2
@@ -183,15 +179,12 @@ def generate_zigzag_matrix(row, column):
             elif state == 2:
                 if i < row - 1:
                     i += 1
-                    matrix[i][j] = start
                 else:
                     j += 1
-                    matrix[i][j] = start
                 state = 3
             elif state == 3:
                 j += 1
                 i -= 1
-                matrix[i][j] = start
                 step += 1
                 if j == column - 1:
                     state = 0
@@ -201,15 +194,45 @@ def generate_zigzag_matrix(row, column):
                     state = 0
                     stride += 1
                     step = 0
-        start += 1
+            yield i, j
+
+def generate_zigzag_matrix(row, column):
+    matrix = np.zeros([row, column])
+    for start, (i, j) in enumerate(zigzag_walk(row, column, row * column)):
+        matrix[i][j] = start
     return matrix
 
+def order_position(tile_connection, row, column, num):
+    # (num, 2) tile coordinates of the first num tiles of a mapping order (0: normal, 1: snake, 2: hui, 3: zigzag),
+    # without generating the (row, column) order matrix
+    if tile_connection in [0, 1]:
+        index = np.arange(num)
+        position = np.stack([index // column, index % column], axis=1)
+        if tile_connection == 1:
+            # odd rows from right to left
+            position[:, 1] = np.where(position[:, 0] % 2, column - 1 - position[:, 1], position[:, 1])
+        return position
+    walk = hui_walk if tile_connection == 2 else zigzag_walk
+    return np.array(list(walk(row, column, num)), dtype=int).reshape(num, 2)
+
+
+def max_manhattan_distance(src_pos, dst_pos):
+    # maximum Manhattan distance from each tile of src_pos (k, 2) to the tiles of dst_pos (m, 2), 0 if m = 0
+    # |dx| + |dy| = max(|du|, |dv|) with u = x + y, v = x - y: only the extreme u, v of dst_pos are needed
+    if len(dst_pos) == 0:
+        return np.zeros(len(src_pos), dtype=int)
+    src_u = src_pos[:, 0] + src_pos[:, 1]
+    src_v = src_pos[:, 0] - src_pos[:, 1]
+    dst_u = dst_pos[:, 0] + dst_pos[:, 1]
+    dst_v = dst_pos[:, 0] - dst_pos[:, 1]
+    return np.maximum.reduce([src_u - dst_u.min(), dst_u.max() - src_u, src_v - dst_v.min(), dst_v.max() - src_v])
+
 
 class TCG():
-    def __init__(self, NetStruct, SimConfig_path, multiple=None):
+    def __init__(self, NetStruct, SimConfig_path, multiple=None, check_tile_num=True):
         # NetStruct: layer structure, SimConfig_path: Hardware config path, multiple: allocate more resources for some layers (i.e., duplicate)
-        TCG_config = cp.ConfigParser()
-        TCG_config.read(SimConfig_path, encoding='UTF-8')
+        # check_tile_num: assert that the tiles are enough, otherwise the caller checks used_tile_num <= tile_total_num
+        TCG_config = load_SimConfig(SimConfig_path)
         if multiple is None:
             multiple = [1] * len(NetStruct)
         self.tile = tile(SimConfig_path)
@@ -225,8 +248,8 @@ class TCG():
         assert self.tile_num[0] > 0, "Tile number < 0"
         assert self.tile_num[1] > 0, "Tile number < 0"
         self.tile_total_num = self.tile_num[0] * self.tile_num[1]
-        self.mapping_order = -1 * np.ones(self.tile_num)
-        self.mapping_result = -1 * np.ones(self.tile_num)
+        self.mapping_order = None
+            # (row, column) mapping order matrix, only generated by mapping_matrix_gen
         start_tileid = 0
             # the start Tile id
         self.max_inbuf_size = 0
@@ -479,125 +502,221 @@ class TCG():
                 self.max_outbuf_size = tmp_outbuf_size
 
         self.used_tile_num = start_tileid
-        assert self.used_tile_num <= self.tile_total_num, "Tile number is not enough"
+        if check_tile_num:
+            assert self.used_tile_num <= self.tile_total_num, "Tile number is not enough"
             # TODO: update weight rewrite in xbar
         print("Total crossbar number:", total_xbar_num)
         self.inLayer_distance = np.zeros([1, self.layer_num])
         self.transLayer_distance = np.zeros([1, self.layer_num])
         self.aggregate_arg = np.zeros([self.layer_num, 2])
+        self.layer_tile_position = None
+            # tile coordinates of each layer (tile_position_update), the mapping is stored sparse:
+            # the (row, column) grid mapping_result is only generated when it is read
+        self.mapping_result_cache = None
+            # mapping_result of the current layer_tile_position, reset by tile_position_update
+        self.mapped = False
+            # mapping_net and calculate_transfer_distance are done (e.g. mapping snapshot), Model_latency keeps the mapping
+        self.tile_occupancy = None
+            # occupancy bitmap of the tiles (row-major, np.packbits)
+        self.placement_result = None
+            # optimized tile coordinates of each layer (layer_tile_position, Tile_Connection = 4)
 
-    def mapping_matrix_gen(self):
-        if self.tile_connection == 0:
-            self.mapping_order = generate_normal_matrix(self.mapping_order.shape[0], self.mapping_order.shape[1])
-        elif self.tile_connection == 1:
-            self.mapping_order = generate_snake_matrix(self.mapping_order.shape[0], self.mapping_order.shape[1])
-        elif self.tile_connection == 2:
-            self.mapping_order = generate_hui_matrix(self.mapping_order.shape[0], self.mapping_order.shape[1])
-        elif self.tile_connection == 3:
-            self.mapping_order = generate_zigzag_matrix(self.mapping_order.shape[0], self.mapping_order.shape[1])
+    def mapping_matrix_gen(self, tile_connection=None):
+        if tile_connection is None:
+            tile_connection = self.tile_connection
+        if tile_connection == 0:
+            self.mapping_order = generate_normal_matrix(self.tile_num[0], self.tile_num[1])
+        elif tile_connection == 1:
+            self.mapping_order = generate_snake_matrix(self.tile_num[0], self.tile_num[1])
+        elif tile_connection == 2:
+            self.mapping_order = generate_hui_matrix(self.tile_num[0], self.tile_num[1])
+        elif tile_connection == 3:
+            self.mapping_order = generate_zigzag_matrix(self.tile_num[0], self.tile_num[1])
+        # 4: no mapping order, placement_optimize starts from the best of the orders 0 ~ 3
 
     def mapping_net(self):
-        self.mapping_matrix_gen()
-        for i in range(self.mapping_order.shape[0]):
-            for j in range(self.mapping_order.shape[1]):
-                if self.mapping_order[i][j] < self.used_tile_num:
-                    for layer_id in range(self.layer_num - 1):
-                        if self.layer_tileinfo[layer_id]['type'] in ['conv','pooling','fc']:
-                            # only allocate tile for conv layers, pooling layers, and fc layers
-                            if ((self.mapping_order[i][j] >= self.layer_tileinfo[layer_id]['startid']) &
-                                    (self.mapping_order[i][j] < self.layer_tileinfo[layer_id + 1]['startid'])):
-                                self.mapping_result[i][j] = layer_id
-                                break
-                            elif self.mapping_order[i][j] >= self.layer_tileinfo[self.layer_num - 1]['startid']:
-                                self.mapping_result[i][j] = self.layer_num - 1
+        if self.tile_connection == 4:
+            if self.placement_result is None:
+                self.placement_optimize()
+            else:
+                self.layer_position_update(self.placement_result)
+            return
+        self.order_mapping()
+
+    def order_mapping(self, tile_connection=None):
+        # the tiles [startid of the layer, startid of the next layer) of the mapping order are allocated to a layer,
+        # only the coordinates of the used tiles of the order are generated (order_position)
+        if tile_connection is None:
+            tile_connection = self.tile_connection
+        position = order_position(tile_connection, self.tile_num[0], self.tile_num[1], self.used_tile_num)
+        assert ((position >= 0) & (position < self.tile_num)).all(), "Tile number is not enough for the mapping order"
+        startid = [self.layer_tileinfo[layer_id]['startid'] for layer_id in range(self.layer_num)]
+        position_layer = -1 * np.ones(self.used_tile_num, dtype=int)
+        # only allocate tile for conv layers, pooling layers, and fc layers
+        tile_layer = [layer_id for layer_id in range(self.layer_num - 1)
+                      if self.layer_tileinfo[layer_id]['type'] in ['conv','pooling','fc']]
+        if len(tile_layer):
+            position_layer[startid[self.layer_num - 1]:] = self.layer_num - 1
+        for layer_id in tile_layer:
+            position_layer[startid[layer_id]:startid[layer_id + 1]] = layer_id
+        self.tile_position_update(position[position_layer >= 0], position_layer[position_layer >= 0])
+
+    @property
+    def mapping_result(self):
+        # (row, column) grid: layer of each tile, -1: free tile, generated once per mapping (read-only)
+        if self.mapping_result_cache is None:
+            result = -1 * np.ones(self.tile_num)
+            if self.layer_tile_position is not None:
+                for layer_id, position in enumerate(self.layer_tile_position):
+                    result[position[:, 0], position[:, 1]] = layer_id
+            result.setflags(write=False)
+            self.mapping_result_cache = result
+        return self.mapping_result_cache
+
+    @mapping_result.setter
+    def mapping_result(self, result):
+        position = np.argwhere(result >= 0)
+        self.tile_position_update(position, result[position[:, 0], position[:, 1]].astype(int))
+
+    def placement_weight(self):
+        # data volume (bit) per image of each layer: merged in its aggregate tile (inLayer_distance),
+        # sent to the next layers (transLayer_distance)
+        output_num = []
+        in_weight = []
+        trans_weight = []
+        for layer_id in range(self.layer_num):
+            layer_dict = self.net[layer_id][0][0]
+            tileinfo = self.layer_tileinfo[layer_id]
+            if tileinfo['type'] in ['element_sum', 'element_multiply']:
+                output_num.append(output_num[layer_id + tileinfo['Inputindex'][0]])
+                data_num = int(tileinfo['datanum_branchout']) * int(tileinfo['bit_branchout'])
+            elif tileinfo['type'] == 'fc':
+                output_num.append(1)
+                data_num = int(layer_dict['Outfeature']) * int(layer_dict['outputbit'])
+            else:
+                output_num.append(int(np.prod(list(map(int, layer_dict['Outputsize'])))))
+                data_num = int(layer_dict['Outputchannel']) * int(layer_dict['outputbit'])
+            in_weight.append(output_num[layer_id] * tileinfo['max_column'] * tileinfo['max_PE'] * int(layer_dict['outputbit']))
+            trans_weight.append(output_num[layer_id] * data_num)
+        return in_weight, trans_weight
+
+    def placement_cost(self):
+        # weighted inLayer_distance + transLayer_distance of the current mapping (after calculate_transfer_distance)
+        in_weight, trans_weight = self.placement_weight()
+        return float(np.dot(in_weight, self.inLayer_distance[0]) + np.dot(trans_weight, self.transLayer_distance[0]))
+
+    def placement_optimize(self, move_num=None, seed=0):
+        # simulated annealing of the tiles of the layers (Placement_annealing), starting from the mapping order
+        # (normal, snake, hui, zigzag) with the lowest weighted distance (placement_cost); the optimized placement
+        # is kept if its placement_cost is not higher
+        order_cost = []
+        for tile_connection in range(4):
+            self.order_mapping(tile_connection)
+            self.calculate_transfer_distance()
+            order_cost.append(self.placement_cost())
+        self.order_mapping(int(np.argmin(order_cost)))
+        initial_position = self.layer_tile_position
+        initial_cost = min(order_cost)
+        in_weight, trans_weight = self.placement_weight()
+        edge = [(layer_id, layer_id + idx, trans_weight[layer_id]) for layer_id in range(self.layer_num - 1)
+                for idx in self.layer_tileinfo[layer_id]['Outputindex'] if layer_id + idx < self.layer_num]
+        annealing = placement_annealing(self.layer_tile_position, self.tile_num, in_weight, edge,
+                                        global_pos=(1/2*self.tile_num[0], 0), seed=seed)
+        position, position_layer, _ = annealing.run(move_num)
+        self.tile_position_update(position, position_layer)
+        self.calculate_transfer_distance()
+        if self.placement_cost() > initial_cost:
+            self.layer_position_update(initial_position)
+            self.calculate_transfer_distance()
+        self.placement_result = self.layer_tile_position
+        return initial_cost, self.placement_cost()
+
+    def tile_position_update(self, position, position_layer):
+        # tile coordinates of each layer in row-major order (same as np.argwhere(self.mapping_result == layer_id)),
+        # and the occupancy bitmap
+        # position: (n, 2) coordinates of the used tiles, position_layer: layer of each used tile
+        flat = position[:, 0] * self.tile_num[1] + position[:, 1]
+        order = np.lexsort((flat, position_layer))
+        bound = np.searchsorted(position_layer[order], np.arange(self.layer_num + 1))
+        self.layer_tile_position = [position[order[bound[i]:bound[i + 1]]] for i in range(self.layer_num)]
+        self.mapping_result_cache = None
+        self.tile_occupancy = np.zeros((self.tile_total_num + 7) // 8, dtype=np.uint8)
+        np.bitwise_or.at(self.tile_occupancy, flat // 8, (128 >> (flat % 8)).astype(np.uint8))
+
+    def layer_position_update(self, layer_tile_position):
+        # tile_position_update from the tile coordinates of each layer
+        self.tile_position_update(np.concatenate(list(layer_tile_position) + [np.zeros([0, 2], dtype=int)]),
+                                  np.repeat(np.arange(self.layer_num), [len(position) for position in layer_tile_position]))
+
+    def tile_occupied(self, x, y):
+        # whether the tile (x, y) is used by a layer
+        if self.tile_occupancy is None:
+            return False
+        flat = x * self.tile_num[1] + y
+        return bool(self.tile_occupancy[flat // 8] >> (7 - flat % 8) & 1)
+
+    def layer_position(self, layer_id):
+        if 0 <= layer_id < self.layer_num:
+            return self.layer_tile_position[layer_id]
+        return np.zeros([0, 2], dtype=int)
 
     def calculate_transfer_distance(self):
+        if self.layer_tile_position is None:
+            # not mapped: no tile
+            self.tile_position_update(np.zeros([0, 2], dtype=int), np.zeros(0, dtype=int))
         for layer_id in range(self.layer_num - 1):
             # Determine the aggregate node for layer 0~N-1
             if self.layer_tileinfo[layer_id]['is_branchout'] == 1:
                 # for the layer which is a output layer of one branch and the next layer is element_sum
                 if self.layer_tileinfo[layer_id]['type'] in ['conv', 'pooling', 'fc']:
-                    src_pos = np.argwhere(self.mapping_result == layer_id)
+                    src_pos = self.layer_position(layer_id)
                     if len(src_pos) == 1:
                         self.inLayer_distance[0][layer_id] = 0
                         self.aggregate_arg[layer_id] = src_pos[0]
                         self.transLayer_distance[0][layer_id] = abs(src_pos[0][0]-1/2*self.tile_num[0]) + src_pos[0][1]
-                    else:
-                        mindis_total = 1000
-                        for A in range(len(src_pos)):
-                            tmp_transLayer_distance = abs(src_pos[A][0]-1/2*self.tile_num[0]) + src_pos[A][1]
-                            maxdis_in = 0
-                            for i in range(len(src_pos)):
-                                if i != A:
-                                    dis_in = abs(src_pos[A][0] - src_pos[i][0]) + abs(src_pos[A][1] - src_pos[i][1])
-                                    if dis_in > maxdis_in:
-                                        maxdis_in = dis_in
-                            if (maxdis_in+tmp_transLayer_distance)<mindis_total:
-                                self.inLayer_distance[0][layer_id] = maxdis_in
-                                self.transLayer_distance[0][layer_id] = tmp_transLayer_distance
-                                self.aggregate_arg[layer_id] = src_pos[A]
-                                mindis_total = maxdis_in+tmp_transLayer_distance
+                    elif len(src_pos) > 1:
+                        # aggregate tile A: min(max distance to the other tiles + distance to the global buffer)
+                        transLayer_distance = abs(src_pos[:, 0]-1/2*self.tile_num[0]) + src_pos[:, 1]
+                        maxdis_in = max_manhattan_distance(src_pos, src_pos)
+                        self.aggregate_select(layer_id, src_pos, maxdis_in, transLayer_distance)
             else:
                 if self.layer_tileinfo[layer_id]['type'] in ['conv', 'pooling', 'fc']:
-                    src_pos = np.argwhere(self.mapping_result == layer_id)
+                    src_pos = self.layer_position(layer_id)
+                    dst_pos = np.concatenate([self.layer_position(layer_id + idx)
+                                              for idx in self.layer_tileinfo[layer_id]['Outputindex']] + [np.zeros([0, 2], dtype=int)])
                     if len(src_pos) == 1:
                         self.inLayer_distance[0][layer_id] = 0
                         self.aggregate_arg[layer_id] = src_pos[0]
-                        maxdis = 0
-                        for idx in self.layer_tileinfo[layer_id]['Outputindex']:
-                            dst_pos = np.argwhere(self.mapping_result == (layer_id + idx))
-                            for i in range(len(dst_pos)):
-                                dis = abs(src_pos[0][0] - dst_pos[i][0]) + abs(src_pos[0][1] - dst_pos[i][1])
-                                if dis > maxdis:
-                                    maxdis = dis
-                        self.transLayer_distance[0][layer_id] = maxdis
-                    else:
-                        mindis_total = 1000
-                        for A in range(len(src_pos)):
-                            maxdis_in = 0
-                            maxdis_out = 0
-                            for i in range(len(src_pos)):
-                                if i != A:
-                                    dis_in = abs(src_pos[A][0] - src_pos[i][0]) + abs(src_pos[A][1] - src_pos[i][1])
-                                    if dis_in > maxdis_in:
-                                        maxdis_in = dis_in
-                            for idx in self.layer_tileinfo[layer_id]['Outputindex']:
-                                dst_pos = np.argwhere(self.mapping_result == (layer_id + idx))
-                                for j in range(len(dst_pos)):
-                                    dis_out = abs(src_pos[A][0] - dst_pos[j][0]) + abs(src_pos[A][1] - dst_pos[j][1])
-                                    if dis_out > maxdis_out:
-                                        maxdis_out = dis_out
-                            tempdis = maxdis_in + maxdis_out
-                            if tempdis < mindis_total:
-                                self.inLayer_distance[0][layer_id] = maxdis_in
-                                self.transLayer_distance[0][layer_id] = maxdis_out
-                                self.aggregate_arg[layer_id] = src_pos[A]
-                                mindis_total = tempdis
+                        self.transLayer_distance[0][layer_id] = max_manhattan_distance(src_pos, dst_pos)[0]
+                    elif len(src_pos) > 1:
+                        # aggregate tile A: min(max distance to the other tiles + max distance to the next layers)
+                        maxdis_in = max_manhattan_distance(src_pos, src_pos)
+                        maxdis_out = max_manhattan_distance(src_pos, dst_pos)
+                        self.aggregate_select(layer_id, src_pos, maxdis_in, maxdis_out)
                 elif self.layer_tileinfo[layer_id]['type'] == 'element_sum' or self.layer_tileinfo[layer_id]['type'] == 'element_multiply':
                     maxdis_out = 0
                     for idx in self.layer_tileinfo[layer_id]['Outputindex']:
-                        dst_pos = np.argwhere(self.mapping_result == (layer_id + idx))
-                        for j in range(len(dst_pos)):
+                        dst_pos = self.layer_position(layer_id + idx)
+                        if len(dst_pos):
                             dis_out = abs(dst_pos[0][0]-1/2*self.tile_num[0]) + dst_pos[0][1]
                             if dis_out > maxdis_out:
                                 maxdis_out = dis_out
                     self.inLayer_distance[0][layer_id] = 0
                     self.transLayer_distance[0][layer_id] = maxdis_out
-        final_pos = np.argwhere(self.mapping_result == self.layer_num - 1)
+        final_pos = self.layer_position(self.layer_num - 1)
         # Determine the aggregate node for layer N (output layer)
-        mindis = 1000
-        for i in range(len(final_pos)):
-            maxdis = 0
-            for j in range(len(final_pos)):
-                if j != i:
-                    dis = abs(final_pos[i][0] - final_pos[j][0]) + abs(final_pos[i][1] - final_pos[j][1])
-                    if dis > maxdis:
-                        maxdis = dis
-            if maxdis < mindis:
-                mindis = maxdis
-                self.inLayer_distance[0][self.layer_num - 1] = mindis
-                self.aggregate_arg[self.layer_num - 1] = final_pos[i]
-                self.transLayer_distance[0][self.layer_num - 1] = 0
+        if len(final_pos):
+            self.aggregate_select(self.layer_num - 1, final_pos, max_manhattan_distance(final_pos, final_pos),
+                                  np.zeros(len(final_pos)))
+
+    def aggregate_select(self, layer_id, src_pos, inLayer_distance, transLayer_distance):
+        # the first tile with the minimum total distance (< 1000) is the aggregate node of the layer
+        total_distance = inLayer_distance + transLayer_distance
+        A = int(np.argmin(total_distance))
+        if total_distance[A] < 1000:
+            self.inLayer_distance[0][layer_id] = inLayer_distance[A]
+            self.transLayer_distance[0][layer_id] = transLayer_distance[A]
+            self.aggregate_arg[layer_id] = src_pos[A]
         # self.total_distance = sum(sum(self.trans_time * (self.inLayer_distance + self.transLayer_distance)))
 
 
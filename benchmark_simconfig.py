@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Startup benchmark for the SimConfig registry: counts SimConfig.ini reads and
+wall time of hardware model construction with the registry disabled (every
+constructor parses the file, the original behaviour) and enabled, and with
+flyweight PE/crossbar construction on top of the registry.
+"""
+
+import os
+import sys
+import time
+import argparse
+import configparser as cp
+from MNSIM.Hardware_Model import SimConfig as SimConfig_module
+from MNSIM.Hardware_Model.Tile import tile
+from MNSIM.Hardware_Model.Buffer import buffer
+
+_read_count = [0]
+_original_read = cp.ConfigParser.read
+
+
+def _counting_read(self, filenames, encoding=None):
+    _read_count[0] += 1
+    return _original_read(self, filenames, encoding=encoding)
+
+
+def build_models(SimConfig_path, tile_num, flyweight):
+    # what TCG / Model_latency construct at startup: one tile per mapped tile plus its buffers
+    for _ in range(tile_num):
+        tile(SimConfig_path, flyweight=flyweight)
+        buffer(SimConfig_path, buf_level=1)
+        buffer(SimConfig_path, buf_level=2)
+
+
+def run(SimConfig_path, tile_num, registry_enable, flyweight=False):
+    SimConfig_module.SimConfig_registry_enable = registry_enable
+    SimConfig_module.clear_SimConfig_registry()
+    _read_count[0] = 0
+    start = time.time()
+    build_models(SimConfig_path, tile_num, flyweight)
+    return _read_count[0], time.time() - start
+
+
+def main():
+    home_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='SimConfig parsing benchmark')
+    parser.add_argument("-HWdes", "--hardware_description", default=os.path.join(home_path, "SimConfig.ini"),
+                        help="Hardware description file location & name")
+    parser.add_argument("-N", "--tile_num", type=int, default=16,
+                        help="number of tiles to construct")
+    args = parser.parse_args()
+
+    cp.ConfigParser.read = _counting_read
+    try:
+        before_reads, before_time = run(args.hardware_description, args.tile_num, False)
+        after_reads, after_time = run(args.hardware_description, args.tile_num, True)
+        flyweight_reads, flyweight_time = run(args.hardware_description, args.tile_num, True, True)
+    finally:
+        cp.ConfigParser.read = _original_read
+        SimConfig_module.SimConfig_registry_enable = True
+    print("Constructed", args.tile_num, "tiles")
+    print("Without registry: file reads:", before_reads, "time:", before_time, "s")
+    print("With registry:    file reads:", after_reads, "time:", after_time, "s")
+    print("With flyweight:   file reads:", flyweight_reads, "time:", flyweight_time, "s")
+    if after_time > 0 and flyweight_time > 0:
+        print("Speedup:", before_time / after_time, "(registry),", before_time / flyweight_time, "(registry + flyweight)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+import os
+import argparse
+import time
+from MNSIM.DSE_Model.Design_space_exploration import design_space_exploration, objectives
+from MNSIM.DSE_Model.Surrogate_model import load_surrogate
+
+
+def parse_parameter(description):
+    # NAME=v1/v2/..., NAME: option name or Section:Option, e.g. Xbar_Size=128,128/256,256, "Tile level:PE_Num=2,2/4,4"
+    name, values = description.split('=', 1)
+    if ':' in name:
+        name = tuple(name.split(':', 1))
+    return name, values.split('/')
+
+
+def main():
+    home_path = os.getcwd()
+    SimConfig_path = os.path.join(home_path, "SimConfig.ini")
+    parser = argparse.ArgumentParser(description='MNSIM design space exploration')
+    parser.add_argument("-HWdes", "--hardware_description", default=SimConfig_path,
+        help="Base hardware description file location & name, default:/MNSIM_Python/SimConfig.ini")
+    parser.add_argument("-Weights", "--weights", default=None,
+        help="NN model weights file location & name, default: None")
+    parser.add_argument("-NN", "--NN", default='vgg8',
+        help="NN model description (name), default: vgg8")
+    parser.add_argument("-P", "--parameter", action='append', required=True,
+        help="Swept parameter NAME=v1/v2/..., e.g. -P Xbar_Size=128,128/256,256 -P ADC_Choice=4/6 "
+             "(Section:Option=... for an option in several sections)")
+    parser.add_argument("-Sampler", "--sampler", default='grid', choices=['grid', 'random', 'lhs'],
+        help="Design point sampler: every combination, random or Latin hypercube, default: grid")
+    parser.add_argument("-Samples", "--sample_num", type=int, default=16,
+        help="Number of design points of the random and Latin hypercube samplers, default: 16")
+    parser.add_argument("-Seed", "--seed", type=int, default=0,
+        help="Seed of the random and Latin hypercube samplers, default: 0")
+    parser.add_argument("-Workers", "--worker_num", type=int, default=None,
+        help="Number of worker processes (0: no pool), default: all the CPUs")
+    parser.add_argument("-EstLat", "--estimate_latency", action='store_true', default=False,
+        help="Estimate the latency (calculate_model_latency mode 3, faster), default: false")
+    parser.add_argument("-MaxArea", "--max_area", type=float, default=None,
+        help="Area constraint (mm^2), the latency is not computed for larger designs, default: None")
+    parser.add_argument("-MaxPower", "--max_power", type=float, default=None,
+        help="Power constraint (W), the latency is not computed for designs with a larger power, default: None")
+    parser.add_argument("-Prune", "--prune", action='store_true', default=False,
+        help="Skip the exact latency of the points dominated given their latency estimate (branch and bound), default: false")
+    parser.add_argument("-Surrogate", "--surrogate", default=None,
+        help="Surrogate model file (.npz) ranking the design points, only the -TopK best predicted points are simulated, default: None")
+    parser.add_argument("-TopK", "--top_k", type=int, default=16,
+        help="Number of design points simulated with -Surrogate, default: 16")
+    parser.add_argument("-TrainSurrogate", "--train_surrogate", default=None,
+        help="Train a surrogate model on the results and save it (.npz), default: None")
+    parser.add_argument("-Output", "--output", default=None,
+        help="Result table (.csv), default: None")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    space = dict(parse_parameter(description) for description in args.parameter)
+    constraints = {}
+    if args.max_area is not None:
+        constraints['area'] = args.max_area * 1e6
+    if args.max_power is not None:
+        constraints['power'] = args.max_power
+    __dse = design_space_exploration(args.NN, args.hardware_description, space, sampler=args.sampler,
+                                     sample_num=args.sample_num, seed=args.seed, weights_file=args.weights,
+                                     worker_num=args.worker_num, latency_mode=3 if args.estimate_latency else 1,
+                                     constraints=constraints, prune=args.prune,
+                                     surrogate=load_surrogate(args.surrogate) if args.surrogate else None,
+                                     top_k=args.top_k if args.surrogate else None)
+    print("========================Design Points=================================")
+    for result in __dse.run():
+        point = ", ".join("%s=%s" % (name, result[name]) for name in __dse.parameter_name.values())
+        if result['error'] is not None:
+            print(point, " infeasible:", result['error'])
+        elif result['pruned'] is not None:
+            print(point, " pruned:", result['pruned'], " area:", result['area'], "um^2", " power:", result['power'], "W")
+        else:
+            print(point, " latency:", result['latency'], "ns", " area:", result['area'], "um^2",
+                  " energy:", result['energy'], "nJ", " Pareto front size:", len(__dse.pareto_front))
+    print("Skipped latency evaluations:", sum(__dse.skipped.values()), "of", len(__dse.results),
+          " (constraint:", __dse.skipped['constraint'], " dominated:", __dse.skipped['dominated'],
+          " surrogate:", __dse.skipped['surrogate'], ")")
+    print("========================Pareto Front=================================")
+    print(__dse.table(pareto_only=True).sort_values(objectives[0]).to_string(index=False))
+    if args.train_surrogate:
+        __surrogate = __dse.fit_surrogate()
+        __surrogate.save(args.train_surrogate)
+        print("========================Surrogate Model=================================")
+        for target, calibration in __surrogate.calibration.items():
+            print(target, " error bound:", "%.2f%%" % (100 * calibration['bound']), "(coverage", calibration['coverage'],
+                  ")  mean error:", "%.2f%%" % (100 * calibration['mean_error']),
+                  " held-out points:", calibration['calibration_num'])
+        print("Surrogate model saved:", args.train_surrogate)
+    if args.output:
+        __dse.table().to_csv(args.output, index=False)
+        print("Result table saved:", args.output)
+    print("Design space exploration time:", time.time() - start_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,10 +15,14 @@ from MNSIM.Interface.interface import *
 from MNSIM.Accuracy_Model.Weight_update import weight_update
 from MNSIM.Mapping_Model.Behavior_mapping import behavior_mapping
 from MNSIM.Mapping_Model.Tile_connection_graph import TCG
+from MNSIM.Mapping_Model.Mapping_snapshot import snapshot_key, save_mapping_snapshot, load_mapping_snapshot
 from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Latency_Model.Latency_trace import latency_trace
+from MNSIM.Latency_Model.Replication_tuner import replication_tuner
 from MNSIM.Area_Model.Model_Area import Model_area
 from MNSIM.Power_Model.Model_inference_power import Model_inference_power
 from MNSIM.Energy_Model.Model_energy import Model_energy
+from MNSIM.Evaluation_Model.Model_evaluation import Model_evaluation
 
 
 
@@ -51,6 +55,22 @@ def main():
         help="Enable fixed quantization range (max value), default: false")
     parser.add_argument("-DisPipe", "--disable_inner_pipeline", action='store_true', default=False,
         help="Disable inner layer pipeline in latency modeling, default: false")
+    parser.add_argument("-VecLat", "--vectorized_latency", action='store_true', default=False,
+        help="Use the vectorized latency engine (same results, faster on large inputs), default: false")
+    parser.add_argument("-EventLat", "--event_latency", action='store_true', default=False,
+        help="Use the discrete-event latency engine (same results), default: false")
+    parser.add_argument("-EstLat", "--estimate_latency", action='store_true', default=False,
+        help="Estimate the latency: the steady rows of each layer are extrapolated (faster, with an error bound), default: false")
+    parser.add_argument("-SumLat", "--summary_latency", action='store_true', default=False,
+        help="Keep only the layer-wise latency results, not the history of every output (less memory), default: false")
+    parser.add_argument("-Trace", "--latency_trace", default=None,
+        help="Write the pipeline timeline to a Chrome trace file (.json or .json.gz, open in ui.perfetto.dev), default: None")
+    parser.add_argument("-MapSnap", "--mapping_snapshot", default=None,
+        help="Mapping snapshot file (.npz): loaded instead of mapping the network if it matches the network, weights and hardware description, written otherwise, default: None")
+    parser.add_argument("-TuneRep", "--tune_replication", type=int, default=-1,
+        help="Tune the layer replication (multiple) by duplicating the bottleneck layer within a tile budget (0: all the tiles), default: -1 (disabled)")
+    parser.add_argument("-Batch", "--batch_size", type=int, default=0,
+        help="Report the pipeline throughput and the latency of a batch of images streamed back to back, default: 0 (disabled)")
     parser.add_argument("-D", "--device", default=0,
         help="Determine hardware device (CPU or GPU-id) for simulation, default: CPU")
     parser.add_argument("-DisModOut", "--disable_module_output", action='store_true', default=False,
@@ -72,38 +92,83 @@ def main():
     mapping_start_time = time.time()
     
     #cifar10/cifar100/Imagenet
-    __TestInterface = TrainTestInterface(network_module=args.NN, dataset_module='MNSIM.Interface.cifar10',  
+    dataset_module = 'MNSIM.Interface.cifar10'
+    __TestInterface = TrainTestInterface(network_module=args.NN, dataset_module=dataset_module,
         SimConfig_path=args.hardware_description, weights_file=args.weights, device=args.device)
    
-    structure_file = __TestInterface.get_structure()
-    TCG_mapping = TCG(structure_file, args.hardware_description)
+    structure_file = None
+    TCG_mapping = None
+    multiple = None
+    if args.tune_replication >= 0:
+        structure_file = __TestInterface.get_structure()
+        __tuner = replication_tuner(structure_file, args.hardware_description,
+                                    tile_budget=args.tune_replication if args.tune_replication > 0 else None)
+        multiple, __curve = __tuner.run()
+        print("========================Replication Tuning=================================")
+        for point in __curve:
+            print("Duplicated layer:", point['layer'], " tiles:", point['tile_num'], " latency:", point['latency'], "ns",
+                  " area:", point['area'], "um^2")
+        print("Tuned multiple:", multiple)
+    if args.mapping_snapshot:
+        __snapshot_key = snapshot_key(args.NN, dataset_module, args.weights, args.hardware_description, multiple)
+        __snapshot = load_mapping_snapshot(args.mapping_snapshot, __snapshot_key, args.hardware_description,
+                                           structure_file)
+        if __snapshot is not None:
+            print("Mapping snapshot loaded:", args.mapping_snapshot)
+            structure_file, TCG_mapping = __snapshot
+    if structure_file is None:
+        structure_file = __TestInterface.get_structure()
+    if TCG_mapping is None:
+        TCG_mapping = TCG(structure_file, args.hardware_description, multiple)
+        if args.mapping_snapshot:
+            TCG_mapping.mapping_net()
+            TCG_mapping.calculate_transfer_distance()
+            TCG_mapping.mapped = True
+            save_mapping_snapshot(args.mapping_snapshot, __snapshot_key, structure_file, TCG_mapping)
+            print("Mapping snapshot saved:", args.mapping_snapshot)
     # print(TCG_mapping.max_inbuf_size)
     # print(TCG_mapping.max_outbuf_size)
     mapping_end_time = time.time()
     if not (args.disable_hardware_modeling):
         hardware_modeling_start_time = time.time()
-        __latency = Model_latency(NetStruct=structure_file, SimConfig_path=args.hardware_description, TCG_mapping=TCG_mapping)
+        __trace = latency_trace(args.latency_trace) if args.latency_trace else None
+        __latency = Model_latency(NetStruct=structure_file, SimConfig_path=args.hardware_description, multiple=multiple,
+                                  TCG_mapping=TCG_mapping, summary_only=args.summary_latency, trace=__trace)
         if not (args.disable_inner_pipeline):
-            __latency.calculate_model_latency(mode=1)
+            if args.vectorized_latency:
+                __latency.calculate_model_latency_vectorized(mode=1)
+            elif args.event_latency:
+                __latency.calculate_model_latency_event(mode=1)
+            elif args.estimate_latency:
+                __latency.calculate_model_latency(mode=3)
+            else:
+                __latency.calculate_model_latency(mode=1)
             # __latency.calculate_model_latency_nopipe()
             
         else:
             __latency.calculate_model_latency_nopipe()
+        if __trace is not None:
+            __trace.close()
         hardware_modeling_end_time = time.time()
         print("========================Latency Results=================================")
         __latency.model_latency_output(not (args.disable_module_output), not (args.disable_layer_output))
+        if args.batch_size > 0:
+            print("========================Throughput Results=================================")
+            __latency.model_throughput_output(args.batch_size, not (args.disable_layer_output))
 
-        __area = Model_area(NetStruct=structure_file, SimConfig_path=args.hardware_description, TCG_mapping=TCG_mapping)
+        # area, power and energy in one pass
+        __evaluation = Model_evaluation(NetStruct=structure_file, SimConfig_path=args.hardware_description,
+                                        TCG_mapping=TCG_mapping, model_latency=__latency)
+        __area = Model_area(NetStruct=structure_file, SimConfig_path=args.hardware_description, evaluation=__evaluation)
         
         print("========================Area Results=================================")
         __area.model_area_output(not (args.disable_module_output), not (args.disable_layer_output))
         __power = Model_inference_power(NetStruct=structure_file, SimConfig_path=args.hardware_description,
-                                        TCG_mapping=TCG_mapping)
+                                        evaluation=__evaluation)
         print("========================Power Results=================================")
         __power.model_power_output(not (args.disable_module_output), not (args.disable_layer_output))
         __energy = Model_energy(NetStruct=structure_file, SimConfig_path=args.hardware_description,
-                                TCG_mapping=TCG_mapping,
-                                model_latency=__latency, model_power=__power)
+                                model_latency=__latency, model_power=__power, evaluation=__evaluation)
         print("========================Energy Results=================================")
         __energy.model_energy_output(not (args.disable_module_output), not (args.disable_layer_output))
 
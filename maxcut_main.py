@@ -70,6 +70,14 @@ class MockTile:
         # 所以這裡不需要做任何計算，只需要確保方法存在
         pass
 
+    def calculate_tile_area_cached(self, **kwargs):
+        """與 calculate_tile_area 相同 (Model_area 使用的快取版本)"""
+        return self.calculate_tile_area(**kwargs)
+
+    def calculate_tile_read_power_fast_cached(self, **kwargs):
+        """與 calculate_tile_read_power_fast 相同 (Model_inference_power 使用的快取版本)"""
+        return self.calculate_tile_read_power_fast(**kwargs)
+
 
 class MaxCutTCG:
     """
@@ -154,6 +162,8 @@ class MaxCutTCG:
         
         # 為了向後相容，也提供 NetStruct 屬性
         self.NetStruct = self.net
+        # Model_latency 依此判斷是否需呼叫 mapping_net
+        self.mapped = False
         
         print(f"MaxCut TCG 初始化完成：{self.layer_num} 層")
     def mapping_net(self):
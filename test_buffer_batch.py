@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Vectorized SRAM buffer model (MNSIM.Hardware_Model.Buffer.buffer_batch): same area, power, latency and energy as the
+scalar buffer model over the size / bitwidth / technology grid of the SRAM tables.
+"""
+
+import numpy as np
+import pytest
+
+from MNSIM.Hardware_Model.Buffer import buffer, buffer_batch, buffer_sweep
+from MNSIM.Hardware_Model.SimConfig import SimConfig_variant
+
+SimConfig_path = "SimConfig.ini"
+
+buffer_size = [1, 2, 3, 4, 8, 12, 16, 32, 64, 100, 128, 256, 512]
+buffer_bitwidth = [0, 32, 64, 128, 200, 256, 512]
+rdata = 1000
+wdata = 300
+
+
+def scalar_buffer(buf_Tech, buf_Size, buf_bitwidth):
+    config = SimConfig_variant(SimConfig_path, {'Buffer_Technology': buf_Tech, 'PE_inBuf_Size': buf_Size,
+                                                'PE_inBuf_Area': 0, 'Buffer_Bitwidth': buf_bitwidth})
+    _buf = buffer(config, buf_level=1)
+    _buf.calculate_buf_read_power()
+    _buf.calculate_buf_write_power()
+    _buf.calculate_buf_read_latency(rdata)
+    _buf.calculate_buf_write_latency(wdata)
+    _buf.calculate_buf_read_energy(rdata)
+    _buf.calculate_buf_write_energy(wdata)
+    return _buf
+
+
+@pytest.mark.parametrize("buf_Tech", [0, 45, 65, 90, 130])
+def test_buffer_batch(buf_Tech):
+    size_grid, bitwidth_grid = np.meshgrid(buffer_size, buffer_bitwidth, indexing='ij')
+    result = buffer_batch(buf_Tech, size_grid, bitwidth_grid, rdata=rdata, wdata=wdata)
+    for i, buf_Size in enumerate(buffer_size):
+        for j, buf_bitwidth in enumerate(buffer_bitwidth):
+            if np.isnan(result['area'][i, j]):
+                # 2KB SRAM buffer with 512-bit bus bitwidth
+                assert buf_Size <= 2 and buf_bitwidth > 256
+                with pytest.raises(AssertionError):
+                    scalar_buffer(buf_Tech, buf_Size, buf_bitwidth)
+                continue
+            _buf = scalar_buffer(buf_Tech, buf_Size, buf_bitwidth)
+            assert result['area'][i, j] == pytest.approx(_buf.buf_area, rel=1e-12)
+            assert result['leakage_power'][i, j] == pytest.approx(_buf.leakage_power, rel=1e-12)
+            assert result['read_power'][i, j] == pytest.approx(_buf.buf_rpower, rel=1e-12)
+            assert result['write_power'][i, j] == pytest.approx(_buf.buf_wpower, rel=1e-12)
+            assert result['read_latency'][i, j] == _buf.buf_rlatency
+            assert result['write_latency'][i, j] == _buf.buf_wlatency
+            assert result['read_energy'][i, j] == pytest.approx(_buf.buf_renergy, rel=1e-12)
+            assert result['write_energy'][i, j] == pytest.approx(_buf.buf_wenergy, rel=1e-12)
+
+
+def test_buffer_batch_empty():
+    # a buffer of size 0 has no area and no read / write power
+    _buf = scalar_buffer(65, 16, 256)
+    _buf.buf_Size = 0
+    _buf.calculate_buf_area()
+    _buf.calculate_buf_read_power()
+    _buf.calculate_buf_write_power()
+    result = buffer_batch(65, 0, 256)
+    assert result['area'] == _buf.buf_area == 0
+    assert result['read_power'] == _buf.buf_rpower == 0
+    assert result['write_power'] == _buf.buf_wpower == 0
+
+
+def test_buffer_sweep():
+    sweep = buffer_sweep(SimConfig_path, buf_Size=buffer_size, buf_bitwidth=buffer_bitwidth, rdata=[rdata, wdata])
+    assert sweep['area'].shape == (len(buffer_size), len(buffer_bitwidth), 2)
+    result = buffer_batch(90, 16, 128, rdata=wdata)
+    assert sweep['read_energy'][buffer_size.index(16), buffer_bitwidth.index(128), 1] == result['read_energy']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
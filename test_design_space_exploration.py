@@ -0,0 +1,164 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Design space exploration (MNSIM.DSE_Model.Design_space_exploration): the samplers, the in-memory SimConfig variants
+(SimConfig_variant), the Pareto front and the evaluation of a design point, which must match a separate simulation
+with the same parameters. The invalid hardware descriptions are reported as infeasible (design_point_error).
+The branch and bound (prune) must give the same Pareto front and skip the dominated or constrained points.
+The surrogate ranking (surrogate, top_k) must only simulate top_k points.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from MNSIM.Hardware_Model.SimConfig import SimConfig_variant
+from MNSIM.Interface.interface import TrainTestInterface
+from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Evaluation_Model.Model_evaluation import Model_evaluation
+from MNSIM.DSE_Model.Design_space_exploration import design_space_exploration, grid_sampler, random_sampler, \
+    latin_hypercube_sampler, dominates, pareto_rank, design_point_error, evaluate_design_point, get_structure
+from MNSIM.DSE_Model import Design_space_exploration
+
+SimConfig_path = "SimConfig.ini"
+
+
+def test_sampler():
+    space = {'a': [1, 2, 3], 'b': [4, 5]}
+    assert len(list(grid_sampler(space))) == 6
+    assert len(list(random_sampler(space, 10))) == 10
+    # each value is sampled sample_num / len(values) times
+    points = list(latin_hypercube_sampler(space, 6))
+    assert sorted(point['a'] for point in points) == [1, 1, 2, 2, 3, 3]
+    assert sorted(point['b'] for point in points) == [4, 4, 4, 5, 5, 5]
+
+
+def test_SimConfig_variant():
+    config = SimConfig_variant(SimConfig_path, {'Xbar_Size': (128, 128), ('Tile level', 'Tile_outBuf_Size'): 8})
+    assert config.getlist('Crossbar level', 'Xbar_Size') == [128, 128]
+    assert config.getint('Tile level', 'Tile_outBuf_Size') == 8
+    assert config.getint('Process element level', 'Tile_outBuf_Size') == 0
+    # the typed values are converted once, getlist returns a new list
+    xbar_size = config.getlist('Crossbar level', 'Xbar_Size')
+    xbar_size[0] = 256
+    assert config.getlist('Crossbar level', 'Xbar_Size') == [128, 128]
+    # Tile_outBuf_Size is in two sections
+    with pytest.raises(KeyError):
+        SimConfig_variant(SimConfig_path, {'Tile_outBuf_Size': 8})
+
+
+def test_get_structure(monkeypatch):
+    # the interface is only built for a new structure, the buffer sizes do not change it
+    built = []
+
+    class counting_interface(TrainTestInterface):
+        def __init__(self, *args, **kwargs):
+            built.append(1)
+            TrainTestInterface.__init__(self, *args, **kwargs)
+    monkeypatch.setattr(Design_space_exploration, 'TrainTestInterface', counting_interface)
+    Design_space_exploration._worker_structure.clear()
+    structure = get_structure('vgg8', 'MNSIM.Interface.cifar10', None, SimConfig_path)
+    for size in [8, 16]:
+        config = SimConfig_variant(SimConfig_path, {('Tile level', 'Tile_outBuf_Size'): size})
+        assert get_structure('vgg8', 'MNSIM.Interface.cifar10', None, config) is structure
+    assert len(built) == 1
+    get_structure('vgg8', 'MNSIM.Interface.cifar10', None, SimConfig_variant(SimConfig_path, {'ADC_Choice': 4}))
+    assert len(built) == 2
+
+
+def test_design_point_error():
+    assert design_point_error(SimConfig_variant(SimConfig_path, {'Xbar_Size': (512, 512)})) is None
+    # the crossbar rows must be a multiple of Subarray_Size (256)
+    assert 'Subarray_Size' in design_point_error(SimConfig_variant(SimConfig_path, {'Xbar_Size': (128, 128)}))
+    assert 'ADC_Choice' in design_point_error(SimConfig_variant(SimConfig_path, {'ADC_Choice': 10}))
+    result = evaluate_design_point(('resnet18', 'MNSIM.Interface.cifar10', None, SimConfig_path,
+                                    {('Crossbar level', 'Xbar_Size'): (128, 128)}, 3, {}, False))
+    assert 'Subarray_Size' in result['error'] and result['latency'] is None
+    result = evaluate_design_point(('resnet18', 'MNSIM.Interface.cifar10', None, SimConfig_path,
+                                    {('Architecture level', 'Tile_Num'): (4, 4)}, 3, {}, False))
+    assert result['error'].startswith('Tile number is not enough') and result['tile_num'] > 16
+
+
+def test_design_space_exploration():
+    space = {'Xbar_Size': [(256, 256), (512, 512)], 'ADC_Choice': [4, 6]}
+    dse = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0, latency_mode=3)
+    table = dse.run_all()
+    assert len(table) == 4
+    assert all(result['error'] is None for result in dse.results)
+    front = [result for result in dse.results if not any(dominates(other, result) for other in dse.results)]
+    assert sorted(map(id, front)) == sorted(id(dse.results[i]) for i in dse.pareto_front)
+    # same results as a separate simulation of the first point
+    config = SimConfig_variant(SimConfig_path, {'Xbar_Size': (512, 512), 'ADC_Choice': 4})
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=config)
+    structure = interface.get_structure()
+    latency = Model_latency(structure, config)
+    latency.calculate_model_latency(mode=3)
+    evaluation = Model_evaluation(structure, config, TCG_mapping=latency.graph, model_latency=latency)
+    result = [result for result in dse.results if result['Xbar_Size'] == (512, 512) and result['ADC_Choice'] == 4][0]
+    assert result['latency'] == max(latency.layer_finish_time)
+    assert result['area'] == evaluation.arch_total_area
+    assert result['energy'] == evaluation.arch_total_energy
+
+
+def test_branch_and_bound():
+    space = {'Xbar_Size': [(256, 256), (512, 512)], 'ADC_Choice': [4, 6], 'PE_Num': [(2, 2), (4, 4)]}
+    full = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0)
+    full.run_all()
+    max_area = sorted(result['area'] for result in full.results)[-2]
+    dse = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0, constraints={'area': max_area},
+                                   prune=True)
+    dse.run_all()
+    assert dse.skipped['constraint'] >= 1
+    assert dse.skipped['dominated'] > 0
+    front = [result for result in full.results if result['area'] <= max_area and
+             not any(dominates(other, result) for other in full.results if other['area'] <= max_area)]
+    key = lambda result: (result['Xbar_Size'], result['ADC_Choice'], result['PE_Num'])
+    assert sorted(map(key, front)) == sorted(key(dse.results[i]) for i in dse.pareto_front)
+    full_result = dict((key(result), result) for result in full.results)
+    for i in dse.pareto_front:
+        assert dse.results[i]['latency_bound'] == 0.0
+        for name in ['latency', 'area', 'power', 'energy']:
+            assert dse.results[i][name] == full_result[key(dse.results[i])][name]
+    assert len([result for result in dse.results if result['pruned'] == 'dominated']) == dse.skipped['dominated']
+    # with the latency estimate, the bound pass gives the results
+    estimate = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0, latency_mode=3,
+                                        constraints={'area': max_area}, prune=True)
+    estimate.run_all()
+    assert estimate.skipped['constraint'] >= 1 and estimate.skipped['dominated'] == 0
+    assert all(result['latency'] is not None for result in estimate.results if result['pruned'] is None)
+
+
+def test_pareto_rank():
+    assert pareto_rank([[1, 2], [2, 1], [2, 2], [3, 3], [1, 2]]).tolist() == [0, 0, 1, 2, 0]
+    # two objectives (sort-based) and the same objectives with a constant third one (pairwise), with ties
+    random_state = np.random.RandomState(0)
+    for _ in range(100):
+        objective = random_state.randint(0, 6, (random_state.randint(1, 40), 2))
+        assert pareto_rank(objective).tolist() == \
+            pareto_rank(np.concatenate([objective, np.zeros([len(objective), 1])], axis=1)).tolist()
+
+
+def test_surrogate_ranking():
+    space = {'Xbar_Size': [(256, 256), (512, 512)], 'ADC_Choice': [4, 5, 6], 'PE_Num': [(2, 2), (4, 4)]}
+    full = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0, latency_mode=3)
+    full.run_all()
+    # 12 feasible points: the surrogate needs at least 10 evaluated points
+    assert len(full.results) == 12 and all(result['error'] is None for result in full.results)
+    surrogate = full.fit_surrogate(calibration_ratio=0.3)
+    assert set(surrogate.calibration.keys()) == {'latency', 'energy'}
+    dse = design_space_exploration('resnet18', SimConfig_path, space, worker_num=0, latency_mode=3,
+                                   surrogate=surrogate, top_k=4)
+    dse.run_all()
+    assert len(dse.results) == 12 and dse.skipped['surrogate'] == 8
+    simulated = [result for result in dse.results if result['pruned'] is None]
+    assert len(simulated) == 4
+    key = lambda result: (result['Xbar_Size'], result['ADC_Choice'], result['PE_Num'])
+    full_result = dict((key(result), result) for result in full.results)
+    for result in simulated:
+        assert result['latency'] == full_result[key(result)]['latency']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Parity of the vectorized and discrete-event latency engines (Model_latency.calculate_model_latency_vectorized,
+Model_latency.calculate_model_latency_event) with the loop engine (Model_latency.calculate_model_latency):
+the begin/finish time of every output, the occupancy and the total latency of every module must be identical.
+The summary-only mode (Model_latency(summary_only=True)) must give the same layer-wise results,
+the layer memoization (Model_latency(layer_memo=True)) the same results.
+The estimate (calculate_model_latency(mode=3)) must be within its error bound, mode 2 is the same as mode 1.
+The stall analysis (Latency_stall_calculate) returns the stalled layers without writing to stdout.
+The incremental computation (calculate_model_latency_incremental) must give the same results as a full computation,
+also along the steps of the replication tuner (Replication_tuner), whose area must be the area of Model_area.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from MNSIM.Interface.interface import TrainTestInterface
+from MNSIM.Latency_Model.Model_latency import Model_latency, pixel_latency_fields, Search, Search_batch
+from MNSIM.Latency_Model.Replication_tuner import replication_tuner
+from MNSIM.Area_Model.Model_Area import Model_area
+
+SimConfig_path = "SimConfig.ini"
+compared_attributes = ['begin_time', 'finish_time', 'compute_interval', 'occupancy', 'layer_split']
+_structures = {}
+
+
+def get_structure(network):
+    if network not in _structures:
+        interface = TrainTestInterface(network_module=network, dataset_module='MNSIM.Interface.cifar10',
+                                       SimConfig_path=SimConfig_path)
+        _structures[network] = interface.get_structure()
+    return _structures[network]
+
+
+def replicated_multiple(structure):
+    # replicate every second conv layer, to cover the split (Judge) path
+    return [2 if (structure[i][0][0]['type'] == 'conv' and i % 2 == 1) else 1 for i in range(len(structure))]
+
+
+@pytest.mark.parametrize("network", ['vgg8', 'alexnet', 'resnet18'])
+@pytest.mark.parametrize("mode", [0, 1])
+@pytest.mark.parametrize("replicate", [False, True])
+@pytest.mark.parametrize("engine", ['calculate_model_latency_vectorized', 'calculate_model_latency_event'])
+def test_latency_engine_parity(network, mode, replicate, engine):
+    structure = get_structure(network)
+    multiple = replicated_multiple(structure) if replicate else None
+    loop_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    loop_latency.calculate_model_latency(mode=mode)
+    vectorized_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    getattr(vectorized_latency, engine)(mode=mode)
+    attributes = compared_attributes + [name for name in vars(loop_latency) if name.startswith('total_')]
+    for name in attributes:
+        assert getattr(loop_latency, name) == getattr(vectorized_latency, name), name
+    for name in pixel_latency_fields:
+        for loop_layer, vectorized_layer in zip(getattr(loop_latency, name), getattr(vectorized_latency, name)):
+            assert np.array_equal(loop_layer, vectorized_layer), name
+    assert max(max(loop_latency.finish_time)) == max(max(vectorized_latency.finish_time))
+
+
+@pytest.mark.parametrize("engine", ['calculate_model_latency', 'calculate_model_latency_vectorized'])
+def test_layer_memo(engine):
+    structure = get_structure('resnet18')
+    latency = Model_latency(structure, SimConfig_path)
+    getattr(latency, engine)(mode=1)
+    memo_latency = Model_latency(structure, SimConfig_path, layer_memo=True)
+    getattr(memo_latency, engine)(mode=1)
+    assert memo_latency.layer_memo_hit > 0
+    attributes = compared_attributes + [name for name in vars(latency) if name.startswith('total_')]
+    for name in attributes:
+        assert getattr(latency, name) == getattr(memo_latency, name), name
+
+
+@pytest.mark.parametrize("network", ['vgg8', 'resnet18'])
+@pytest.mark.parametrize("replicate", [False, True])
+def test_latency_estimate(network, replicate):
+    structure = get_structure(network)
+    multiple = replicated_multiple(structure) if replicate else None
+    exact_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    exact_latency.calculate_model_latency_vectorized(mode=1)
+    estimate_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    estimate_latency.calculate_model_latency(mode=3)
+    for name in [name for name in vars(exact_latency) if name.startswith('total_')]:
+        assert getattr(exact_latency, name) == getattr(estimate_latency, name), name
+    for layer_id in range(len(structure)):
+        error = np.abs(np.array(exact_latency.finish_time[layer_id]) - np.array(estimate_latency.finish_time[layer_id]))
+        assert error.max() <= estimate_latency.layer_error_bound[layer_id] + 1e-6
+    assert abs(max(exact_latency.layer_finish_time) - max(estimate_latency.layer_finish_time)) <= \
+        estimate_latency.latency_error_bound + 1e-6
+    assert estimate_latency.occupancy == pytest.approx(exact_latency.occupancy)
+
+
+def test_latency_mode_2():
+    # mode 2 (default of Model_energy) is the exact latency of mode 1, not the estimate
+    structure = get_structure('vgg8')
+    latency = Model_latency(structure, SimConfig_path)
+    latency.calculate_model_latency(mode=1)
+    mode_2_latency = Model_latency(structure, SimConfig_path)
+    mode_2_latency.calculate_model_latency(mode=2)
+    for name in compared_attributes:
+        assert getattr(latency, name) == getattr(mode_2_latency, name), name
+    assert mode_2_latency.latency_error_bound is None
+
+
+@pytest.mark.parametrize("mode", [1, 3])
+def test_incremental_latency(mode):
+    structure = get_structure('resnet18')
+    previous_latency = Model_latency(structure, SimConfig_path)
+    previous_latency.calculate_model_latency(mode=mode)
+    conv_layer = [i for i in range(len(structure)) if structure[i][0][0]['type'] == 'conv']
+    multiple = [1] * len(structure)
+    multiple[conv_layer[-1]] = 2
+    full_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    full_latency.calculate_model_latency(mode=mode)
+    incremental_latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    computed_layer = incremental_latency.calculate_model_latency_incremental(previous_latency, mode=mode)
+    assert 0 < len(computed_layer) < len(structure) and conv_layer[-1] in computed_layer
+    attributes = ['begin_time', 'finish_time', 'occupancy', 'layer_split', 'layer_finish_time', 'latency_error_bound'] + \
+        [name for name in vars(full_latency) if name.startswith('total_')]
+    for name in attributes:
+        assert getattr(full_latency, name) == getattr(incremental_latency, name), name
+
+
+def test_replication_tuner():
+    structure = get_structure('resnet18')
+    tuner = replication_tuner(structure, SimConfig_path, tile_budget=600, area=False)
+    multiple, curve = tuner.run(max_step=10)
+    assert len(curve) == 11 and all(point['tile_num'] <= 600 for point in curve)
+    assert min(point['latency'] for point in curve) < curve[0]['latency']
+    latency = Model_latency(structure, SimConfig_path, multiple=multiple)
+    latency.calculate_model_latency(mode=3)
+    assert max(latency.layer_finish_time) == min(point['latency'] for point in curve)
+
+
+def test_replication_tuner_area():
+    structure = get_structure('vgg8')
+    tuner = replication_tuner(structure, SimConfig_path)
+    multiple, curve = tuner.run(max_step=3)
+    for point in curve:
+        assert point['area'] == Model_area(structure, SimConfig_path, multiple=point['multiple']).arch_total_area
+
+
+def test_event_streaming():
+    structure = get_structure('resnet18')
+    single_latency = Model_latency(structure, SimConfig_path)
+    single_latency.calculate_model_latency_event(mode=1)
+    stream_latency = Model_latency(structure, SimConfig_path)
+    simulator = stream_latency.calculate_model_latency_event(mode=1, image_num=100)
+    assert single_latency.finish_time == stream_latency.finish_time
+    # early exit once the initiation interval is steady
+    assert 2 < len(simulator.image_finish_time) < 100
+    assert 0 < simulator.initiation_interval <= simulator.image_finish_time[0]
+    assert simulator.image_latency(100) == pytest.approx(simulator.image_finish_time[0] + 99 * simulator.initiation_interval)
+    # the analytic throughput of the loop engine agrees with the streamed simulation
+    single_latency.calculate_model_throughput()
+    assert single_latency.initiation_interval == pytest.approx(simulator.initiation_interval)
+    assert single_latency.batch_latency(100) == pytest.approx(simulator.image_latency(100))
+
+
+@pytest.mark.parametrize("network", ['vgg8', 'resnet18'])
+def test_summary_only_latency(network):
+    structure = get_structure(network)
+    full_latency = Model_latency(structure, SimConfig_path)
+    full_latency.calculate_model_latency(mode=1)
+    summary_latency = Model_latency(structure, SimConfig_path, summary_only=True)
+    summary_latency.calculate_model_latency(mode=1)
+    attributes = ['occupancy', 'layer_begin_time', 'layer_finish_time'] + \
+        [name for name in vars(full_latency) if name.startswith('total_')]
+    for name in attributes:
+        assert getattr(full_latency, name) == getattr(summary_latency, name), name
+    assert sum(len(finish_time) for finish_time in summary_latency.finish_time) == 0
+    assert sum(summary_latency.pixel_count) == 0
+
+
+
+def test_search_batch():
+    random_state = np.random.RandomState(0)
+    for _ in range(200):
+        data = random_state.randint(0, 20, random_state.randint(1, 30)).astype(float).tolist()
+        value = random_state.randint(-2, 23, 10).astype(float)
+        assert Search_batch(value, data).tolist() == [Search(v, data) for v in value]
+
+
+def test_latency_stall(capsys):
+    latency = Model_latency(get_structure('vgg8'), SimConfig_path)
+    latency.calculate_model_latency(mode=1)
+    capsys.readouterr()
+    stalled = latency.Latency_stall_calculate()
+    assert capsys.readouterr().out == ''
+    for layer_id, input_layer_id, point in stalled:
+        assert input_layer_id < layer_id and 0 <= point < len(latency.begin_time[layer_id])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Chrome trace export of the latency timeline (MNSIM.Latency_Model.Latency_trace): one complete event per output
+(or merged working interval), written while the layers are computed or after the computation.
+"""
+
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+
+from MNSIM.Interface.interface import TrainTestInterface
+from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Latency_Model.Latency_trace import latency_trace, export_latency_trace
+
+SimConfig_path = "SimConfig.ini"
+
+
+@pytest.fixture(scope="module")
+def structure():
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=SimConfig_path)
+    return interface.get_structure()
+
+
+@pytest.mark.parametrize("pixel", [False, True])
+def test_export_latency_trace(structure, tmp_path, pixel):
+    latency = Model_latency(structure, SimConfig_path)
+    latency.calculate_model_latency(mode=1)
+    path = str(tmp_path / "trace.json.gz")
+    event_num = export_latency_trace(latency, path, pixel=pixel)
+    events = json.load(gzip.open(path, 'rt'))['traceEvents']
+    assert len(events) == event_num
+    complete = [event for event in events if event['ph'] == 'X']
+    if pixel:
+        assert len(complete) == sum(len(begin_time) for begin_time in latency.begin_time)
+    else:
+        assert len(complete) == sum(len(interval) for interval in latency.compute_interval)
+    assert max(event['ts'] + event['dur'] for event in complete) == pytest.approx(max(latency.layer_finish_time) / 1000)
+    flow = [event for event in events if event['ph'] in ['s', 'f']]
+    assert len(flow) > 0 and len(flow) % 2 == 0
+
+
+def test_streaming_latency_trace(structure, tmp_path):
+    latency = Model_latency(structure, SimConfig_path)
+    latency.calculate_model_latency(mode=1)
+    export_latency_trace(latency, str(tmp_path / "export.json"), pixel=True)
+    # written while the layers are computed, the history of the layers is released (summary_only)
+    trace = latency_trace(str(tmp_path / "stream.json"), pixel=True)
+    Model_latency(structure, SimConfig_path, summary_only=True, trace=trace).calculate_model_latency(mode=1)
+    trace.close()
+    assert json.load(open(str(tmp_path / "stream.json"))) == json.load(open(str(tmp_path / "export.json")))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
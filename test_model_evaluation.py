@@ -0,0 +1,208 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Single-pass area/power/energy evaluation (MNSIM.Evaluation_Model.Model_evaluation): Model_area,
+Model_inference_power and Model_energy are views of it and must give the same results when built separately,
+and the results of the separate models for vgg8 (vgg8_reference).
+The tile read power of a shape is characterized once per process (tile_power_memo, bounded).
+The on-disk characterization cache (Characterization_cache) is opt-in and only reads the entries of the same model
+sources.
+"""
+
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from MNSIM.Interface.interface import TrainTestInterface
+from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Area_Model.Model_Area import Model_area
+from MNSIM.Power_Model.Model_inference_power import Model_inference_power
+from MNSIM.Energy_Model.Model_energy import Model_energy
+from MNSIM.Evaluation_Model.Model_evaluation import Model_evaluation, tile_power_memo
+import MNSIM.Evaluation_Model.Model_evaluation as Model_evaluation_module
+from MNSIM.Hardware_Model.Tile import tile
+from MNSIM.Latency_Model.Tile_latency import tile_latency_analysis, cached_tile_latency_analysis
+from MNSIM.Hardware_Model import Characterization_cache
+from MNSIM.Hardware_Model.SimConfig import SimConfig_variant
+
+SimConfig_path = "SimConfig.ini"
+
+# arch_* results of vgg8 (SimConfig.ini, latency mode 1) of the separate area, power and energy models before
+# Model_evaluation: the totals of every module and the layer-wise totals
+vgg8_reference = {
+    'arch_total_ADC_area': 272025600.0,
+    'arch_total_DAC_area': 27367.424000000003,
+    'arch_total_adder_area': 0.0,
+    'arch_total_area': 1390330993.5429137,
+    'arch_total_buf_area': 65334283.0,
+    'arch_total_digital_area': 21870158.98251361,
+    'arch_total_iReg_area': 112647.5715408284,
+    'arch_total_input_demux_area': 222896.128,
+    'arch_total_jointmodule_area': 20964964.70343195,
+    'arch_total_oReg_area': 112647.5715408284,
+    'arch_total_output_mux_area': 222896.128,
+    'arch_total_pooling_area': 29597324.296399996,
+    'arch_total_shiftreg_area': 234106.87999999998,
+    'arch_total_xbar_area': 1001476259.8399999,
+    'arch_total_ADC_power': 196.31808,
+    'arch_total_DAC_power': 0.6218159999999999,
+    'arch_total_adder_power': 0.0,
+    'arch_total_buf_power': 4.858728784,
+    'arch_total_buf_r_power': 2.2075353819999997,
+    'arch_total_buf_w_power': 2.651193402,
+    'arch_total_digital_power': 14.945395883588168,
+    'arch_total_iReg_power': 0.0014366581775147927,
+    'arch_total_input_demux_power': 0.01530624,
+    'arch_total_jointmodule_power': 14.78608700591716,
+    'arch_total_oReg_power': 0.0014039314934911242,
+    'arch_total_output_mux_power': 0.014957568,
+    'arch_total_pooling_power': 0.012328,
+    'arch_total_power': 219.72218327750815,
+    'arch_total_shiftreg_power': 0.12620448,
+    'arch_total_xbar_power': 2.96583460992,
+    'arch_total_ADC_energy': 3442430.6380800004,
+    'arch_total_DAC_energy': 4435.256217599999,
+    'arch_total_adder_energy': 0.0,
+    'arch_total_buf_energy': 976516.693932,
+    'arch_total_buf_r_energy': 487516.8778272,
+    'arch_total_buf_w_energy': 488999.81610480003,
+    'arch_total_digital_energy': 4831.5242245263735,
+    'arch_total_energy': 4448843.521209403,
+    'arch_total_iReg_energy': 7.590606908591716,
+    'arch_total_input_demux_energy': 20.330668623789983,
+    'arch_total_jointmodule_energy': 4247.861500970415,
+    'arch_total_output_mux_energy': 2.1470275964436425,
+    'arch_total_pooling_energy': 281.0784,
+    'arch_total_shiftreg_energy': 553.2477811199999,
+    'arch_total_xbar_energy': 20348.33035527732,
+    'arch_area': [8635596.2331858, 43177981.165929, 4317798.1165929, 43177981.165929, 86355962.331858,
+                  4317798.1165929, 172711924.663716, 328152656.8610604, 4317798.1165929, 656305313.7221208,
+                  4317798.1165929, 34542384.9327432],
+    'arch_power': [0.726154175367574, 3.692349644553846, 0.006130136, 7.212107235427219,
+                   14.424214470854437, 0.006130136, 28.848428941708875, 54.81201498924686, 0.006130136,
+                   109.62402997849372, 0.006130136, 0.35836329785562127],
+    'arch_energy': [90970.57219634028, 717286.6418947689, 1562.3794688000003, 591964.4809731555,
+                    1183928.961946311, 781.1897344000001, 592815.6244611555, 1126349.6864761952,
+                    390.59486720000007, 142613.3376783244, 48.82435840000001, 131.22715435309144],
+}
+
+
+def test_model_evaluation():
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=SimConfig_path)
+    structure = interface.get_structure()
+    latency = Model_latency(structure, SimConfig_path)
+    latency.calculate_model_latency(mode=3)
+    evaluation = Model_evaluation(structure, SimConfig_path, TCG_mapping=latency.graph, model_latency=latency)
+    # repeated blocks share their tile shapes
+    assert 0 < evaluation.tile_shape_num < evaluation.total_layer_num
+    area = Model_area(structure, SimConfig_path, TCG_mapping=latency.graph)
+    power = Model_inference_power(structure, SimConfig_path, TCG_mapping=latency.graph)
+    energy = Model_energy(structure, SimConfig_path, model_power=power, model_latency=latency)
+    results = evaluation.results()
+    assert results['area']['total'] == area.arch_total_area
+    assert results['power']['total'] == power.arch_total_power
+    assert results['energy']['total'] == energy.arch_total_energy
+    assert results['energy']['buf'] == energy.arch_total_buf_energy
+    assert area.arch_area == evaluation.arch_area and power.arch_power == evaluation.arch_power
+    assert energy.arch_energy == evaluation.arch_energy
+
+
+def test_vgg8_reference():
+    interface = TrainTestInterface(network_module='vgg8', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=SimConfig_path)
+    structure = interface.get_structure()
+    latency = Model_latency(structure, SimConfig_path)
+    latency.calculate_model_latency(mode=1)
+    area = Model_area(structure, SimConfig_path, TCG_mapping=latency.graph)
+    power = Model_inference_power(structure, SimConfig_path, TCG_mapping=latency.graph)
+    energy = Model_energy(structure, SimConfig_path, model_power=power, model_latency=latency)
+    for view in [area, power, energy]:
+        suffix = {Model_area: 'area', Model_inference_power: 'power', Model_energy: 'energy'}[type(view)]
+        # the results of the evaluation are listed by dir()
+        names = [name for name in vgg8_reference if name.endswith(suffix)]
+        assert set(names) <= set(dir(view))
+        for name in names:
+            assert getattr(view, name) == pytest.approx(vgg8_reference[name], rel=1e-12), name
+
+
+def test_tile_power_memo(monkeypatch):
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=SimConfig_path)
+    structure = interface.get_structure()
+    tile_power_memo.clear()
+    evaluation = Model_evaluation(structure, SimConfig_path)
+    assert len(tile_power_memo) == evaluation.tile_shape_num
+
+    def characterization(*args, **kwargs):
+        raise AssertionError("the tile read power of a known shape is characterized again")
+    monkeypatch.setattr(tile, 'calculate_tile_read_power_fast', characterization)
+    memo_evaluation = Model_evaluation(structure, SimConfig_path)
+    assert memo_evaluation.arch_power == evaluation.arch_power
+    assert memo_evaluation.arch_total_ADC_power == evaluation.arch_total_ADC_power
+    # the memo is bounded (LRU)
+    monkeypatch.undo()
+    monkeypatch.setattr(Model_evaluation_module, 'tile_power_memo_capacity', 2)
+    tile_power_memo.clear()
+    bounded_evaluation = Model_evaluation(structure, SimConfig_path)
+    assert len(tile_power_memo) == 2
+    assert bounded_evaluation.arch_power == evaluation.arch_power
+
+
+def test_characterization_cache_disk(tmp_path, monkeypatch):
+    assert Characterization_cache.characterization_cache(cache_dir=None).disk_load('key') is None
+    cache = Characterization_cache.characterization_cache(cache_dir=str(tmp_path))
+    assert cache.lookup('test', SimConfig_path, (1,), lambda: {'value': 1.0}) == {'value': 1.0}
+    # another process with the same model sources
+    cache = Characterization_cache.characterization_cache(cache_dir=str(tmp_path))
+    assert cache.lookup('test', SimConfig_path, (1,), lambda: {'value': 2.0}) == {'value': 1.0}
+    assert cache.disk_hit == 1
+    # modified model sources: the entry is computed again
+    monkeypatch.setattr(Characterization_cache, '_source_digest', 'other sources')
+    cache = Characterization_cache.characterization_cache(cache_dir=str(tmp_path))
+    assert cache.lookup('test', SimConfig_path, (1,), lambda: {'value': 2.0}) == {'value': 2.0}
+    assert cache.miss == 1
+    cache.clear(disk=True)
+    assert not any(file_names for _, _, file_names in os.walk(str(tmp_path)))
+
+
+def test_shared_PE():
+    # the tiles share the prototype PEs of a configuration, the area of a buffer size does not write to them
+    tile_1, tile_2 = tile(SimConfig_path), tile(SimConfig_path)
+    assert tile_1.tile_PE_list[0][0] is tile_2.tile_PE_list[-1][-1]
+    tile_1.calculate_tile_area(SimConfig_path=SimConfig_path, default_inbuf_size=16)
+    tile_area = tile_1.tile_area
+    tile_2.calculate_tile_area(SimConfig_path=SimConfig_path, default_inbuf_size=256)
+    assert tile_2.tile_area > tile_area
+    assert tile_1.tile_PE_private.PE_inbuf_area < tile_2.tile_PE_private.PE_inbuf_area
+    assert tile_1.tile_PE_list[0][0].PE_inbuf_area == 0
+    tile_1.calculate_tile_area(SimConfig_path=SimConfig_path, default_inbuf_size=16)
+    assert tile_1.tile_area == tile_area
+    # the variants with the same options share the prototypes
+    variant_1 = SimConfig_variant(SimConfig_path, {'ADC_Choice': 4})
+    variant_2 = SimConfig_variant(SimConfig_path, {'ADC_Choice': 4})
+    assert tile(variant_1).tile_PE_list[0][0] is tile(variant_2).tile_PE_list[0][0]
+
+
+def test_cached_tile_latency_analysis():
+    args = dict(read_row=100, read_column=100, inprecision=8, PE_num=4, default_inbuf_size=16, default_outbuf_size=4)
+    latency = tile_latency_analysis(SimConfig_path, indata=32, rdata=96, **args)
+    Characterization_cache.char_cache.clear()
+    for _ in range(2):
+        # characterized, then restored from the cache
+        cached_latency = cached_tile_latency_analysis(SimConfig_path, indata=32, rdata=96, **args)
+        assert cached_latency.tile_latency == pytest.approx(latency.tile_latency, rel=1e-12)
+        assert cached_latency.tile_PE_num == latency.tile_PE_num
+        assert cached_latency.outbuf.buf_wlatency == latency.outbuf.buf_wlatency
+        assert cached_latency.PE.ADC_latency == latency.PE.ADC_latency
+        # every attribute of __init__, the PE built on its first access
+        assert set(vars(latency)) <= set(vars(cached_latency))
+    # numpy scalars are collected as Python numbers
+    latency.tile_latency = np.float64(latency.tile_latency)
+    assert type(Characterization_cache.collect_attributes(latency, 'tile_', '_latency')['tile_latency']) is float
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
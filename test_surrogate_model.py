@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Surrogate model of the design space exploration (MNSIM.DSE_Model.Surrogate_model): the network features, the fit on
+design points and its calibrated error bound, which must hold for about its coverage on new points, and the
+persistence (save / load_surrogate must give the same predictions).
+"""
+
+import collections
+import numpy as np
+import pytest
+
+from MNSIM.DSE_Model.Surrogate_model import surrogate_model, load_surrogate, network_features, network_feature_names, \
+    design_features, targets
+
+parameters = ['Xbar_Size', 'ADC_Choice', ('Tile level', 'PE_Num')]
+
+
+def design_points(point_num, seed):
+    # synthetic results of a design space exploration, with a small noise
+    random_state = np.random.RandomState(seed)
+    results = []
+    for _ in range(point_num):
+        xbar_size = int(random_state.choice([64, 128, 256, 512]))
+        ADC_choice = int(random_state.randint(1, 8))
+        PE_num = int(random_state.choice([1, 2, 4]))
+        result = collections.OrderedDict([('Xbar_Size', (xbar_size, xbar_size)), ('ADC_Choice', ADC_choice),
+                                          (('Tile level', 'PE_Num'), '%d,%d' % (PE_num, PE_num))])
+        result['latency'] = 1e6 * (256 / xbar_size) * (1 + 0.1 * ADC_choice) / PE_num * np.exp(random_state.normal(0, 0.02))
+        result['energy'] = 1e4 * (xbar_size / 256) ** 0.3 * (8 - ADC_choice) * np.exp(random_state.normal(0, 0.02))
+        result['error'] = None
+        result['pruned'] = None
+        result.update((name, 1.0) for name in network_feature_names)
+        results.append(result)
+    return results
+
+
+def test_network_features():
+    structure = [[({'type': 'conv', 'Inputchannel': 3, 'Outputchannel': 8, 'Kernelsize': 3, 'Outputsize': [4, 4]}, None)],
+                 [({'type': 'pooling'}, None)],
+                 [({'type': 'fc', 'Infeature': 32, 'Outfeature': 10}, None)]]
+    feature = network_features(structure)
+    assert feature['net_layer_num'] == 3 and feature['net_conv_num'] == 1 and feature['net_pooling_num'] == 1
+    assert feature['net_weight'] == 3 * 8 * 9 + 320
+    assert feature['net_mac'] == 3 * 8 * 9 * 16 + 320
+    assert list(design_features(dict(design_points(1, 0)[0], **feature), parameters).keys())[:4] == \
+        ['Xbar_Size_0', 'Xbar_Size_1', 'ADC_Choice', 'PE_Num_0']
+
+
+def test_surrogate_model(tmp_path):
+    surrogate = surrogate_model()
+    calibration = surrogate.fit(design_points(600, 0), parameters)
+    test_points = design_points(400, 1)
+    prediction = surrogate.predict(test_points)
+    for target in targets:
+        exact = np.array([result[target] for result in test_points])
+        error = np.maximum(prediction[target] / exact, exact / prediction[target]) - 1
+        assert calibration[target]['bound'] < 0.2
+        assert np.mean(error <= calibration[target]['bound']) >= calibration[target]['coverage'] - 0.1
+    surrogate.save(str(tmp_path / "surrogate.npz"))
+    loaded = load_surrogate(str(tmp_path / "surrogate.npz"))
+    assert loaded.parameters == parameters
+    for target, value in loaded.predict(test_points).items():
+        assert np.array_equal(value, prediction[target])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])
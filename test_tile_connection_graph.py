@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*-coding:utf-8-*-
+"""
+Tile coordinate index and distance computation of the tile connection graph (MNSIM.Mapping_Model.Tile_connection_graph).
+The mapping is stored sparse (tile coordinates of each layer): the coordinates of the mapping orders must match the
+order matrices, the occupancy bitmap the used tiles, the grid (mapping_result) is only generated again after a change.
+The simulated annealing placement (Tile_Connection = 4) must not be worse than the mapping orders 0 ~ 3, and must
+stop when no move is found.
+A mapping snapshot (Mapping_snapshot) must restore the same TCG, and only for the same key; Model_latency must not
+map it again.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from MNSIM.Hardware_Model.SimConfig import SimConfig_variant
+from MNSIM.Interface.interface import TrainTestInterface
+from MNSIM.Latency_Model.Model_latency import Model_latency
+from MNSIM.Mapping_Model import Placement_annealing
+from MNSIM.Mapping_Model.Mapping_snapshot import snapshot_key, save_mapping_snapshot, load_mapping_snapshot
+from MNSIM.Mapping_Model.Tile_connection_graph import TCG, max_manhattan_distance, order_position, \
+    generate_normal_matrix, generate_snake_matrix, generate_hui_matrix, generate_zigzag_matrix
+
+SimConfig_path = "SimConfig.ini"
+
+
+def test_max_manhattan_distance():
+    random_state = np.random.RandomState(0)
+    for _ in range(100):
+        src_pos = random_state.randint(0, 64, (random_state.randint(1, 20), 2))
+        dst_pos = random_state.randint(0, 64, (random_state.randint(0, 20), 2))
+        distance = np.abs(src_pos[:, np.newaxis, :] - dst_pos[np.newaxis, :, :]).sum(axis=2)
+        assert max_manhattan_distance(src_pos, dst_pos).tolist() == distance.max(axis=1, initial=0).tolist()
+
+
+def test_tile_position_index():
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=SimConfig_path)
+    graph = TCG(interface.get_structure(), SimConfig_path)
+    graph.mapping_net()
+    graph.calculate_transfer_distance()
+    for layer_id in range(graph.layer_num):
+        assert np.array_equal(graph.layer_position(layer_id), np.argwhere(graph.mapping_result == layer_id))
+    assert (graph.mapping_result >= 0).sum() == graph.used_tile_num
+    # the grid is generated once per mapping
+    mapping_result = graph.mapping_result
+    assert graph.mapping_result is mapping_result and not mapping_result.flags.writeable
+    graph.order_mapping(0)
+    assert graph.mapping_result is not mapping_result
+    for layer_id in range(graph.layer_num):
+        assert np.array_equal(graph.layer_position(layer_id), np.argwhere(graph.mapping_result == layer_id))
+
+
+@pytest.mark.parametrize("tile_connection, generate_matrix", [(0, generate_normal_matrix), (1, generate_snake_matrix),
+                                                               (2, generate_hui_matrix), (3, generate_zigzag_matrix)])
+def test_order_position(tile_connection, generate_matrix):
+    for size in [1, 7, 16, 33]:
+        matrix = generate_matrix(size, size)
+        position = order_position(tile_connection, size, size, size * size)
+        assert matrix[position[:, 0], position[:, 1]].tolist() == list(range(size * size))
+
+
+def test_sparse_mapping(tmp_path):
+    # a large mesh: only the used tiles are generated
+    config = open(SimConfig_path).read().replace('Tile_Num = 64,64', 'Tile_Num = 1000,1000')
+    config_path = str(tmp_path / "SimConfig.ini")
+    open(config_path, 'w').write(config)
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=config_path)
+    graph = TCG(interface.get_structure(), config_path)
+    graph.mapping_net()
+    graph.calculate_transfer_distance()
+    assert graph.mapping_order is None
+    assert sum(len(graph.layer_position(layer_id)) for layer_id in range(graph.layer_num)) == graph.used_tile_num
+    assert np.unpackbits(graph.tile_occupancy).sum() == graph.used_tile_num
+    for layer_id in range(graph.layer_num):
+        for x, y in graph.layer_position(layer_id)[:10]:
+            assert graph.tile_occupied(x, y)
+    assert not graph.tile_occupied(999, 999)
+
+
+def test_placement_annealing(tmp_path):
+    config = open(SimConfig_path).read().replace('Tile_Connection = 2', 'Tile_Connection = 4')
+    config_path = str(tmp_path / "SimConfig.ini")
+    open(config_path, 'w').write(config)
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=config_path)
+    structure = interface.get_structure()
+    order_cost = []
+    for tile_connection in range(4):
+        graph = TCG(structure, config_path)
+        graph.tile_connection = tile_connection
+        graph.mapping_net()
+        graph.calculate_transfer_distance()
+        order_cost.append(graph.placement_cost())
+        order_result = graph.mapping_result
+    graph = TCG(structure, config_path)
+    graph.mapping_net()
+    graph.calculate_transfer_distance()
+    assert graph.placement_cost() <= min(order_cost)
+    # same number of tiles per layer
+    assert np.array_equal(np.unique(graph.mapping_result, return_counts=True),
+                          np.unique(order_result, return_counts=True))
+    for layer_id in range(graph.layer_num):
+        assert np.array_equal(graph.layer_position(layer_id), np.argwhere(graph.mapping_result == layer_id))
+
+
+def layer_tile_position(mapping_result, layer_num):
+    # tile coordinates of each layer of a (row, column) grid
+    return [np.argwhere(mapping_result == layer_id) for layer_id in range(layer_num)]
+
+
+def test_placement_annealing_best(monkeypatch):
+    mapping_result = -1 * np.ones([8, 8], dtype=int)
+    mapping_result[0, :4] = 0
+    mapping_result[7, 4:] = 1
+    mapping_result[3, 3] = 2
+    edge = [(0, 1, 1.0), (1, 2, 2.0)]
+    annealing = Placement_annealing.placement_annealing(layer_tile_position(mapping_result, 3), (8, 8),
+                                                        [1.0, 1.0, 1.0], edge, global_pos=(4, 0))
+    initial_cost = annealing.cost()
+    position, position_layer, best_cost = annealing.run(move_num=2000)
+    assert best_cost <= initial_cost
+    # the returned placement is the best one, with the same tiles per layer
+    result = -1 * np.ones([8, 8], dtype=int)
+    result[position[:, 0], position[:, 1]] = position_layer
+    assert Placement_annealing.placement_annealing(layer_tile_position(result, 3), (8, 8), [1.0, 1.0, 1.0], edge,
+                                                   global_pos=(4, 0)).cost() == pytest.approx(best_cost)
+    assert np.bincount(position_layer).tolist() == [4, 4, 1]
+    # no move found: the initial placement
+    monkeypatch.setattr(Placement_annealing, 'move_attempts', 0)
+    annealing = Placement_annealing.placement_annealing(layer_tile_position(mapping_result, 3), (8, 8),
+                                                        [1.0, 1.0, 1.0], edge, global_pos=(4, 0))
+    position, position_layer, cost = annealing.run(move_num=100)
+    assert cost == initial_cost
+    assert np.array_equal(position, np.argwhere(mapping_result >= 0))
+
+
+@pytest.mark.parametrize("tile_connection", [2, 4])
+def test_mapping_snapshot(tmp_path, tile_connection):
+    config = SimConfig_variant(SimConfig_path, {'Tile_Connection': tile_connection})
+    interface = TrainTestInterface(network_module='resnet18', dataset_module='MNSIM.Interface.cifar10',
+                                   SimConfig_path=config)
+    structure = interface.get_structure()
+    graph = TCG(structure, config)
+    graph.mapping_net()
+    graph.calculate_transfer_distance()
+    key = snapshot_key('resnet18', 'MNSIM.Interface.cifar10', None, config)
+    assert key != snapshot_key('vgg8', 'MNSIM.Interface.cifar10', None, config)
+    path = str(tmp_path / "mapping.npz")
+    save_mapping_snapshot(path, key, structure, graph)
+    assert load_mapping_snapshot(path, 'other key', config) is None
+    loaded_structure, loaded_graph = load_mapping_snapshot(path, key, config)
+    assert [layer[0][0] for layer in loaded_structure] == [layer[0][0] for layer in structure]
+    # Model_latency keeps the mapping of a snapshot
+    assert not graph.mapped and loaded_graph.mapped
+    for name, value in vars(graph).items():
+        if name in ['tile', 'net', 'mapped']:
+            continue
+        if name in ['layer_tile_position', 'placement_result'] and value is not None:
+            assert all(np.array_equal(a, b) for a, b in zip(value, getattr(loaded_graph, name))), name
+        elif isinstance(value, np.ndarray):
+            assert np.array_equal(value, getattr(loaded_graph, name)), name
+        else:
+            assert value == getattr(loaded_graph, name), name
+    # multiple is part of the key
+    assert key != snapshot_key('resnet18', 'MNSIM.Interface.cifar10', None, config, [2] * len(structure))
+    # the latency of the snapshot does not map the network again
+    loaded_graph.mapping_net = loaded_graph.calculate_transfer_distance = None
+    latency = Model_latency(loaded_structure, config, TCG_mapping=loaded_graph)
+    latency.calculate_model_latency(mode=3)
+    reference_latency = Model_latency(structure, config)
+    reference_latency.calculate_model_latency(mode=3)
+    assert latency.layer_finish_time == reference_latency.layer_finish_time
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-q'])